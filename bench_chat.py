@@ -0,0 +1,178 @@
+# bench_chat.py
+"""
+Multi-turn conversation benchmark: prompt-processing time per turn (time to
+first token) with the model's chat session reused between turns vs. the
+whole history re-sent as one fresh prompt every turn.
+
+Both modes carry the same history (jarvis_chat.Conversation, compacted
+under the same token budget); only the prefix reuse differs. With
+`--llm sim` the worker hosts a simulated model whose prompt processing
+costs `--prefill-ms` per token it has not seen. With `--llm real` it hosts
+the configured GPT4All model.
+
+It then replays a few sessions of small talk mixed with follow-ups through
+the response cache, once caching only a conversation's opening question
+and once caching every standalone question (jarvis_chat.is_standalone, as
+jarvis_llm does), and compares cache hits and time spent in the model.
+A hit saves a whole generation, but the next model call then processes the
+cached turn it missed (Conversation.catch_up), so the saving depends on
+decode vs. prompt cost: with a CPU-like `--decode-ms 50` the standalone rule
+spends about a third less time in the model; at the sim's default 2 ms per
+generated token it spends more.
+
+    python bench_chat.py [--llm sim|real] [--turns 10] [--budget 1536] [--prefill-ms 8]
+"""
+import argparse
+import statistics
+import time
+from contextlib import contextmanager
+
+from jarvis_cache import ResponseCache
+from jarvis_chat import Conversation, approx_tokens, is_standalone
+from jarvis_llm import MODEL_NAME
+from jarvis_llm_worker import LLMWorker
+
+QUESTIONS = [
+    "who was ada lovelace", "what did she write about", "which machine was that for",
+    "did anyone ever build it", "how big would it have been", "what language did she program it in",
+    "who else worked with them", "what happened to him later", "is any of it in a museum",
+    "which city is that in", "what else is there to see", "when is it open",
+    "how do i get there by train", "and how long does that take",
+]
+
+# Conversations of one day: small talk recurs, follow-ups only make sense in their session
+SESSIONS = [
+    ["hello", "who was ada lovelace", "what did she write about", "tell me a joke", "thank you"],
+    ["good morning", "how are you", "tell me a joke", "tell me another one", "thank you"],
+    ["hello", "what is the capital of france", "how many people live there", "tell me a joke", "thank you"],
+    ["how are you", "who was ada lovelace", "which machine was that for", "thank you"],
+]
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Simulated model: chat sessions keep what they processed, like a KV cache
+class SimModel:
+    REPLY = ("She was a mathematician who wrote the first published program. It was meant for "
+             "Charles Babbage's Analytical Engine, which was never finished in their lifetimes.").split()
+
+    def __init__(self, model_name: str):
+        _, prefill_ms, decode_ms = model_name.split(":")
+        self.prefill = float(prefill_ms) / 1000
+        self.decode = float(decode_ms) / 1000
+        self._session = None  # None outside a session, else the system prompt still to process
+
+    @contextmanager
+    def chat_session(self, system_message: str = ""):
+        self._session = system_message
+        try:
+            yield self
+        finally:
+            self._session = None
+
+    def generate(self, prompt, max_tokens=128, streaming=True):
+        if self._session is None:
+            new = prompt                          # stateless: the whole prompt, every time
+        else:
+            new, self._session = self._session + prompt, ""  # only what this session hasn't seen
+        time.sleep(approx_tokens(new) * self.prefill)
+        for i, word in enumerate(self.REPLY[:max_tokens]):
+            if i:
+                time.sleep(self.decode)
+            yield (" " if i else "") + word
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Run
+def run(worker: LLMWorker, reuse: bool, turns: int, budget: int, max_tokens: int) -> list:
+    conversation = Conversation(budget=budget)
+    rows = []
+    for question in QUESTIONS[:turns]:
+        session = conversation.request(question, max_tokens)
+        if reuse:
+            prompt, args = question, {"session": session}
+        else:
+            prompt, args = f"{session[1]}\n\nUser: {question}\nJarvis:", {}
+        t0 = time.perf_counter()
+        first, reply = None, []
+        for tok in worker.stream(prompt, max_tokens=max_tokens, timeout=300, **args):
+            if first is None:
+                first = time.perf_counter() - t0
+            reply.append(tok)
+        conversation.add_turn(question, "".join(reply).strip())
+        rows.append((first, approx_tokens(prompt if not reuse else session[1]), conversation.epoch))
+    return rows
+
+
+def run_cache(worker: LLMWorker, standalone: bool, budget: int, max_tokens: int) -> dict:
+    """
+    Replays SESSIONS through a fresh ResponseCache. Opening questions are
+    always cacheable; with `standalone` so is every later question that
+    doesn't refer back. Returns hits, model calls and seconds in the model.
+    """
+    cache = ResponseCache()
+    hits = calls = 0
+    model_seconds = 0.0
+    for questions in SESSIONS:
+        conversation = Conversation(budget=budget)
+        for question in questions:
+            calls_before = calls
+            history = bool(conversation.turns or conversation.summary)
+            cacheable = not history or (standalone and is_standalone(question))
+            key = cache.make_key(question, max_tokens=max_tokens)
+            reply = cache.get(key) if cacheable else None
+            if reply is not None:
+                hits += 1
+            else:
+                session = conversation.request(question, max_tokens)
+                prompt = conversation.catch_up(question)
+                t0 = time.perf_counter()
+                reply = "".join(worker.stream(prompt, max_tokens=max_tokens, timeout=300, session=session))
+                model_seconds += time.perf_counter() - t0
+                calls += 1
+                if cacheable:
+                    cache.put(key, reply)
+            conversation.add_turn(question, reply.strip(), from_cache=calls_before == calls)
+    return {"hits": hits, "calls": calls, "model_seconds": model_seconds}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--llm", choices=("sim", "real"), default="sim")
+    ap.add_argument("--turns", type=int, default=10)
+    ap.add_argument("--budget", type=int, default=1536, help="conversation token budget")
+    ap.add_argument("--max-tokens", type=int, default=64)
+    ap.add_argument("--prefill-ms", type=float, default=8.0, help="sim: prompt processing per token")
+    ap.add_argument("--decode-ms", type=float, default=2.0, help="sim: per generated token")
+    args = ap.parse_args()
+    turns = min(args.turns, len(QUESTIONS))
+
+    if args.llm == "sim":
+        worker = LLMWorker(f"sim:{args.prefill_ms}:{args.decode_ms}", factory="bench_chat:SimModel")
+    else:
+        worker = LLMWorker(MODEL_NAME)
+    worker.start()
+    list(worker.stream("hello", max_tokens=1, timeout=600, load_timeout=600))  # wait for the model
+
+    results = {}
+    for reuse in (False, True):
+        results[reuse] = run(worker, reuse, turns, args.budget, args.max_tokens)
+    cached = {rule: run_cache(worker, rule, args.budget, args.max_tokens) for rule in (False, True)}
+    worker.close()
+
+    print(f"\n{args.llm} model, {turns} turns, budget {args.budget} tokens")
+    print("turn   history tok   fresh prompt ms   session reuse ms")
+    for i, ((cold, tokens, _), (warm, _, epoch)) in enumerate(zip(results[False], results[True]), 1):
+        print(f"{i:>4} {tokens:>13} {cold * 1e3:>17.0f} {warm * 1e3:>18.0f}" + ("   (rebuilt)" if epoch and i > 1 and
+              epoch != results[True][i - 2][2] else ""))
+    cold = [r[0] for r in results[False][1:]]
+    warm = [r[0] for r in results[True][1:]]
+    print(f"follow-up turns: median {statistics.median(cold) * 1e3:.0f} ms → {statistics.median(warm) * 1e3:.0f} ms, "
+          f"total {sum(cold):.2f}s → {sum(warm):.2f}s")
+
+    asked = sum(len(q) for q in SESSIONS)
+    print(f"\nresponse cache, {len(SESSIONS)} sessions, {asked} questions")
+    for rule, label in ((False, "opening question only"), (True, "standalone questions")):
+        c = cached[rule]
+        print(f"  {label:<24} {c['hits']:>3} hits {c['calls']:>4} model calls {c['model_seconds']:>7.2f}s in the model")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,472 @@
+# bench_e2e.py
+"""
+Headless end-to-end benchmark: replays "wake word + command" recordings
+through the real pipeline — jarvis_entry.main_loop, the capture bus, VAD
+endpointing, jarvis_core.listen/handle_command, the handlers, speak_stream
+and the speech worker — on Linux, with no microphone, speaker or network.
+
+What stands in for the machine (every call is recorded with a timestamp):
+  SAPI               a TTS backend with SAPI-like first-audio delay and speaking rate
+  pyautogui, pygetwindow, webbrowser, os.startfile, subprocess, os.system
+                     recorders; nothing is typed, opened, launched or shut down
+  process index      a recorder for open/close app (jarvis_proc is never asked
+                     to start or signal a real process)
+  desktop            a scripted jarvis_windows.FakeBackend: a launched app's or
+                     opened page's window appears --app-latency s later
+  wake word          the frame where each wake word ends (or --wake porcupine)
+  STT                the reference transcript after --stt-latency (or --stt vosk/google)
+  LLM                a token generator with modelled first-token delay (or --llm real)
+
+Per utterance it measures speech end → first response (the first spoken
+audio or OS action) and wake-word end → first response, plus every stage
+jarvis_trace records (capture, stt, dispatch, handler.*, llm.*, tts.*).
+
+    python bench_e2e.py                          # synthetic corpus of voice-like bursts
+    python bench_e2e.py --corpus fixtures/       # <name>.wav + <name>.txt (+ optional <name>.json)
+        [--repeat 2] [--max-p95 1.5] [--verbose]
+
+Corpus WAVs are 16 kHz 16-bit mono: the wake word, then the command. The
+.txt holds the command transcript; the optional .json can give "wake_end"
+and "speech_end" (seconds) and "expect" (command name, or "llm"); without
+it both ends are found from the signal energy. Handlers really run, so keep
+file-deleting commands out of a corpus.
+
+With --max-p95 the exit status is 1 when the speech end → response p95
+exceeds it or an utterance got no response, so a release can be gated on it.
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import sys
+import time
+import wave
+from contextlib import contextmanager
+from threading import Lock
+
+import numpy as np
+
+from jarvis_audio import FRAME_LENGTH, SAMPLE_RATE, GeneratorSource
+from jarvis_proc import CloseReport, proc_key
+from jarvis_stt import STTBackend
+from jarvis_tts import NullBackend, SpeechWorker
+from jarvis_vad import frame_features
+from jarvis_windows import FakeBackend, WindowRegistry
+
+SYNTHETIC_COMMANDS = [
+    ("open browser", "open_browser"),
+    ("what time is it", "time"),
+    ("search web for python news", "search_web"),
+    ("type hello world on notepad", "type_on_app"),
+    ("volume up", "volume_up"),
+    ("next song", "next_track"),
+    ("system info", "system_info"),
+    ("tell me a joke", "joke"),
+    ("hello", "greeting"),
+    ("how do magnets work", "llm"),
+]
+LEAD_SILENCE = 1.0   # before the first utterance, so the main loop is waiting
+GAP_AFTER = 2.5      # after each utterance, for the response to happen
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Event log shared by the stand-ins
+_events = []
+_events_lock = Lock()
+
+
+def log_event(kind: str, detail: str):
+    with _events_lock:
+        _events.append((time.perf_counter(), kind, detail))
+
+
+class Recorder:
+    """Stand-in for a module/object: any call is logged as an "action" and returns another Recorder."""
+
+    def __init__(self, name: str):
+        self._name = name
+
+    def __getattr__(self, attr):
+        return Recorder(f"{self._name}.{attr}")
+
+    def __call__(self, *args, **kwargs):
+        log_event("action", f"{self._name}{args!r}"[:120])
+        return Recorder(f"{self._name}()")
+
+    def __getitem__(self, i):
+        return Recorder(f"{self._name}[{i}]")
+
+    def __bool__(self):
+        return True
+
+
+class RecordedSapi(NullBackend):
+    """SAPI stand-in: first audio `latency` s after the call, then `words_per_second` speaking rate."""
+
+    name = "recorded-sapi"
+
+    def __init__(self, latency: float = 0.12, words_per_second: float = 2.5):
+        super().__init__(words_per_second)
+        self.latency = latency
+
+    def say(self, text, cancelled):
+        if cancelled.wait(self.latency):
+            return False
+        log_event("speech", text)
+        return super().say(text, cancelled)
+
+
+# Window titles a launch puts on the fake desktop (what type_on_app waits for)
+APP_WINDOWS = {"notepad": "Untitled - Notepad", "word": "Document1 - Word", "code": "Welcome - Visual Studio Code"}
+
+
+class RecordingProcessIndex:
+    """jarvis_proc.ProcessIndex stand-in: launches and closes are logged; a launch shows the app's window."""
+
+    def __init__(self, desktop, latency: float = 0.5):
+        self.desktop = desktop
+        self.latency = latency
+
+    def start(self):
+        return self
+
+    def names(self) -> list:
+        return []
+
+    def launch(self, spoken: str):
+        log_event("action", f"launch({spoken!r})")
+        self.desktop.add(APP_WINDOWS.get(spoken.lower(), spoken.title()), after=self.latency)
+        return None
+
+    def close(self, spoken: str, timeout: float = 3.0, kill_timeout: float = 2.0, confirmed: bool = False):
+        log_event("action", f"close({spoken!r})")
+        return CloseReport(proc_key(spoken), [0], [], [], [], 0.0)
+
+
+class RecordingBrowser(Recorder):
+    """webbrowser stand-in whose open() also shows the page's window on the fake desktop."""
+
+    def __init__(self, desktop, latency: float = 0.5):
+        super().__init__("webbrowser")
+        self.desktop = desktop
+        self.latency = latency
+
+    def open(self, url, *args, **kwargs):
+        log_event("action", f"webbrowser.open({url!r})"[:120])
+        self.desktop.add(f"{url} - Google - Browser", after=self.latency)
+        return True
+
+    open_new_tab = open
+
+
+class ReplaySTT(STTBackend):
+    """Returns the corpus transcripts in order, each after `latency` s (a cloud/offline recognizer's delay)."""
+
+    name = "replay"
+
+    def __init__(self, transcripts, latency: float = 0.3):
+        self._transcripts = list(transcripts)
+        self.latency = latency
+
+    def transcribe(self, pcm, sample_rate):
+        time.sleep(self.latency)
+        return self._transcripts.pop(0) if self._transcripts else ""
+
+
+class StubModel:
+    """GPT4All stand-in: `first_token` s to the first token, then `tokens_per_second`."""
+
+    def __init__(self, first_token: float = 0.4, tokens_per_second: float = 12.0):
+        self.first_token = first_token
+        self.tokens_per_second = tokens_per_second
+
+    @contextmanager
+    def chat_session(self, system_message: str = ""):
+        yield self
+
+    def generate(self, prompt, max_tokens=128, streaming=True):
+        words = ("Magnets attract because their electrons spin in step. "
+                 "The aligned fields add up to one strong field. Opposite poles pull together.").split()
+        time.sleep(self.first_token)
+        for i, w in enumerate(words[:max_tokens]):
+            if i:
+                time.sleep(1 / self.tokens_per_second)
+            yield (" " if i else "") + w
+
+
+class ScriptedWake:
+    """WakeDetector stand-in that fires when the bus passes each known wake-word end frame."""
+
+    def __init__(self, bus, wake_frames):
+        self._bus = bus
+        self._reader = bus.reader()
+        self._pending = list(wake_frames)
+        self.last_wake_frame = None
+
+    def wait_for_wake(self) -> bool:
+        reader = self._reader
+        reader.seek_latest()
+        while self._pending:
+            if reader.read(timeout=0.5) is None:
+                if self._bus.finished:
+                    return False
+                continue
+            if reader.position > self._pending[0]:
+                self._pending.pop(0)
+                self.last_wake_frame = reader.position
+                return True
+        return False
+
+    def stop(self):
+        self._reader.close()
+
+
+class TimedSource(GeneratorSource):
+    """GeneratorSource that remembers when each frame was delivered (frame seq → perf_counter)."""
+
+    def __init__(self, chunks):
+        super().__init__(chunks, SAMPLE_RATE, FRAME_LENGTH, realtime=True)
+        self.frame_times = []
+
+    def start(self, push, finish):
+        def timed_push(frame):
+            self.frame_times.append(time.perf_counter())
+            return push(frame)
+        super().start(timed_push, finish)
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Corpus
+def voiced(seconds: float, rng, f0: float = 140.0, level: float = 3000.0):
+    """Harmonic, syllable-modulated signal the VAD treats as speech."""
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    f = f0 * (1 + 0.05 * np.sin(2 * np.pi * 0.7 * t + rng.random()))
+    phase = 2 * np.pi * np.cumsum(f) / SAMPLE_RATE
+    wave_ = sum(np.sin(k * phase) / k for k in range(1, 6))
+    envelope = 0.6 + 0.4 * np.sin(2 * np.pi * 4 * t + rng.random() * 6) ** 2
+    return wave_ * envelope * level / 2
+
+
+def synthetic_corpus(n: int, seed: int = 0) -> list:
+    """n utterances cycling through SYNTHETIC_COMMANDS: 0.5 s wake word, 0.3 s pause, ~0.3 s per command word."""
+    rng = np.random.default_rng(seed)
+    corpus = []
+    for i in range(n):
+        text, expect = SYNTHETIC_COMMANDS[i % len(SYNTHETIC_COMMANDS)]
+        wake = voiced(0.5, rng, f0=170)
+        pause = np.zeros(int(0.3 * SAMPLE_RATE))
+        command = voiced(max(0.6, 0.3 * len(text.split())), rng)
+        pcm = np.concatenate([wake, pause, command])
+        corpus.append({"name": f"synthetic-{i:03d}", "pcm": pcm, "text": text, "expect": expect,
+                       "wake_end": len(wake) / SAMPLE_RATE, "speech_end": len(pcm) / SAMPLE_RATE})
+    return corpus
+
+
+def _speech_bounds(pcm) -> tuple[float, float]:
+    """(end of the first speech burst, end of the last) in seconds, from frame energy."""
+    n = len(pcm) // FRAME_LENGTH
+    rms, _ = frame_features(pcm[:n * FRAME_LENGTH].reshape(n, FRAME_LENGTH))
+    speech = rms > max(150.0, 3 * np.percentile(rms, 10))
+    idx = np.flatnonzero(speech)
+    if not len(idx):
+        raise ValueError("no speech found")
+    gap = max(1, round(0.15 * SAMPLE_RATE / FRAME_LENGTH))  # 150 ms of silence ends the wake word
+    first_end = idx[-1]
+    for a, b in zip(idx, idx[1:]):
+        if b - a > gap:
+            first_end = a
+            break
+    frame_s = FRAME_LENGTH / SAMPLE_RATE
+    return (first_end + 1) * frame_s, (idx[-1] + 1) * frame_s
+
+
+def load_corpus(folder: str) -> list:
+    corpus = []
+    for wav_path in sorted(glob.glob(os.path.join(folder, "*.wav"))):
+        base = os.path.splitext(wav_path)[0]
+        if not os.path.exists(base + ".txt"):
+            print(f"skipping {wav_path}: no transcript")
+            continue
+        with wave.open(wav_path, "rb") as wf:
+            if (wf.getnchannels(), wf.getsampwidth(), wf.getframerate()) != (1, 2, SAMPLE_RATE):
+                print(f"skipping {wav_path}: need {SAMPLE_RATE} Hz 16-bit mono")
+                continue
+            pcm = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+        with open(base + ".txt", encoding="utf-8") as f:
+            text = f.read().strip().lower()
+        meta = {}
+        if os.path.exists(base + ".json"):
+            with open(base + ".json", encoding="utf-8") as f:
+                meta = json.load(f)
+        if "wake_end" not in meta or "speech_end" not in meta:
+            wake_end, speech_end = _speech_bounds(pcm)
+            meta.setdefault("wake_end", wake_end)
+            meta.setdefault("speech_end", speech_end)
+        corpus.append({"name": os.path.basename(base), "pcm": pcm, "text": text,
+                       "expect": meta.get("expect"), "wake_end": meta["wake_end"], "speech_end": meta["speech_end"]})
+    return corpus
+
+
+def assemble(corpus, seed: int = 0):
+    """One continuous recording with low background noise; returns (chunks, per-utterance frame marks)."""
+    rng = np.random.default_rng(seed + 1)
+    chunks = [rng.normal(0, 20, int(LEAD_SILENCE * SAMPLE_RATE))]
+    pos = len(chunks[0])
+    marks = []
+    for utt in corpus:
+        pcm = np.asarray(utt["pcm"], dtype=np.float64)
+        tail = rng.normal(0, 20, int(GAP_AFTER * SAMPLE_RATE))
+        marks.append({"wake_end": (pos + int(utt["wake_end"] * SAMPLE_RATE)) // FRAME_LENGTH,
+                      "speech_end": (pos + int(utt["speech_end"] * SAMPLE_RATE)) // FRAME_LENGTH})
+        chunks += [pcm + rng.normal(0, 20, len(pcm)), tail]
+        pos += len(pcm) + len(tail)
+    return [np.clip(c, -32768, 32767).astype(np.int16) for c in chunks], marks
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Run
+def install_stand_ins(args, corpus):
+    import jarvis_core
+    import jarvis_entry
+    import jarvis_llm
+    from jarvis_cache import ResponseCache
+
+    for name in ("pyautogui", "gw", "subprocess"):
+        setattr(jarvis_core, name, Recorder(name))
+    desktop = FakeBackend()
+    jarvis_core.webbrowser = RecordingBrowser(desktop, args.app_latency)
+    jarvis_core._process_index = RecordingProcessIndex(desktop, args.app_latency)
+    jarvis_core._window_registry = WindowRegistry(desktop, timeout=jarvis_core.WINDOW_TIMEOUT)
+    os.startfile = Recorder("os.startfile")
+    os.system = Recorder("os.system")
+    jarvis_entry.play_earcon = lambda *a, **k: log_event("earcon", "")
+
+    jarvis_core._tts = SpeechWorker(RecordedSapi(args.tts_latency))
+    if args.stt == "replay":
+        jarvis_core._stt_backend = ReplaySTT([u["text"] for u in corpus], args.stt_latency)
+    else:
+        os.environ["JARVIS_STT"] = args.stt
+    if args.llm == "stub":
+        jarvis_llm.LLM_WORKER = False  # the stub runs in this process
+        jarvis_llm._bot = StubModel(args.llm_first_token)
+    jarvis_llm.response_cache = ResponseCache()  # in memory: never the user's persisted replies
+
+    router = jarvis_core.router
+    dispatch_async = router.dispatch_async
+
+    async def logged_dispatch(text, executor=None):
+        found = router.match(text)
+        log_event("dispatch", found[0].name if found else "llm")
+        return await dispatch_async(text, executor)
+
+    router.dispatch_async = logged_dispatch
+
+
+async def run_pipeline(wake, bus, tts):
+    import jarvis_entry
+    task = asyncio.create_task(jarvis_entry.main_loop(wake, bus, "earcon", tts))
+    while not bus.finished:
+        await asyncio.sleep(0.1)
+    await asyncio.sleep(0.2)
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+def _pct(values):
+    if not values:
+        return "      -"
+    v = np.array(values) * 1e3
+    return " ".join(f"{x:7.0f}" for x in np.percentile(v, [50, 95, 99])) + f" {v.max():7.0f}"
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--corpus", help="folder of <name>.wav + <name>.txt (default: synthetic)")
+    ap.add_argument("--synthetic", type=int, default=20, help="synthetic utterances when no --corpus")
+    ap.add_argument("--repeat", type=int, default=1, help="play the corpus this many times")
+    ap.add_argument("--wake", choices=("scripted", "porcupine"), default="scripted")
+    ap.add_argument("--stt", default="replay", help="replay, or a jarvis_stt backend (vosk, google)")
+    ap.add_argument("--stt-latency", type=float, default=0.3)
+    ap.add_argument("--tts-latency", type=float, default=0.12, help="SAPI stand-in: call → first audio")
+    ap.add_argument("--app-latency", type=float, default=0.5, help="launch/open → window on the fake desktop")
+    ap.add_argument("--llm", choices=("stub", "real"), default="stub")
+    ap.add_argument("--llm-first-token", type=float, default=0.4)
+    ap.add_argument("--max-p95", type=float, help="fail (exit 1) above this speech end → response p95 (s)")
+    ap.add_argument("--verbose", action="store_true", help="one line per utterance")
+    args = ap.parse_args()
+
+    os.environ.setdefault("JARVIS_INDEX", "0")   # no background crawls skewing the numbers
+    os.environ.setdefault("JARVIS_MEDIA", "0")
+    os.environ.setdefault("JARVIS_TRACE_EXPORT", "0")
+    import jarvis_core
+    import jarvis_trace
+
+    corpus = load_corpus(args.corpus) if args.corpus else synthetic_corpus(args.synthetic)
+    corpus = corpus * args.repeat
+    if not corpus:
+        sys.exit("empty corpus")
+    chunks, marks = assemble(corpus)
+    install_stand_ins(args, corpus)
+    jarvis_trace.reset()
+    jarvis_trace.enable(export_interval=0)
+
+    source = TimedSource(chunks)
+    total_s = sum(len(c) for c in chunks) / SAMPLE_RATE
+    print(f"replaying {len(corpus)} utterances ({total_s:.0f}s of audio, real time); "
+          f"wake={args.wake} stt={args.stt} llm={args.llm} tts=recorded-sapi")
+    bus = jarvis_core.init_audio(source)
+    if args.wake == "porcupine":
+        from jarvis_wake import WakeDetector
+        wake = WakeDetector(keyword=(os.getenv("WAKEWORD") or "jarvis").strip().lower(), bus=bus)
+    else:
+        wake = ScriptedWake(bus, [m["wake_end"] for m in marks])
+    asyncio.run(run_pipeline(wake, bus, jarvis_core.get_tts()))
+    jarvis_core.get_tts().close()
+
+    # Attribute events to utterances: everything between this speech end and the next wake-word end
+    frame_times = source.frame_times
+    events = sorted(_events)
+    speech_lat, wake_lat, detect_lat, routed, expected, missing = [], [], [], 0, 0, []
+    for i, (utt, mark) in enumerate(zip(corpus, marks)):
+        t_wake = frame_times[min(mark["wake_end"], len(frame_times) - 1)]
+        t_end = frame_times[min(mark["speech_end"], len(frame_times) - 1)]
+        t_next = (frame_times[min(marks[i + 1]["wake_end"], len(frame_times) - 1)]
+                  if i + 1 < len(marks) else float("inf"))
+        detected = next((t for t, k, _ in events if k == "earcon" and t >= t_wake - 0.1 and t < t_next), None)
+        response = next(((t, k, d) for t, k, d in events if k in ("speech", "action") and t_end <= t < t_next), None)
+        dispatched = next((d for t, k, d in events if k == "dispatch" and t_end <= t < t_next), None)
+        if detected is not None:
+            detect_lat.append(detected - t_wake)
+        if response is None:
+            missing.append(utt["name"])
+        else:
+            speech_lat.append(response[0] - t_end)
+            wake_lat.append(response[0] - t_wake)
+        if utt.get("expect"):
+            expected += 1
+            routed += dispatched == utt["expect"]
+        if args.verbose:
+            resp = f"{(response[0] - t_end) * 1e3:6.0f} ms {response[1]}: {response[2][:50]}" if response else "no response"
+            print(f"  {utt['name']:<16} {utt['text'][:30]:<30} → {dispatched or '-':<14} {resp}")
+
+    print(f"\n{'end to end (ms)':<34}{'p50':>7} {'p95':>7} {'p99':>7} {'max':>7}")
+    print(f"  {'wake-word end → detected':<32}{_pct(detect_lat)}")
+    print(f"  {'speech end → first response':<32}{_pct(speech_lat)}")
+    print(f"  {'wake-word end → first response':<32}{_pct(wake_lat)}")
+    if expected:
+        print(f"routing: {routed}/{expected} utterances reached the expected command")
+    if missing:
+        print(f"no response: {', '.join(missing)}")
+    print(jarvis_trace.report())
+
+    if args.max_p95 is not None:
+        p95 = float(np.percentile(speech_lat, 95)) if speech_lat else float("inf")
+        if missing or p95 > args.max_p95:
+            print(f"FAIL: speech end → response p95 {p95:.3f}s (limit {args.max_p95}s), {len(missing)} without response")
+            sys.exit(1)
+        print(f"PASS: speech end → response p95 {p95:.3f}s ≤ {args.max_p95}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+# bench_fileindex.py
+"""
+File-index benchmark on a synthetic tree (empty files, realistic names).
+
+Reports the first crawl (build), a refresh of the unchanged tree, a refresh
+after a few directories changed, files edited in place (which only a deep
+refresh sees), and per-query latency of FileIndex.search()
+against what a recursive find_file would cost without an index: a full
+os.walk() matching every name.
+
+    python bench_fileindex.py [--files 1000000] [--tree DIR] [--walk-queries 3]
+
+The tree is created under --tree (default: a temp dir) on first use and
+reused afterwards; the index database lives next to it.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+
+from jarvis_fileindex import FileIndex, name_key
+
+WORDS = ("budget report invoice resume photo holiday project notes draft final meeting summary "
+         "contract tax return scan receipt plan design spec backup export data chart letter "
+         "presentation thesis chapter lecture slides recipe travel ticket passport song mix").split()
+EXTS = (".pdf", ".docx", ".xlsx", ".txt", ".jpg", ".png", ".mp3", ".mp4", ".py", ".csv", ".pptx", ".zip")
+
+
+def make_name(rng) -> str:
+    words = rng.sample(WORDS, rng.randint(1, 3))
+    sep = rng.choice(("_", "-", " ", ""))
+    if sep == "":
+        words = [w.capitalize() for w in words]
+    num = f"{sep or '_'}{rng.randint(1, 9999)}" if rng.random() < 0.7 else ""
+    return sep.join(words) + num + rng.choice(EXTS)
+
+
+def build_tree(root: str, n_files: int, seed: int = 0):
+    """~1000 files per leaf directory, three levels deep."""
+    rng = random.Random(seed)
+    per_dir = 1000
+    n_dirs = max(1, n_files // per_dir)
+    fanout = max(2, round(n_dirs ** (1 / 3)))
+    made = 0
+    for d in range(n_dirs):
+        a, b, c = d // (fanout * fanout), (d // fanout) % fanout, d % fanout
+        leaf = os.path.join(root, f"{rng.choice(WORDS)}_{a}", f"{rng.choice(WORDS)}_{b}", f"folder_{c}")
+        os.makedirs(leaf, exist_ok=True)
+        for _ in range(min(per_dir, n_files - made)):
+            path = os.path.join(leaf, make_name(rng))
+            open(path, "a").close()
+            made += 1
+
+
+def walk_search(root: str, query: str) -> list:
+    qkey = name_key(query)
+    hits = []
+    for dirpath, _, files in os.walk(root):
+        hits.extend(os.path.join(dirpath, f) for f in files if qkey in name_key(f))
+    return hits
+
+
+def _ms(values):
+    v = np.array(values) * 1e3
+    return f"p50 {np.percentile(v, 50):7.2f} ms  p95 {np.percentile(v, 95):7.2f} ms  max {v.max():7.2f} ms"
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--files", type=int, default=1_000_000)
+    ap.add_argument("--tree", help="where to create/reuse the synthetic tree")
+    ap.add_argument("--walk-queries", type=int, default=3, help="queries to time with a full os.walk")
+    args = ap.parse_args()
+
+    base = args.tree or os.path.join(tempfile.gettempdir(), f"jarvis-index-bench-{args.files}")
+    root = os.path.join(base, "tree")
+    db = os.path.join(base, "files.db")
+    if not os.path.isdir(root):
+        t0 = time.perf_counter()
+        print(f"creating {args.files} files under {root} ...")
+        build_tree(root, args.files)
+        print(f"  {time.perf_counter() - t0:.1f}s")
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db + suffix):
+            os.remove(db + suffix)
+
+    rng = random.Random(1)
+    sample = [os.path.join(dirpath, rng.choice(files)) for dirpath, _, files in os.walk(root) if files]
+
+    index = FileIndex(db, roots=[root])
+    st = index.refresh()
+    size = os.path.getsize(db) + (os.path.getsize(db + "-wal") if os.path.exists(db + "-wal") else 0)
+    print(f"build:     {st['seconds']:7.2f}s  {st['added']} entries in {st['dirs_listed']} dirs, db {size / 1e6:.0f} MB")
+    st = index.refresh()
+    print(f"refresh:   {st['seconds']:7.2f}s  unchanged tree ({st['dirs_unchanged']} dirs stat'ed, {st['dirs_listed']} listed)")
+
+    # Touch a few directories: add and remove files
+    changed = rng.sample(sorted({os.path.dirname(p) for p in sample}), min(10, len(sample)))
+    for i, d in enumerate(changed):
+        open(os.path.join(d, f"new_quarterly_forecast_{i}.xlsx"), "a").close()
+    st = index.refresh()
+    print(f"refresh:   {st['seconds']:7.2f}s  after {len(changed)} dirs changed (+{st['added']} -{st['removed']})")
+    for i, d in enumerate(changed):
+        os.remove(os.path.join(d, f"new_quarterly_forecast_{i}.xlsx"))
+    index.refresh()
+
+    # Edit a few files in place: their directories' mtimes stay put
+    edited = rng.sample(sample, min(10, len(sample)))
+    now = time.time()
+    for p in edited:
+        os.utime(p, (now, now))
+
+    def current():
+        """How many of the edited files the index has with their new mtime."""
+        return sum(any(h.path == p and h.mtime == now for h in index.search(os.path.basename(p), limit=50))
+                   for p in edited)
+
+    st = index.refresh()
+    print(f"refresh:   {st['seconds']:7.2f}s  after {len(edited)} files edited in place ({current()} up to date)")
+    st = index.refresh(deep=True)
+    print(f"deep:      {st['seconds']:7.2f}s  every dir listed ({st['dirs_listed']}), "
+          f"{current()}/{len(edited)} edited files up to date")
+
+    # Queries: exact stems of real files, partial words, typos, and misses
+    stems = [os.path.splitext(os.path.basename(p))[0] for p in rng.sample(sample, min(20, len(sample)))]
+    queries = {
+        "exact name": stems,
+        "substring": [s.replace("_", " ").replace("-", " ")[:8] for s in stems],
+        "typo (fuzzy)": [s[:3] + s[4:] for s in stems if len(s) > 8],
+        "no match": ["zebra crossing", "qwertyuiop", "xylophone quartet"],
+    }
+    top1 = sum(any(name_key(os.path.splitext(h.name)[0]) == name_key(s) for h in index.search(s, limit=1))
+               for s in stems)
+    print(f"ranking:   exact-name query ranked the file (or a same-named one) first {top1}/{len(stems)}")
+    typo_found = sum(any(name_key(os.path.splitext(h.name)[0]) == name_key(s) for h in index.search(s[:3] + s[4:], limit=5))
+                     for s in stems if len(s) > 8)
+    print(f"           one-letter typo still found the file in the top 5 {typo_found}/{len(queries['typo (fuzzy)'])}")
+    for label, qs in queries.items():
+        times = []
+        for q in qs:
+            t0 = time.perf_counter()
+            index.search(q)
+            times.append(time.perf_counter() - t0)
+        print(f"index  {label:<13} {_ms(times)}  ({len(qs)} queries)")
+
+    walk_times = []
+    for q in queries["substring"][:args.walk_queries]:
+        t0 = time.perf_counter()
+        walk_search(root, q)
+        walk_times.append(time.perf_counter() - t0)
+    print(f"os.walk substring      {_ms(walk_times)}  ({len(walk_times)} queries)")
+
+    if not args.tree:
+        print(f"(tree kept at {base}; delete it with: rm -r {base})")
+
+
+if __name__ == "__main__":
+    main()
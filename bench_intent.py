@@ -0,0 +1,123 @@
+# bench_intent.py
+"""
+Intent classifier benchmark: held-out accuracy, how many utterances the
+router alone vs router + classifier routes, per-utterance latency and batch
+throughput, and training time.
+
+The held-out set is a differently seeded sample of the router's patterns and
+keywords plus hand-written paraphrases that appear nowhere in the training
+data. Nothing is executed — only resolve()/classify() are timed.
+
+    python bench_intent.py [--n 2000] [--batch 256] [--seed 1]
+"""
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import time
+
+import jarvis_core
+from jarvis_core import INTENT_EXAMPLES, INTENT_THRESHOLD, router
+from jarvis_intent import UNKNOWN, examples_from_router, load_examples, train
+
+# Phrasings no pattern, keyword or intent_examples.json entry contains
+PARAPHRASES = [
+    ("what's the time right now", "time"), ("do you know what time it is", "time"),
+    ("what's today's date", "date"), ("which date is it", "date"),
+    ("how much battery is left", "battery"), ("check the battery", "battery"),
+    ("how loaded is my cpu", "cpu_usage"), ("check processor usage", "cpu_usage"),
+    ("how much ram am i using", "memory_usage"), ("check memory", "memory_usage"),
+    ("tell me my ip", "ip_address"), ("what's my network address", "ip_address"),
+    ("capture the screen", "screenshot"), ("take a picture of my screen", "screenshot"),
+    ("pause the song please", "play_pause"), ("pause playback", "play_pause"),
+    ("skip to the next song", "next_track"), ("skip this one", "next_track"),
+    ("go back one song", "previous_track"), ("play the last track again", "previous_track"),
+    ("turn the volume up", "volume_up"), ("make it a bit louder", "volume_up"),
+    ("turn the volume down", "volume_down"), ("a little quieter please", "volume_down"),
+    ("silence the sound", "mute"), ("switch off the sound", "mute"),
+    ("bring the sound back", "unmute"),
+    ("tell me something that'll make me laugh", "joke"), ("got any jokes", "joke"),
+    ("how are things with you", "how_are_you"),
+    ("launch a browser window", "open_browser"), ("open up the web browser", "open_browser"),
+    ("take me to youtube", "site_youtube"), ("empty the trash", "recycle_bin"),
+    ("who painted the mona lisa", UNKNOWN), ("how tall is mount everest", UNKNOWN),
+    ("what should i name my dog", UNKNOWN), ("explain how airplanes fly", UNKNOWN),
+    ("who wrote hamlet", UNKNOWN), ("what's a good movie to watch", UNKNOWN),
+    ("how do vaccines work", UNKNOWN), ("give me a recipe for pancakes", UNKNOWN),
+]
+
+
+def held_out(n: int, seed: int) -> list:
+    per_command = max(1, n // (len(router.commands) + 3))
+    return examples_from_router(router, per_command=per_command, seed=seed) + PARAPHRASES
+
+
+def routed_by(text: str, use_classifier: bool) -> str | None:
+    fallback, router.fallback = router.fallback, (router.fallback if use_classifier else None)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):  # the fallback's [Intent] lines
+            found = router.resolve(text)
+    finally:
+        router.fallback = fallback
+    return found[0].name if found else None
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--n", type=int, default=2000, help="generated held-out utterances")
+    ap.add_argument("--batch", type=int, default=256)
+    ap.add_argument("--seed", type=int, default=1, help="held-out seed (training uses 0)")
+    args = ap.parse_args()
+
+    examples = examples_from_router(router)
+    if os.path.exists(INTENT_EXAMPLES):
+        examples += load_examples(INTENT_EXAMPLES)
+    t0 = time.perf_counter()
+    model, stats = train(examples)
+    print(f"training: {stats['examples']} examples, {stats['labels']} intents, "
+          f"{time.perf_counter() - t0:.2f}s, train accuracy {stats['train_accuracy']:.1%}")
+    jarvis_core._intent_classifier = model
+
+    train_texts = {t for t, _ in examples}
+    test = [(t, label) for t, label in held_out(args.n, args.seed) if t not in train_texts]
+    texts = [t for t, _ in test]
+
+    # Accuracy
+    predictions = model.classify_batch(texts)
+    correct = sum(p == label for (p, _), (_, label) in zip(predictions, test))
+    para = [(t, label) for t, label in PARAPHRASES if t not in train_texts]
+    para_correct = sum(model.classify(t)[0] == label for t, label in para)
+    confident = [(p, label) for (p, c), (_, label) in zip(predictions, test) if c >= INTENT_THRESHOLD]
+    print(f"held-out accuracy: {correct / len(test):.1%} of {len(test)} "
+          f"(paraphrases {para_correct}/{len(para)}); "
+          f"above threshold {INTENT_THRESHOLD}: {len(confident)} at "
+          f"{sum(p == label for p, label in confident) / max(1, len(confident)):.1%}")
+
+    # Coverage: paraphrases meant for a command that the dispatcher sends to the right handler
+    for use_classifier in (False, True):
+        routed = [(routed_by(t, use_classifier), label) for t, label in para]
+        hits = sum(r == label for r, label in routed if label != UNKNOWN)
+        wrong = sum(r not in (None, label) for r, label in routed if label != UNKNOWN)
+        leaked = sum(r is not None for r, label in routed if label == UNKNOWN)
+        print(f"{'router + classifier' if use_classifier else 'router only':<20} routed {hits}/{sum(label != UNKNOWN for _, label in para)} "
+              f"paraphrased commands, {wrong} to the wrong handler, {leaked} questions taken from the LLM")
+
+    # Latency
+    samples = []
+    for text in texts:
+        t0 = time.perf_counter()
+        model.classify(text)
+        samples.append(time.perf_counter() - t0)
+    samples.sort()
+    p95 = samples[int(0.95 * (len(samples) - 1))]
+    print(f"classify(): p50 {statistics.median(samples) * 1e6:.0f} µs, p95 {p95 * 1e6:.0f} µs")
+    t0 = time.perf_counter()
+    for i in range(0, len(texts), args.batch):
+        model.classify_batch(texts[i:i + args.batch])
+    elapsed = time.perf_counter() - t0
+    print(f"classify_batch({args.batch}): {len(texts) / elapsed:,.0f} utterances/s")
+
+
+if __name__ == "__main__":
+    main()
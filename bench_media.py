@@ -0,0 +1,143 @@
+# bench_media.py
+"""
+Music library benchmark on a synthetic Artist/Album/NN - Title.ext tree
+(empty files, so tags come from the path; with --tag-delay each tag read
+also waits that long, standing in for the disk seeks mutagen would do).
+
+Reports the first scan with 1 vs N tag-reading threads, a rescan of the
+unchanged tree, a rescan after a few albums changed, and per-query latency
+of MediaLibrary.resolve() for the spoken forms the handlers pass it.
+
+    python bench_media.py [--tracks 50000] [--tree DIR] [--tag-delay 0.0005] [--workers 16]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+
+from jarvis_media import MediaLibrary, tags_from_path
+
+WORDS = ("love night heart fire dream city rain summer blue road light gold river home wild "
+         "stone shadow echo sky ocean electric midnight young forever paper silver moon".split())
+EXTS = (".mp3", ".mp3", ".mp3", ".flac", ".m4a", ".ogg")
+
+
+def make_title(rng, n_words) -> str:
+    return " ".join(w.capitalize() for w in rng.sample(WORDS, n_words))
+
+
+def build_tree(root: str, n_tracks: int, seed: int = 0) -> list:
+    """~12 tracks per album, ~4 albums per artist; returns the artist names."""
+    rng = random.Random(seed)
+    artists = []
+    made = 0
+    while made < n_tracks:
+        artist = f"{make_title(rng, 2)} {len(artists)}"
+        artists.append(artist)
+        for a in range(rng.randint(2, 6)):
+            album_dir = os.path.join(root, artist, f"{make_title(rng, rng.randint(1, 3))} {a}")
+            os.makedirs(album_dir, exist_ok=True)
+            for n in range(1, rng.randint(8, 16) + 1):
+                name = f"{n:02d} - {make_title(rng, rng.randint(1, 4))}{rng.choice(EXTS)}"
+                open(os.path.join(album_dir, name), "a").close()
+                made += 1
+    return artists
+
+
+def _ms(values):
+    v = np.array(values) * 1e3
+    return f"p50 {np.percentile(v, 50):6.2f} ms  p95 {np.percentile(v, 95):6.2f} ms  max {v.max():6.2f} ms"
+
+
+def _fresh(db):
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db + suffix):
+            os.remove(db + suffix)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--tracks", type=int, default=50_000)
+    ap.add_argument("--tree", help="where to create/reuse the synthetic tree")
+    ap.add_argument("--tag-delay", type=float, default=0.0005, help="simulated I/O wait per tag read (s)")
+    ap.add_argument("--workers", type=int, default=16)
+    ap.add_argument("--queries", type=int, default=200)
+    args = ap.parse_args()
+
+    base = args.tree or os.path.join(tempfile.gettempdir(), f"jarvis-media-bench-{args.tracks}")
+    root = os.path.join(base, "music")
+    db = os.path.join(base, "media.db")
+    if not os.path.isdir(root):
+        t0 = time.perf_counter()
+        print(f"creating {args.tracks} tracks under {root} ...")
+        build_tree(root, args.tracks)
+        print(f"  {time.perf_counter() - t0:.1f}s")
+
+    def reader(path):
+        if args.tag_delay:
+            time.sleep(args.tag_delay)
+        return tags_from_path(path)
+
+    for workers in (1, args.workers):
+        _fresh(db)
+        lib = MediaLibrary(db, roots=[root], tag_reader=reader, workers=workers)
+        st = lib.scan()
+        print(f"scan  {workers:>2} thread{'s' if workers > 1 else ' '}: {st['seconds']:7.2f}s  "
+              f"{st['added']} tracks (tags {st['tag_seconds']:.2f}s)")
+    st = lib.scan()
+    print(f"rescan unchanged: {st['seconds']:7.2f}s  {st['unchanged']} unchanged, {st['added'] + st['updated']} read")
+
+    rng = random.Random(1)
+    albums = sorted({os.path.dirname(t.path) for t in lib.in_folder(root)})
+    changed = rng.sample(albums, min(5, len(albums)))
+    for i, d in enumerate(changed):
+        open(os.path.join(d, f"99 - Bonus Track {i}.mp3"), "a").close()
+    st = lib.scan()
+    print(f"rescan changed:   {st['seconds']:7.2f}s  +{st['added']} ~{st['updated']} -{st['removed']} "
+          f"after {len(changed)} albums changed")
+    for i, d in enumerate(changed):
+        os.remove(os.path.join(d, f"99 - Bonus Track {i}.mp3"))
+    lib.scan()
+
+    # Fresh process: load the stored library
+    t0 = time.perf_counter()
+    cold = MediaLibrary(db, roots=[root])
+    cold.load()
+    print(f"load from db:     {time.perf_counter() - t0:7.2f}s  {len(cold)} tracks, "
+          f"{cold.stats()['index_keys']} index keys")
+
+    sample = rng.sample(lib.in_folder(root), min(args.queries, len(lib)))
+    requests = {
+        "something by X": [f"play something by {t.artist}" for t in sample],
+        "album X": [f"play the album {t.album}" for t in sample],
+        "song X": [f"play song {t.title}" for t in sample],
+        "X by Y": [f"play {t.title} by {t.artist}" for t in sample],
+        "partial artist": [f"play something by {t.artist.split()[0]}" for t in sample],
+        "no match": ["play something by zebra quartet", "play the album xylophone", "play song qwerty"],
+    }
+    checks = {
+        "something by X": lambda t, r: bool(r) and all(x.artist == t.artist for x in r),
+        "album X": lambda t, r: bool(r) and r[0].album == t.album,
+        "song X": lambda t, r: bool(r) and r[0].title == t.title,
+        "X by Y": lambda t, r: bool(r) and r[0].title == t.title and r[0].artist == t.artist,
+    }
+    for label, reqs in requests.items():
+        times, correct = [], 0
+        for i, req in enumerate(reqs):
+            t0 = time.perf_counter()
+            tracks, _ = lib.resolve(req)
+            times.append(time.perf_counter() - t0)
+            if label in checks and checks[label](sample[i], tracks):
+                correct += 1
+        found = f"  {correct}/{len(reqs)} right" if label in checks else ""
+        print(f"resolve {label:<15} {_ms(times)}{found}")
+
+    if not args.tree:
+        print(f"(tree kept at {base}; delete it with: rm -r {base})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+# bench_proc.py
+"""
+Process-control benchmark: time from "close app" to every instance being
+gone, on a machine with hundreds of processes, for the old shell-out
+(`taskkill /im X.exe /f` via os.system on Windows, `pkill -KILL -x X` elsewhere)
+vs. jarvis_proc (indexed lookup + parallel graceful-then-forced terminate).
+
+Background load is `--background` idle processes; the targets are
+`--instances` copies of a small sleeper started under the name "jbtarget".
+`--stubborn` makes the targets ignore the graceful request, so the close
+goes through the forced-kill path.
+
+    python bench_proc.py [--background 300] [--instances 5] [--runs 5] [--stubborn]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import psutil
+
+from jarvis_proc import ProcessIndex
+
+TARGET = "jbtarget"
+SLEEPER = ("import signal, subprocess, sys, time\n"
+           "if '--stubborn' in sys.argv: signal.signal(signal.SIGTERM, signal.SIG_IGN)\n"
+           "if '--helper' in sys.argv: subprocess.Popen([sys.executable, sys.argv[0]])\n"
+           "time.sleep(600)\n")
+
+
+def spawn_background(n: int) -> list:
+    cmd = ["ping", "-n", "100000", "127.0.0.1"] if sys.platform == "win32" else ["sleep", "600"]
+    return [subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) for _ in range(n)]
+
+
+def target_exe(tmp: str) -> str:
+    """A copy of the Python interpreter named jbtarget, so the targets have their own process name."""
+    ext = ".exe" if sys.platform == "win32" else ""
+    exe = os.path.join(tmp, TARGET + ext)
+    shutil.copy(sys.executable, exe)
+    if sys.platform == "win32":  # the copied python.exe needs its DLLs next to it
+        for name in os.listdir(os.path.dirname(sys.executable)):
+            if name.lower().endswith(".dll"):
+                shutil.copy(os.path.join(os.path.dirname(sys.executable), name), tmp)
+    return exe
+
+
+def spawn_targets(exe: str, script: str, k: int, stubborn: bool, index: ProcessIndex | None = None,
+                  helper: bool = False) -> list:
+    """
+    Starts `k` targets; with `index`, they are tracked as user apps (as if
+    Jarvis had launched them). With `helper` each starts a child of the same
+    name, like a browser's renderer processes.
+    """
+    args = [exe, script] + (["--stubborn"] if stubborn else []) + (["--helper"] if helper else [])
+    procs = [subprocess.Popen(args) for _ in range(k)]
+    for p in procs if index is not None else ():
+        index.track(p.pid)
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:  # wait until all of them show up under the target name
+        names = {p.pid: _name(p.pid) for p in procs}
+        if all(n and n.lower().startswith(TARGET) for n in names.values()):
+            time.sleep(0.2)           # let the interpreters reach their sleep (and install the handler)
+            return procs
+        time.sleep(0.02)
+    raise RuntimeError("targets did not start")
+
+
+def _name(pid):
+    try:
+        return psutil.Process(pid).name()
+    except psutil.Error:
+        return None
+
+
+def wait_gone(procs: list, t0: float, timeout: float = 30.0) -> float:
+    """Seconds from t0 until every target has exited (reaped through its Popen)."""
+    deadline = t0 + timeout
+    while any(p.poll() is None for p in procs):
+        if time.perf_counter() > deadline:
+            raise RuntimeError("targets survived")
+        time.sleep(0.001)
+    return time.perf_counter() - t0
+
+
+def check_guards(index: ProcessIndex, exe: str, script: str) -> int:
+    """
+    close() must leave Jarvis's own children alone, and only report (not
+    close) several instances, or a misheard name's closest match, until
+    confirmed; one instance with a helper process of the same name closes
+    without confirmation. Returns the failed checks.
+    """
+    failures = 0
+    guess = spawn_targets(exe, script, 1, False, index)
+    report = index.close(TARGET[:-1] + "d", timeout=1.0)  # "jbtarged": fuzzy match only
+    if report is None or report.pending != [guess[0].pid] or guess[0].poll() is not None:
+        failures += 1
+        print(f"  fuzzy match, unconfirmed: {report}")
+    guess[0].kill()
+    guess[0].wait()
+    index.refresh()
+    helper = spawn_targets(exe, script, 1, False)  # a child close() wasn't told about, like the LLM worker
+    report = index.close(TARGET, timeout=1.0, confirmed=True)
+    if helper[0].poll() is not None or (report and report.closed):
+        failures += 1
+        print("  own child: closed")
+    apps = spawn_targets(exe, script, 2, False, index)
+    report = index.close(TARGET, timeout=1.0)
+    if report is None or sorted(report.pending) != sorted(p.pid for p in apps) or report.closed:
+        failures += 1
+        print(f"  two instances, unconfirmed: {report}")
+    report = index.close(TARGET, timeout=1.0, confirmed=True)
+    if any(p.poll() is None for p in apps) or helper[0].poll() is not None:
+        failures += 1
+        print(f"  two instances, confirmed: {report}")
+    tree = spawn_targets(exe, script, 1, False, index, helper=True)
+    time.sleep(0.5)  # the helper child starts after the target is up
+    index.refresh()
+    report = index.close(TARGET, timeout=1.0)
+    if report is None or report.pending or tree[0].poll() is None:
+        failures += 1
+        print(f"  one instance with a helper, unconfirmed: {report}")
+    for p in helper + apps + tree:
+        p.kill()
+        p.wait()
+    return failures
+
+
+def close_shell():
+    if sys.platform == "win32":
+        os.system(f"taskkill /im {TARGET}.exe /f >NUL 2>&1")
+    else:
+        os.system(f"pkill -KILL -x {TARGET} >/dev/null 2>&1")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--background", type=int, default=300, help="idle processes to add to the process table")
+    ap.add_argument("--instances", type=int, default=5, help="instances of the app to close")
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--stubborn", action="store_true", help="targets ignore the graceful request")
+    args = ap.parse_args()
+
+    background = spawn_background(args.background)
+    index = ProcessIndex().start()
+    times = {"shell": [], "index": []}
+    targets = []
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            exe = target_exe(tmp)
+            script = os.path.join(tmp, "sleeper.py")
+            with open(script, "w") as f:
+                f.write(SLEEPER)
+            refresh = index.refresh()
+            print(f"{refresh['processes']} processes; full index build {refresh['seconds'] * 1e3:.1f} ms")
+            failures = check_guards(index, exe, script)
+            print(f"close guards: {'ok' if not failures else f'{failures} checks failed'}")
+
+            for _ in range(args.runs):
+                for mode in ("shell", "index"):
+                    targets = spawn_targets(exe, script, args.instances, args.stubborn, index)
+                    t0 = time.perf_counter()
+                    if mode == "shell":
+                        close_shell()
+                    else:
+                        report = index.close(TARGET, timeout=1.0, confirmed=True)
+                    times[mode].append(wait_gone(targets, t0))
+            inc = index.refresh()
+    finally:
+        index.stop()
+        for p in background + targets:
+            p.kill()
+        for p in background + targets:
+            p.wait()
+
+    print(f"incremental refresh: {inc['seconds'] * 1e3:.2f} ms\n")
+    print(f"{args.instances} instances{' (ignoring SIGTERM)' if args.stubborn else ''}, {args.runs} runs")
+    shell = "taskkill /f (os.system)" if sys.platform == "win32" else "pkill -KILL (os.system)"
+    for label, key in ((shell, "shell"), ("ProcessIndex.close", "index")):
+        t = times[key]
+        print(f"  {label:<26} median {statistics.median(t) * 1e3:7.1f} ms   max {max(t) * 1e3:7.1f} ms")
+    print(f"last close: {len(report.closed)} exited on request, {len(report.killed)} killed, "
+          f"{len(report.survivors)} survived")
+    print("(the shell-out kills without asking; ProcessIndex.close asks first and only kills what stays)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+# bench_recorder.py
+"""
+Screen-recorder benchmark with a synthetic frame source in place of mss.
+
+Runs the old single-threaded grab → convert → encode loop and the pipelined
+ScreenRecorder on the same source, then checks what matters for playback:
+does the file hold duration × fps frames (plays back at wall-clock speed),
+how many distinct pictures made it in, and how deep the queues got. The
+pipeline also runs with static-frame dedupe and with a downscaled output;
+CPU seconds (process time) and bytes written are normalised per recorded
+minute so the savings compare directly. Before that, it checks that a
+failing writer makes the pipeline raise instead of hanging.
+
+    python bench_recorder.py [--duration 5] [--fps 15] [--size 2560x1440]
+                             [--grab-cost 0.02] [--change-every 10] [--scale 0.5]
+                             [--policy drop_oldest] [--writer cv2|null]
+"""
+import argparse
+import os
+import tempfile
+import time
+from threading import Thread
+
+import cv2
+
+from jarvis_recorder import DROP_NEWEST, DROP_OLDEST, BLOCK, ScreenRecorder, SyntheticSource, _cv2_writer
+
+
+class NullWriter:
+    """Counts frames instead of encoding them."""
+
+    def __init__(self, path, fps, size):
+        self.frames = 0
+
+    def write(self, frame):
+        self.frames += 1
+
+    def release(self):
+        pass
+
+
+def legacy_record(source, duration: float, fps: float, writer_factory, path: str) -> dict:
+    """The pre-pipeline record_screen loop, with the source/writer swapped in."""
+    w, h = source.size
+    writer = writer_factory(path, fps, (w, h))
+    source.open()
+    end_time = time.time() + duration
+    interval = 1.0 / fps
+    frame_count = 0
+    while time.time() < end_time:
+        start = time.time()
+        img = source.grab()
+        frame = cv2.cvtColor(img, cv2.COLOR_BGRA2BGR)
+        writer.write(frame)
+        frame_count += 1
+        elapsed = time.time() - start
+        if elapsed < interval:
+            time.sleep(interval - elapsed)
+    writer.release()
+    source.close()
+    return {"written": frame_count, "duplicated": 0, "dropped": 0, "capture_fps": frame_count / duration,
+            "max_queue_depth": 0, "avg_queue_depth": 0.0,
+            "bytes_written": os.path.getsize(path) if os.path.exists(path) else 0}
+
+
+class FailingWriter(NullWriter):
+    """Raises on the `fail_at`-th write (0: already when created), like a full disk or a missing codec."""
+
+    def __init__(self, path, fps, size, fail_at: int = 0):
+        if not fail_at:
+            raise OSError("writer failed to open")
+        super().__init__(path, fps, size)
+        self.fail_at = fail_at
+
+    def write(self, frame):
+        super().write(frame)
+        if self.frames >= self.fail_at:
+            raise OSError("writer failed mid-recording")
+
+
+def check_failures(width: int, height: int, fps: float, timeout: float = 5.0) -> int:
+    """
+    A failing writer must make record() raise promptly under every drop
+    policy instead of leaving the other stages blocked on full queues.
+    Returns the number of cases that hung or swallowed the error.
+    """
+    failures = 0
+    for policy in (DROP_OLDEST, DROP_NEWEST, BLOCK):
+        for fail_at in (0, 3):
+            source = SyntheticSource(width, height, grab_cost=0.0, change_every=1)
+            recorder = ScreenRecorder(source, fps, queue_size=2, drop_policy=policy, dedupe=False,
+                                      writer_factory=lambda path, f, size: FailingWriter(path, f, size, fail_at))
+            outcome = []
+
+            def run():
+                try:
+                    recorder.record(60, os.devnull)
+                    outcome.append(None)
+                except OSError as e:
+                    outcome.append(e)
+
+            t = Thread(target=run, daemon=True)
+            t.start()
+            t.join(timeout)
+            if t.is_alive() or not outcome or outcome[0] is None:
+                failures += 1
+                state = "hung" if t.is_alive() else "no error raised"
+                print(f"  failing writer ({policy}, fail_at={fail_at}): {state}")
+    return failures
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--duration", type=float, default=5)
+    ap.add_argument("--fps", type=float, default=15)
+    ap.add_argument("--size", default="2560x1440", help="WIDTHxHEIGHT of the synthetic desktop")
+    ap.add_argument("--grab-cost", type=float, default=0.02, help="simulated seconds per screen grab")
+    ap.add_argument("--change-every", type=int, default=10, help="the picture changes every N grabs (1 = always)")
+    ap.add_argument("--scale", type=float, default=0.5, help="output scale for the downscaled run")
+    ap.add_argument("--policy", default=DROP_OLDEST, choices=[DROP_OLDEST, DROP_NEWEST, BLOCK])
+    ap.add_argument("--writer", default="cv2", choices=["cv2", "null"])
+    args = ap.parse_args()
+
+    width, height = (int(v) for v in args.size.lower().split("x"))
+    writer_factory = _cv2_writer if args.writer == "cv2" else NullWriter
+    expected = int(round(args.duration * args.fps))
+    print(f"{width}x{height} @ {args.fps} fps for {args.duration}s → expect {expected} frames "
+          f"(grab cost {args.grab_cost * 1e3:.0f} ms, changes every {args.change_every} grabs, "
+          f"writer {args.writer}, policy {args.policy})")
+    failures = check_failures(640, 360, args.fps)
+    print(f"failing writer: {'ok' if not failures else f'{failures} cases hung or lost the error'}")
+    print(f"{'path':<16}{'frames':>8}{'playback s':>12}{'unique fps':>12}{'repeated':>10}{'dropped':>9}"
+          f"{'max q':>7}{'CPU s/min':>11}{'MB/min':>9}{'wall s':>8}")
+
+    def pipeline(**kwargs):
+        return lambda src, path: ScreenRecorder(src, args.fps, drop_policy=args.policy, writer_factory=writer_factory,
+                                                **kwargs).record(args.duration, path)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        runs = [
+            ("legacy", lambda src, path: legacy_record(src, args.duration, args.fps, writer_factory, path)),
+            ("pipeline", pipeline(dedupe=False)),
+            ("+dedupe", pipeline(dedupe=True)),
+            (f"+dedupe x{args.scale:g}", pipeline(dedupe=True, scale=args.scale)),
+        ]
+        for name, run in runs:
+            source = SyntheticSource(width, height, grab_cost=args.grab_cost, change_every=args.change_every)
+            cpu0, t0 = time.process_time(), time.perf_counter()
+            st = run(source, os.path.join(tmp, f"{len(name)}_{name.strip('+')}.mp4"))
+            wall = time.perf_counter() - t0
+            cpu = time.process_time() - cpu0
+            minutes = st["written"] / args.fps / 60 or 1
+            unique = st["written"] - st["duplicated"]
+            print(f"{name:<16}{st['written']:>8}{st['written'] / args.fps:>12.2f}{unique / args.duration:>12.1f}"
+                  f"{st['duplicated']:>10}{st['dropped']:>9}{st['max_queue_depth']:>7}"
+                  f"{cpu / minutes:>11.1f}{st['bytes_written'] / minutes / 1e6:>9.2f}{wall:>8.2f}")
+
+if __name__ == "__main__":
+    main()
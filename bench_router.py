@@ -0,0 +1,200 @@
+# bench_router.py
+"""
+Dispatch benchmark: compiled CommandRouter vs the old linear if/regex chain.
+
+Only *matching* is timed — no handler runs, nothing is spoken or launched.
+
+    python bench_router.py [--n 10000] [--seed 0]
+"""
+import argparse
+import random
+import re
+import time
+from collections import defaultdict
+
+from jarvis_core import router
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Utterance corpus
+_TEMPLATES = [
+    "type hello world on notepad", "type meeting notes on code", "type good morning team",
+    "open app notepad", "launch app calculator", "close app chrome",
+    "minimize window", "maximize window", "open browser",
+    "search web for the latest python news", "open recycle bin", "open my computer",
+    "open chat", "open google", "open instagram", "open linkedin", "open youtube",
+    "create folder projects", "delete folder old stuff", "delete file notes.txt",
+    "open file report.pdf", "find file budget in documents",
+    "play music from music", "play", "next song", "previous track",
+    "set volume to 40", "mute", "unmute", "volume up", "volume down",
+    "take a screenshot", "record screen for 20 seconds", "start recording",
+    "what time is it", "what date is it today", "battery status", "cpu usage",
+    "memory usage", "what is my ip address", "system info",
+    "shutdown the computer", "restart now", "cancel shutdown", "cancel restart",
+    "lock screen", "hello", "hey how are you", "tell me a joke", "goodbye",
+    # falls through to the LLM
+    "what is the capital of france", "explain quantum computing simply",
+    "who won the world cup in 2018", "write a haiku about autumn",
+]
+
+
+def build_corpus(n: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    return [rng.choice(_TEMPLATES) for _ in range(n)]
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Legacy matcher: the pre-registry handle_command chain, with the side effects
+# stripped so only the dispatch decision is timed. Keywords lists are rebuilt
+# per call, exactly as before.
+def legacy_match(cmd: str) -> str | None:
+    text = cmd.lower()
+    if any(g in text for g in ("hi", "hello", "hey", "good morning", "good afternoon", "good evening")):
+        return "greeting"
+    if "how are you" in text or "how's it going" in text:
+        return "how_are_you"
+    if "joke" in text or "tell me a joke" in text:
+        return "joke"
+    if re.match(r"type (.+) on (browser|notepad|word|code)", cmd):
+        return "type_on_app"
+    if re.match(r"type (.+)", cmd):
+        return "type"
+    if re.match(r"(?:open|launch) app (.+)", cmd):
+        return "open_app"
+    if re.match(r"close app (.+)", cmd):
+        return "close_app"
+    if re.match(r"(?:minimize|maximize) window", cmd):
+        return "window"
+    if re.match(r"open browser", cmd):
+        return "open_browser"
+    if re.match(r"search web for (.+)", cmd):
+        return "search_web"
+    if "recycle bin" in cmd:
+        return "recycle_bin"
+    if "my computer" in cmd or re.match(r"open (?:my )?computer", cmd):
+        return "my_computer"
+    if "open chat" in cmd:
+        return "site_chat"
+    elif "open google" in cmd:
+        return "site_google"
+    elif "open insta" in cmd:
+        return "site_insta"
+    elif "linkedin" in cmd:
+        return "site_linkedin"
+    elif "open youtube" in cmd:
+        return "site_youtube"
+    if re.match(r"create folder (.+)", cmd):
+        return "create_folder"
+    if re.match(r"delete folder (.+)", cmd):
+        return "delete_folder"
+    if re.match(r"delete file (.+)", cmd):
+        return "delete_file"
+    if re.match(r"open file (.+)", cmd):
+        return "open_file"
+    if re.match(r"find file (.+) in (.+)", cmd):
+        return "find_file"
+    if re.match(r"play music from (.+)", cmd):
+        return "play_music_from"
+    if "play" in cmd:
+        return "play_pause"
+    if "next" in cmd:
+        return "next_track"
+    if "previous" in cmd:
+        return "previous_track"
+    if re.match(r"set volume to (\d+)", cmd):
+        return "set_volume"
+    if "mute" in cmd:
+        return "mute"
+    if "unmute" in cmd:
+        return "unmute"
+    if "volume up" in cmd:
+        return "volume_up"
+    if "volume down" in cmd:
+        return "volume_down"
+    if "screenshot" in cmd:
+        return "screenshot"
+    if any(phrase in cmd for phrase in ["record screen", "start recording", "capture screen", "screen capture", "record video", "start record"]):
+        return "record_screen"
+    if "what time" in cmd:
+        return "time"
+    if "what date" in cmd:
+        return "date"
+    if "battery" in cmd:
+        return "battery"
+    if "cpu usage" in cmd:
+        return "cpu_usage"
+    if "memory usage" in cmd:
+        return "memory_usage"
+    if "ip address" in cmd:
+        return "ip_address"
+    if "system info" in cmd:
+        return "system_info"
+    shutdown_keywords = ["shutdown", "shut down", "power off"]
+    restart_keywords  = ["restart", "reboot"]
+    cancel_keywords   = ["cancel shutdown", "abort shutdown", "stop shutdown", "cancel restart", "abort restart", "stop restart"]
+    lock_keywords     = ["lock workstation", "lock screen"]
+    if any(kw in cmd for kw in shutdown_keywords):
+        return "shutdown"
+    if any(kw in cmd for kw in restart_keywords):
+        return "restart"
+    if any(kw in cmd for kw in cancel_keywords):
+        return "cancel_shutdown"
+    if any(kw in cmd for kw in lock_keywords):
+        return "lock"
+    if any(k in cmd for k in ("exit", "quit", "goodbye")):
+        return "exit"
+    return None
+
+
+def router_match(cmd: str) -> str | None:
+    found = router.match(cmd)
+    return found[0].name if found else None
+
+# ──────────────────────────────────────────────────────────────────────────────
+def _run(match_fn, corpus):
+    """Returns (total_seconds, {utterance: winner})."""
+    decisions = {}
+    t0 = time.perf_counter()
+    for utt in corpus:
+        decisions[utt] = match_fn(utt)
+    return time.perf_counter() - t0, decisions
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--n", type=int, default=10_000, help="corpus size")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    corpus = build_corpus(args.n, args.seed)
+    # warm both paths (re's compile cache, router.compile)
+    for utt in _TEMPLATES:
+        legacy_match(utt)
+        router_match(utt)
+
+    legacy_total, legacy_dec = _run(legacy_match, corpus)
+    compiled_total, compiled_dec = _run(router_match, corpus)
+
+    print(f"Commands registered: {len(router.commands)}   utterances: {len(corpus)}")
+    print(f"Total   legacy {legacy_total * 1e3:9.2f} ms   router {compiled_total * 1e3:9.2f} ms   "
+          f"speed-up x{legacy_total / compiled_total:.2f}")
+    print()
+    print(f"{'command (router winner)':<24}{'n':>6}{'legacy µs':>12}{'router µs':>12}")
+    # time each utterance group under both implementations, keyed by the router's decision
+    groups = defaultdict(list)
+    for utt in corpus:
+        groups[compiled_dec[utt] or "<llm>"].append(utt)
+    for name in sorted(groups):
+        utts = groups[name]
+        t_old, _ = _run(legacy_match, utts)
+        t_new, _ = _run(router_match, utts)
+        print(f"{name:<24}{len(utts):>6}{1e6 * t_old / len(utts):>12.2f}{1e6 * t_new / len(utts):>12.2f}")
+
+    changed = sorted(u for u in set(corpus) if legacy_dec[u] != compiled_dec[u])
+    if changed:
+        print()
+        print("Dispatch decisions that changed (legacy → router):")
+        for utt in changed:
+            print(f"  {utt!r}: {legacy_dec[utt]} → {compiled_dec[utt]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# bench_startup.py
+"""
+Startup-timing report.
+
+1. Import breakdown: runs `python -X importtime -c "import jarvis_entry"` in a
+   fresh interpreter and lists the slowest modules (self and cumulative).
+2. Launch → listening: runs `jarvis_entry.py` with JARVIS_STARTUP_REPORT=exit,
+   which prints the startup timeline and exits as soon as the main loop is
+   about to wait for the wake word. Needs the real mic / Porcupine setup.
+
+    python bench_startup.py [--top 25] [--runs 3] [--skip-listen]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def import_breakdown(module: str = "jarvis_entry") -> list:
+    """Returns [(cumulative_us, self_us, name), ...] from -X importtime."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=HERE, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        tail = proc.stderr.strip().splitlines()[-1:] or ["(no output)"]
+        raise RuntimeError(f"import {module} failed: {tail[0]}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        # "import time:   self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        try:
+            self_us, cum_us, name = line[len("import time:"):].split("|", 2)
+            rows.append((int(cum_us), int(self_us), name.rstrip()))
+        except ValueError:
+            continue
+    return rows
+
+
+def time_to_listening(runs: int) -> list:
+    env = dict(os.environ, JARVIS_STARTUP_REPORT="exit", JARVIS_WARMUP="0")
+    walls = []
+    for i in range(runs):
+        t0 = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "jarvis_entry.py"], cwd=HERE, env=env, capture_output=True, text=True,
+        )
+        wall = time.perf_counter() - t0
+        if proc.returncode != 0:
+            print(proc.stdout)
+            print(proc.stderr)
+            raise RuntimeError("jarvis_entry.py did not reach the listening state")
+        walls.append(wall)
+        print(f"-- run {i + 1}: {wall:.3f}s wall clock")
+        for line in proc.stdout.splitlines():
+            if line.startswith("[Startup]") or line.startswith("  "):
+                print(line)
+    return walls
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--top", type=int, default=25, help="modules to list")
+    ap.add_argument("--runs", type=int, default=3, help="launch → listening runs")
+    ap.add_argument("--skip-listen", action="store_true", help="only report the import breakdown")
+    args = ap.parse_args()
+
+    rows = import_breakdown()
+    total = max(rows)[0] if rows else 0
+    print(f"== import jarvis_entry: {total / 1e3:.1f} ms cumulative ==")
+    print(f"{'cumulative ms':>14}{'self ms':>10}  module")
+    for cum, own, name in sorted(rows, reverse=True)[:args.top]:
+        print(f"{cum / 1e3:>14.1f}{own / 1e3:>10.1f}  {name}")
+
+    if args.skip_listen:
+        return
+    print()
+    print("== launch → listening ==")
+    walls = time_to_listening(args.runs)
+    print(f"median {statistics.median(walls):.3f}s   min {min(walls):.3f}s   max {max(walls):.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# bench_stt.py
+"""
+STT backend benchmark over a directory of WAV fixtures.
+
+Every `<name>.wav` (16-bit mono) needs a `<name>.txt` reference transcript.
+Audio is fed in 512-sample frames, as the capture bus delivers it; for each
+backend the report gives
+
+  RTF       processing time / audio duration (lower is better, <1 = faster than real time)
+  finish    time spent in finish(), i.e. latency left after end of speech
+  WER       word error rate against the reference
+
+    python bench_stt.py fixtures/ [--backends google,vosk]
+"""
+import argparse
+import glob
+import os
+import re
+import time
+import wave
+
+from jarvis_stt import STTError, get_backend
+
+FRAME_LENGTH = 512
+
+
+def load_fixtures(folder: str) -> list:
+    fixtures = []
+    for wav_path in sorted(glob.glob(os.path.join(folder, "*.wav"))):
+        txt_path = os.path.splitext(wav_path)[0] + ".txt"
+        if not os.path.exists(txt_path):
+            print(f"skipping {wav_path}: no {os.path.basename(txt_path)}")
+            continue
+        with wave.open(wav_path, "rb") as wf:
+            if wf.getnchannels() != 1 or wf.getsampwidth() != 2:
+                print(f"skipping {wav_path}: need 16-bit mono")
+                continue
+            rate = wf.getframerate()
+            pcm = wf.readframes(wf.getnframes())
+        with open(txt_path, encoding="utf-8") as f:
+            ref = f.read()
+        fixtures.append((os.path.basename(wav_path), pcm, rate, ref))
+    return fixtures
+
+
+def _words(text: str) -> list:
+    return re.sub(r"[^\w\s']", " ", text.lower()).split()
+
+
+def word_errors(ref: str, hyp: str) -> tuple[int, int]:
+    """(edit distance in words, reference length)."""
+    r, h = _words(ref), _words(hyp)
+    prev = list(range(len(h) + 1))
+    for i, rw in enumerate(r, 1):
+        cur = [i] + [0] * len(h)
+        for j, hw in enumerate(h, 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (rw != hw))
+        prev = cur
+    return prev[-1], len(r)
+
+
+def run_backend(backend, fixtures):
+    rows = []
+    step = FRAME_LENGTH * 2  # bytes per frame
+    for name, pcm, rate, ref in fixtures:
+        t0 = time.perf_counter()
+        backend.start(rate)
+        for off in range(0, len(pcm), step):
+            backend.accept(pcm[off:off + step])
+        t_fin = time.perf_counter()
+        hyp = backend.finish()
+        t1 = time.perf_counter()
+        errors, n_ref = word_errors(ref, hyp)
+        rows.append((name, len(pcm) / 2 / rate, t1 - t0, t1 - t_fin, errors, n_ref, hyp))
+    return rows
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("folder")
+    ap.add_argument("--backends", default="google,vosk", help="comma-separated backend names")
+    ap.add_argument("--verbose", action="store_true", help="print every hypothesis")
+    args = ap.parse_args()
+
+    fixtures = load_fixtures(args.folder)
+    if not fixtures:
+        raise SystemExit(f"no usable fixtures in {args.folder}")
+    total_audio = sum(len(pcm) / 2 / rate for _, pcm, rate, _ in fixtures)
+    print(f"{len(fixtures)} fixtures, {total_audio:.1f}s of audio")
+    print(f"{'backend':<10}{'RTF':>8}{'finish p50 ms':>15}{'finish max ms':>15}{'WER':>8}")
+
+    for name in args.backends.split(","):
+        try:
+            backend = get_backend(name)
+        except STTError as e:
+            print(f"{name:<10} unavailable: {e}")
+            continue
+        try:
+            rows = run_backend(backend, fixtures)
+        except STTError as e:
+            print(f"{name:<10} failed: {e}")
+            continue
+        audio = sum(r[1] for r in rows)
+        proc = sum(r[2] for r in rows)
+        finishes = sorted(r[3] for r in rows)
+        errors = sum(r[4] for r in rows)
+        n_ref = sum(r[5] for r in rows) or 1
+        print(f"{name:<10}{proc / audio:>8.3f}{finishes[len(finishes) // 2] * 1e3:>15.0f}"
+              f"{finishes[-1] * 1e3:>15.0f}{errors / n_ref:>8.1%}")
+        if args.verbose:
+            for fixture, _, _, _, err, n, hyp in rows:
+                print(f"    {fixture}: {err}/{n} errors → {hyp!r}")
+
+
+if __name__ == "__main__":
+    main()
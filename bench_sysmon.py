@@ -0,0 +1,121 @@
+# bench_sysmon.py
+"""
+System-metrics sampler benchmark: what the background sampler costs, and
+how fast the spoken queries are answered from its ring buffers compared
+with asking psutil directly.
+
+    python bench_sysmon.py [--seconds 10] [--interval 1] [--queries 10000]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+import psutil
+
+from jarvis_sysmon import FakeSource, Proc, SystemMonitor
+
+
+def timed(fn, n: int) -> float:
+    """Median seconds per call."""
+    samples = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return statistics.median(samples)
+
+
+def check_first_reading(interval: float = 0.5) -> int:
+    """
+    With one core kept busy, the very first readings after `ready` must
+    already show the load: total CPU above zero, and the busy process in
+    the top list with a non-zero share. Returns the number of failed checks.
+    """
+    busy = subprocess.Popen([sys.executable, "-c", "while True: pass"])
+    failures = 0
+    try:
+        time.sleep(0.2)  # let the interpreter start spinning
+        monitor = SystemMonitor(interval=interval, proc_interval=interval).start()
+        try:
+            if not monitor.ready.wait(interval * 4):
+                print("  first reading: never ready")
+                return 1
+            cpu, cores = monitor.cpu(), monitor.per_core()
+            top = {p.pid: p.cpu for p in monitor.top_processes(monitor.top_n)}
+        finally:
+            monitor.stop()
+        if not cpu > 0 or not max(cores) > 0:
+            failures += 1
+            print(f"  first reading under load: cpu {cpu}, busiest core {max(cores)}")
+        if not top.get(busy.pid):
+            failures += 1
+            print(f"  first process sample: busy pid {busy.pid} reported as {top.get(busy.pid)}")
+    finally:
+        busy.kill()
+        busy.wait()
+    return failures
+
+
+def check_idle_excluded() -> int:
+    """Windows' System Idle Process (pid 0) must not show up as the busiest process. Returns failed checks."""
+    procs = [Proc(0, "System Idle Process", 95.0, 8192), Proc(4, "System", 0.5, 2**20),
+             Proc(1234, "chrome.exe", 3.0, 2**28)]
+    monitor = SystemMonitor(FakeSource(processes=procs))
+    monitor.sample_once(now=0.0)
+    top = [p.name for p in monitor.top_processes(3)]
+    if top[:1] != ["chrome.exe"] or "System Idle Process" in top:
+        print(f"  idle process: top by cpu is {top}")
+        return 1
+    return 0
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--seconds", type=float, default=10.0, help="how long to run the live sampler")
+    ap.add_argument("--interval", type=float, default=1.0)
+    ap.add_argument("--queries", type=int, default=10000)
+    args = ap.parse_args()
+
+    failures = check_first_reading()
+    print(f"first reading under load: {'ok' if not failures else f'{failures} checks failed'}")
+    print(f"idle process excluded: {'ok' if not check_idle_excluded() else 'FAILED'}")
+
+    # Sampler cost on the live system (including the process list every 5 s)
+    monitor = SystemMonitor(interval=args.interval)
+    cpu0 = time.process_time()
+    monitor.start()
+    time.sleep(args.seconds)
+    monitor.stop()
+    cpu_used = time.process_time() - cpu0
+    s = monitor.stats()
+    print(f"live sampler: {s['samples']} samples over {args.seconds:.0f}s, {len(psutil.pids())} processes; "
+          f"{s['mean_sample_ms']:.2f} ms per sample, {s['overhead_percent']:.3f}% of wall time, "
+          f"{cpu_used / args.seconds * 100:.3f}% of one core")
+
+    # Query latency from a full buffer (ten minutes of one-second samples)
+    full = SystemMonitor(FakeSource(cores=psutil.cpu_count() or 4, cpu=lambda i: i % 100), interval=1.0, history=600)
+    for i in range(1200):
+        full.sample_once(now=float(i))
+    n = args.queries
+    print("\nquery                          buffer µs    psutil µs")
+    rows = [
+        ("cpu now", lambda: full.cpu(), lambda: psutil.cpu_percent(interval=None)),
+        ("cpu over the last minute", lambda: full.cpu(60), None),
+        ("per core, last minute", lambda: full.per_core(60), lambda: psutil.cpu_percent(interval=None, percpu=True)),
+        ("memory", lambda: full.memory(), lambda: psutil.virtual_memory().percent),
+        ("top 3 processes by memory", lambda: full.top_processes(3, "memory"),
+         lambda: sorted(psutil.process_iter(["memory_info"]),
+                        key=lambda p: p.info["memory_info"].rss if p.info["memory_info"] else 0)[-3:]),
+    ]
+    for name, buffered, direct in rows:
+        b = timed(buffered, n) * 1e6
+        d = f"{timed(direct, max(1, n // 100)) * 1e6:12.1f}" if direct else "         n/a"
+        print(f"  {name:<28}{b:>10.1f} {d}")
+    print("(psutil.cpu_percent(interval=None) only measures since its previous caller; "
+          "a meaningful direct reading needs interval > 0, e.g. 100 ms of waiting)")
+
+
+if __name__ == "__main__":
+    main()
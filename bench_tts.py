@@ -0,0 +1,146 @@
+# bench_tts.py
+"""
+Speech latency benchmark: time from speak() to the first audible sample,
+live synthesis vs the pre-rendered phrase cache (jarvis_phrases).
+
+Each phrase goes through a SpeechWorker exactly as jarvis_core.speak() uses
+it; latency is Utterance.first_audio_at - Utterance.queued_at.
+
+    python bench_tts.py                      # SAPI + sounddevice (Windows)
+    python bench_tts.py --simulated          # headless: modelled synth latency + fake audio stream
+        [--synth-latency 0.15] [--repeats 5] [--cache-dir DIR]
+"""
+import argparse
+import shutil
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from jarvis_phrases import CachingBackend, PcmPlayer, PhraseCache
+from jarvis_tts import SpeechWorker, TTSBackend, get_backend
+
+PHRASES = [
+    "How can I help you?",
+    "Hello there!",
+    "I'm doing great, thanks! How can I assist you?",
+    "Why did the computer show up at work late? It had a hard drive!",
+    "Volume up",
+    "Toggled play/pause",
+    "Sorry, I couldn't understand.",
+    "Opening default browser.",
+]
+
+
+class SimulatedBackend(TTSBackend):
+    """Live synthesis that takes `latency` seconds to produce sound; renders a tone per word."""
+
+    name = "simulated"
+
+    def __init__(self, latency: float = 0.15):
+        self.latency = latency
+
+    def say(self, text, cancelled):
+        if cancelled.wait(self.latency):
+            return False
+        self.first_audio_at = time.perf_counter()
+        return True
+
+    def render(self, text):
+        time.sleep(self.latency)
+        rate = 22050
+        t = np.arange(int(rate * 0.25 * len(text.split()))) / rate
+        return (np.sin(2 * np.pi * 220 * t) * 8000).astype(np.int16), rate
+
+
+class _FakeStream:
+    """Drives a PcmPlayer callback from a thread, like a PortAudio stream with `blocksize` frames."""
+
+    def __init__(self, samplerate, callback, blocksize=256, latency=0.01):
+        self.samplerate, self.callback, self.blocksize, self.latency = samplerate, callback, blocksize, latency
+        self._stop = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def _run(self):
+        out = np.zeros((self.blocksize, 1), dtype=np.float32)
+        period = self.blocksize / self.samplerate
+        next_t = time.perf_counter()
+        while not self._stop.is_set():
+            self.callback(out, self.blocksize, None, None)
+            next_t += period
+            time.sleep(max(0.0, next_t - time.perf_counter()))
+
+    def close(self):
+        self._stop.set()
+
+
+class SimulatedPlayer(PcmPlayer):
+    def _ensure_stream(self, sample_rate):
+        if self._stream is None:
+            self._stream = _FakeStream(sample_rate, self._callback)
+            self._stream.start()
+            self._rate = sample_rate
+
+
+def measure(worker: SpeechWorker, phrases, repeats: int) -> list:
+    latencies = []
+    for _ in range(repeats):
+        for text in phrases:
+            utt = worker.say(text)
+            utt.wait()
+            if utt.first_audio_at is not None:
+                latencies.append(utt.first_audio_at - utt.queued_at)
+    return latencies
+
+
+def _row(name, lat):
+    ms = np.percentile(np.array(lat) * 1e3, [50, 95, 100]) if lat else [float("nan")] * 3
+    print(f"{name:<10}{len(lat):>8}{ms[0]:>10.1f}{ms[1]:>10.1f}{ms[2]:>10.1f}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--simulated", action="store_true", help="no SAPI/audio device needed")
+    ap.add_argument("--synth-latency", type=float, default=0.15, help="simulated live-synthesis delay (s)")
+    ap.add_argument("--repeats", type=int, default=3)
+    ap.add_argument("--cache-dir", help="phrase cache folder (default: a temporary one)")
+    args = ap.parse_args()
+
+    make_backend = (lambda: SimulatedBackend(args.synth_latency)) if args.simulated else (lambda: get_backend("sapi"))
+    make_player = SimulatedPlayer if args.simulated else PcmPlayer
+    folder = args.cache_dir or tempfile.mkdtemp(prefix="jarvis-phrases-")
+
+    try:
+        # Live synthesis every time
+        live = SpeechWorker(make_backend())
+        live_lat = measure(live, PHRASES, args.repeats)
+        live.close()
+
+        # Phrase cache: register, let the render thread fill it, then measure
+        cache = PhraseCache(folder, learn_after=0)
+        cache.register(PHRASES)
+        backend = CachingBackend(make_backend(), cache, make_player())
+        cached = SpeechWorker(backend)
+        t0 = time.perf_counter()
+        cached.say("").wait()  # opens the backend, which queues the renders
+        while not all(cache.contains(p, backend.voice_id, backend.rate) for p in PHRASES):
+            time.sleep(0.01)
+        render_s = time.perf_counter() - t0
+        cached_lat = measure(cached, PHRASES, args.repeats)
+        cached.close()
+
+        print(f"{len(PHRASES)} phrases × {args.repeats}, backend {'simulated' if args.simulated else 'sapi'}; "
+              f"rendered into the cache in {render_s:.2f}s ({cache.stats()['on_disk']} files in {folder})")
+        print(f"{'path':<10}{'samples':>8}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}   (speak() → first sample)")
+        _row("live", live_lat)
+        _row("cached", cached_lat)
+    finally:
+        if not args.cache_dir:
+            shutil.rmtree(folder, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
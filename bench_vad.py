@@ -0,0 +1,151 @@
+# bench_vad.py
+"""
+Offline endpointing evaluation over labeled WAV fixtures.
+
+Each `<name>.wav` (16-bit mono) needs a `<name>.json` label:
+    {"speech_start": 0.82, "speech_end": 2.41}      # seconds
+
+Frames are fed to jarvis_vad.Endpointer exactly as listen() would, and for
+each trailing-silence setting the report gives
+
+  delay      time from the labeled end of speech to the moment the utterance closed
+  truncated  share of fixtures where the captured utterance ends more than
+             --tolerance seconds before the labeled end (or never started)
+
+It first checks that record_utterance() on fully buffered audio returns
+exactly the speech region it reports (the batch path used after a wake word).
+
+    python bench_vad.py fixtures/ [--trailing 0.3,0.5,0.8] [--tolerance 0.1]
+    python bench_vad.py fixtures/ --make-synthetic 20     # write labeled synthetic fixtures first
+"""
+import argparse
+import glob
+import json
+import os
+import wave
+
+import numpy as np
+
+from jarvis_audio import AudioBus, GeneratorSource
+from jarvis_vad import Endpointer, record_utterance
+
+FRAME_LENGTH = 512
+
+
+def load_fixtures(folder: str) -> list:
+    fixtures = []
+    for wav_path in sorted(glob.glob(os.path.join(folder, "*.wav"))):
+        label_path = os.path.splitext(wav_path)[0] + ".json"
+        if not os.path.exists(label_path):
+            continue
+        with wave.open(wav_path, "rb") as wf:
+            rate = wf.getframerate()
+            pcm = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+        with open(label_path, encoding="utf-8") as f:
+            label = json.load(f)
+        n = len(pcm) // FRAME_LENGTH
+        fixtures.append((os.path.basename(wav_path), pcm[:n * FRAME_LENGTH].reshape(n, FRAME_LENGTH), rate, label))
+    return fixtures
+
+
+def make_synthetic(folder: str, count: int, rate: int = 16000, seed: int = 0):
+    """Noise + amplitude-modulated voiced bursts (with short internal pauses), labeled."""
+    os.makedirs(folder, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    for i in range(count):
+        noise_amp = rng.uniform(20, 300)
+        lead, tail = rng.uniform(0.2, 1.5), 2.0
+        parts, t = [], 0.0
+        for _ in range(rng.integers(1, 4)):
+            dur = rng.uniform(0.3, 1.0)
+            tt = np.arange(int(rate * dur)) / rate
+            f0 = rng.uniform(100, 250)
+            env = np.clip(np.sin(np.pi * tt / dur), 0, 1) ** 0.5
+            parts.append(np.sin(2 * np.pi * f0 * tt) * env * rng.uniform(2000, 8000))
+            gap = rng.uniform(0.05, 0.25)
+            parts.append(np.zeros(int(rate * gap)))
+            t += dur + gap
+        speech = np.concatenate(parts[:-1])  # no gap after the last burst
+        signal = np.concatenate([np.zeros(int(rate * lead)), speech, np.zeros(int(rate * tail))])
+        signal = signal + rng.standard_normal(len(signal)) * noise_amp
+        name = os.path.join(folder, f"synthetic_{i:03d}")
+        with wave.open(name + ".wav", "wb") as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(rate)
+            wf.writeframes(np.clip(signal, -32768, 32767).astype(np.int16).tobytes())
+        with open(name + ".json", "w", encoding="utf-8") as f:
+            json.dump({"speech_start": lead, "speech_end": lead + len(speech) / rate}, f)
+
+
+def evaluate(fixtures, trailing: float, tolerance: float):
+    delays, truncated = [], 0
+    for name, frames, rate, label in fixtures:
+        fs = FRAME_LENGTH / rate
+        ep = Endpointer(rate, FRAME_LENGTH, trailing_silence=trailing)
+        # Frame-by-frame, like live capture: the decision time is the frame that closed it
+        for frame in frames:
+            if ep.process(frame) == Endpointer.DONE:
+                break
+        if ep.start_frame is None:
+            truncated += 1
+            continue
+        closed_at = ep.frames * fs
+        captured_end = (ep.end_frame if ep.end_frame is not None else ep.frames) * fs
+        if captured_end < label["speech_end"] - tolerance:
+            truncated += 1
+        delays.append(closed_at - label["speech_end"])
+    return delays, truncated
+
+
+def check_buffered(fixtures, trailing: float = 0.5, pre_roll: float = 0.3) -> int:
+    """
+    record_utterance() over fully buffered audio (the batch path after a wake
+    word) must return exactly the frames of the speech region it reports,
+    plus the pre-roll. Returns the number of fixtures where it doesn't.
+    """
+    mismatches = 0
+    for name, frames, rate, label in fixtures:
+        fs = FRAME_LENGTH / rate
+        bus = AudioBus(GeneratorSource([frames.reshape(-1)], rate, FRAME_LENGTH),
+                       capacity_seconds=len(frames) * fs + 1).start()
+        bus.ring.wait_for(len(frames) - 1, timeout=5)
+        pcm, stats = record_utterance(bus.reader(start=0), Endpointer(rate, FRAME_LENGTH, trailing_silence=trailing),
+                                      pre_roll=pre_roll)
+        start, end = round(stats["speech_start"] / fs), round(stats["speech_end"] / fs)
+        expected = frames[max(0, start - round(pre_roll / fs)):end].tobytes()
+        if pcm != expected:
+            mismatches += 1
+            print(f"  buffered capture differs on {name}: {len(pcm)} bytes vs {len(expected)} expected")
+    return mismatches
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("folder")
+    ap.add_argument("--trailing", default="0.3,0.5,0.8", help="trailing-silence settings to compare (s)")
+    ap.add_argument("--tolerance", type=float, default=0.1, help="seconds of end-of-speech loss allowed")
+    ap.add_argument("--make-synthetic", type=int, default=0, metavar="N", help="write N synthetic fixtures first")
+    args = ap.parse_args()
+
+    if args.make_synthetic:
+        make_synthetic(args.folder, args.make_synthetic)
+    fixtures = load_fixtures(args.folder)
+    if not fixtures:
+        raise SystemExit(f"no labeled fixtures in {args.folder}")
+
+    print(f"{len(fixtures)} fixtures")
+    mismatches = check_buffered(fixtures)
+    print(f"buffered capture: {'ok' if not mismatches else f'{mismatches} mismatches'}")
+    print(f"{'trailing s':>10}{'delay p50':>11}{'delay p95':>11}{'delay max':>11}{'truncated':>11}")
+    for trailing in (float(t) for t in args.trailing.split(",")):
+        delays, truncated = evaluate(fixtures, trailing, args.tolerance)
+        if delays:
+            d = np.percentile(delays, [50, 95, 100])
+            print(f"{trailing:>10.2f}{d[0]:>11.3f}{d[1]:>11.3f}{d[2]:>11.3f}{truncated / len(fixtures):>11.1%}")
+        else:
+            print(f"{trailing:>10.2f}{'-':>11}{'-':>11}{'-':>11}{truncated / len(fixtures):>11.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# bench_wake_frames.py
+"""
+Wake-detector frame-path micro-benchmark.
+
+Feeds a 16 kHz mono 16-bit WAV through the detector loop block by block,
+exactly as sounddevice delivers it ((frame_length, 1) int16 arrays), using
+
+  before: struct.unpack_from("h" * frames, indata.tobytes())  → tuple of ints
+  after:  FrameRing.push(indata)                             → memoryview of a preallocated slot
+
+and reports frames/sec and bytes allocated per frame (tracemalloc peak),
+once for the frame path alone and once including the engine's process().
+
+With PV_ACCESS_KEY set (and WAKEWORD / JARVIS_PPN as for jarvis_entry) the
+real Porcupine engine processes each frame; otherwise a null engine does the
+same ctypes marshalling Porcupine does, so only the frame path is measured.
+
+    python bench_wake_frames.py long.wav [--repeat 3] [--no-porcupine]
+"""
+import argparse
+import ctypes
+import os
+import struct
+import time
+import tracemalloc
+import wave
+
+import numpy as np
+
+from jarvis_audio import FrameRing
+
+FRAME_LENGTH = 512
+SAMPLE_RATE = 16000
+
+
+class _NullEngine:
+    """Marshals the frame like pvporcupine.Porcupine.process, never fires."""
+    frame_length = FRAME_LENGTH
+    sample_rate = SAMPLE_RATE
+
+    def process(self, pcm):
+        if len(pcm) != self.frame_length:
+            raise ValueError("bad frame length")
+        (ctypes.c_short * len(pcm))(*pcm)
+        return -1
+
+
+class _SinkEngine:
+    """Touches nothing: isolates the cost of producing the frame."""
+    def process(self, pcm):
+        return -1
+
+
+def _make_engine(use_porcupine: bool):
+    if not use_porcupine or not os.getenv("PV_ACCESS_KEY"):
+        return _NullEngine(), "null engine"
+    from jarvis_core import WakeDetector
+    return WakeDetector()._porcupine, "porcupine"
+
+
+def load_blocks(path: str) -> list:
+    with wave.open(path, "rb") as wf:
+        if wf.getframerate() != SAMPLE_RATE or wf.getnchannels() != 1 or wf.getsampwidth() != 2:
+            raise SystemExit(f"{path}: need 16 kHz mono 16-bit PCM")
+        pcm = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+    n = len(pcm) // FRAME_LENGTH
+    # Separate arrays per block, like the buffers sounddevice hands the callback
+    return [pcm[i * FRAME_LENGTH:(i + 1) * FRAME_LENGTH].reshape(FRAME_LENGTH, 1).copy() for i in range(n)]
+
+
+def path_before(engine, blocks):
+    for indata in blocks:
+        pcm = struct.unpack_from("h" * FRAME_LENGTH, indata.tobytes())
+        engine.process(pcm)
+
+
+def path_after(engine, blocks):
+    ring = FrameRing(FRAME_LENGTH)
+    for indata in blocks:
+        engine.process(ring.push(indata))
+
+
+def _bytes_per_frame(fn, engine, blocks, sample: int = 2000):
+    """Mean transient allocation per frame, from tracemalloc's per-frame peak."""
+    blocks = blocks[:sample]
+    ring = FrameRing(FRAME_LENGTH)
+    tracemalloc.start()
+    total = 0
+    for indata in blocks:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        if fn is path_before:
+            engine.process(struct.unpack_from("h" * FRAME_LENGTH, indata.tobytes()))
+        else:
+            engine.process(ring.push(indata))
+        total += tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    return total / len(blocks)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("wav")
+    ap.add_argument("--repeat", type=int, default=3, help="passes over the file (best is reported)")
+    ap.add_argument("--no-porcupine", action="store_true", help="always use the null engine")
+    args = ap.parse_args()
+
+    blocks = load_blocks(args.wav)
+    engine, label = _make_engine(not args.no_porcupine)
+    print(f"{len(blocks)} frames ({len(blocks) * FRAME_LENGTH / SAMPLE_RATE:.1f}s audio)")
+    realtime_fps = SAMPLE_RATE / FRAME_LENGTH
+    for title, eng in (("frame path only", _SinkEngine()), (f"frame path + {label}", engine)):
+        print()
+        print(f"== {title} ==")
+        print(f"{'path':<8}{'frames/s':>14}{'x realtime':>12}{'bytes/frame':>14}")
+        for name, fn in (("before", path_before), ("after", path_after)):
+            best = float("inf")
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                fn(eng, blocks)
+                best = min(best, time.perf_counter() - t0)
+            fps = len(blocks) / best
+            print(f"{name:<8}{fps:>14,.0f}{fps / realtime_fps:>12,.0f}{_bytes_per_frame(fn, eng, blocks):>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
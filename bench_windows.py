@@ -0,0 +1,114 @@
+# bench_windows.py
+"""
+Window-activation benchmark for "type ... on notepad": the old fixed sleeps
+(0.5 s after activating a found window, 1 s after launching) vs.
+jarvis_windows.WindowRegistry (cached handles, backoff polling until the
+window is focused and responding).
+
+By default it runs on a simulated desktop (FakeBackend) where each run
+draws how long the window takes to appear and focus. A fixed sleep that
+ends too early "types into the wrong window"; one that ends late is time
+wasted. `--live` launches and re-activates the real Notepad on Windows.
+
+    python bench_windows.py [--runs 50] [--seed 1] [--live]
+"""
+import argparse
+import random
+import statistics
+import subprocess
+import sys
+import time
+from contextlib import redirect_stdout
+from io import StringIO
+
+from jarvis_windows import FakeBackend, WindowRegistry, get_backend
+
+OLD_ACTIVATE_SLEEP = 0.5
+OLD_LAUNCH_SLEEP = 1.0
+
+
+def simulate(runs: int, rng: random.Random, launched: bool) -> dict:
+    """Old and new waits, early typing, polls and enumerations over `runs` scripted desktops."""
+    old, early, new, polls, enums = [], 0, [], [], []
+    for _ in range(runs):
+        if launched:   # cold start: 150 ms-2.5 s until the window shows, then up to 300 ms to take input
+            appear, ready, focus = rng.uniform(0.15, 2.5), rng.uniform(0.0, 0.3), rng.uniform(0.01, 0.1)
+        else:          # window already open: focus moves in 10-400 ms (slow when the app is busy)
+            appear, ready, focus = 0.0, 0.0, rng.lognormvariate(-3.0, 0.9)
+        total = appear + ready + focus
+        old.append(OLD_LAUNCH_SLEEP if launched else OLD_ACTIVATE_SLEEP)
+        early += total > old[-1]
+
+        fake = FakeBackend(activate_delay=focus)
+        registry = WindowRegistry(fake, timeout=10)
+        launch = lambda: fake.add("Untitled - Notepad", after=appear, ready_after=ready)
+        if not launched:
+            launch()
+        with redirect_stdout(StringIO()):
+            result = registry.activate("notepad", "Notepad", launch=launch)
+        new.append(result.seconds)
+        polls.append(result.polls)
+        enums.append(fake.enumerations)
+    return {"old": old, "early": early, "new": new, "polls": polls, "enumerations": enums}
+
+
+def live(runs: int):
+    """Real Notepad (Windows): cold launch once, then re-activation with the handle cached vs enumerated."""
+    import pygetwindow as gw
+    backend = get_backend("win32")
+    registry = WindowRegistry(backend)
+    procs = []
+    try:
+        result = registry.activate("notepad", "Notepad", launch=lambda: procs.append(subprocess.Popen(["notepad.exe"])))
+        if result.handle is None:
+            sys.exit(f"Notepad wasn't ready ({result.stage}) after {result.seconds:.1f}s")
+        print(f"cold launch: ready in {result.seconds * 1e3:.0f} ms ({result.polls} polls)")
+        other = next(w.handle for w in backend.windows() if w.handle != result.handle)
+        cached, enumerated, scans = [], [], []
+        for _ in range(runs):
+            backend.activate(other)  # move focus away so each activation has work to do
+            time.sleep(0.2)
+            cached.append(registry.activate("notepad", "Notepad").seconds)
+            t0 = time.perf_counter()
+            gw.getWindowsWithTitle("Notepad")
+            scans.append(time.perf_counter() - t0)
+            backend.activate(other)
+            time.sleep(0.2)
+            registry.forget("notepad")
+            enumerated.append(registry.activate("notepad", "Notepad").seconds)
+        print(f"re-activate, cached handle:  median {statistics.median(cached) * 1e3:.1f} ms")
+        print(f"re-activate, enumerating:    median {statistics.median(enumerated) * 1e3:.1f} ms")
+        print(f"gw.getWindowsWithTitle scan: median {statistics.median(scans) * 1e3:.2f} ms "
+              f"(then the old code slept {OLD_ACTIVATE_SLEEP * 1e3:.0f} ms)")
+    finally:
+        for p in procs:
+            p.kill()
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--runs", type=int, default=50)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--live", action="store_true", help="use the real Notepad (Windows only)")
+    args = ap.parse_args()
+
+    if args.live:
+        if sys.platform != "win32":
+            sys.exit("--live needs Windows")
+        live(min(args.runs, 20))
+        return
+
+    rng = random.Random(args.seed)
+    print(f"simulated desktop, {args.runs} runs each\n")
+    print("case              old wait ms  typed too early   new wait ms (median / p95)   polls   enumerations")
+    for label, launched in (("window open", False), ("launch first", True)):
+        r = simulate(args.runs, rng, launched)
+        new = sorted(r["new"])
+        print(f"  {label:<15} {statistics.median(r['old']) * 1e3:>11.0f} {r['early'] / args.runs:>15.0%}"
+              f" {statistics.median(new) * 1e3:>12.0f} / {new[int(len(new) * 0.95)] * 1e3:<6.0f}"
+              f" {statistics.median(r['polls']):>12.0f} {statistics.median(r['enumerations']):>14.0f}")
+    print("(the new path never types early: it waits until the window is focused and responding, up to the timeout)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+# jarvis_audio.py
+
+import time
+import wave
+from threading import Condition, Event, Thread
+
+import numpy as np
+
+SAMPLE_RATE = 16000   # Porcupine and the STT path both run at 16 kHz mono
+FRAME_LENGTH = 512    # Porcupine's frame size (32 ms)
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Frame ring
+class FrameRing:
+    """
+    Preallocated ring of fixed-size int16 frames.
+
+    The audio callback copies each block straight into the next slot
+    (`push`), so the steady-state frame path allocates nothing: no
+    `tobytes()` copy, no struct format string, no tuple of ints. Consumers
+    get a memoryview of the slot, which Porcupine's `process()` accepts as
+    a plain sequence of ints.
+
+    `seq` counts frames ever written; frame `n` lives in slot `n % capacity`
+    until it is overwritten `capacity` frames later. There is a single
+    writer and readers never lock: they compare their own cursor with `seq`
+    and only touch the condition variable when they have to sleep.
+    """
+
+    def __init__(self, frame_length: int, capacity: int = 64):
+        self.frame_length = frame_length
+        self.capacity = capacity
+        self._buf = np.zeros((capacity, frame_length), dtype=np.int16)
+        # Views and memoryviews are built once, not per frame
+        self._slots = [self._buf[i] for i in range(capacity)]
+        self._columns = [s.reshape(frame_length, 1) for s in self._slots]  # shape sounddevice delivers
+        self._views = [memoryview(s) for s in self._slots]
+        self.seq = 0
+        self._cond = Condition()
+        self._waiters = 0
+
+    def push(self, indata) -> memoryview:
+        """
+        Copies one block (shape (frame_length,) or (frame_length, 1)) into
+        the next slot and wakes readers. Returns the slot's memoryview.
+        """
+        i = self.seq % self.capacity
+        np.copyto(self._columns[i] if indata.ndim == 2 else self._slots[i], indata)
+        self.seq += 1
+        if self._waiters:
+            with self._cond:
+                self._cond.notify_all()
+        return self._views[i]
+
+    def frame(self, n: int) -> memoryview | None:
+        """memoryview of frame `n`, or None if it was already overwritten / not yet written."""
+        if n >= self.seq or n < self.seq - self.capacity:
+            return None
+        return self._views[n % self.capacity]
+
+    def array(self, n: int):
+        """int16 ndarray view of frame `n` (same lifetime rules as `frame`)."""
+        if n >= self.seq or n < self.seq - self.capacity:
+            return None
+        return self._slots[n % self.capacity]
+
+    def wait_for(self, n: int, timeout: float | None = None) -> bool:
+        """Blocks until frame `n` has been written. Returns False on timeout."""
+        if self.seq > n:
+            return True
+        with self._cond:
+            self._waiters += 1
+            try:
+                return self._cond.wait_for(lambda: self.seq > n, timeout)
+            finally:
+                self._waiters -= 1
+
+    def wake_all(self):
+        """Wakes every waiter (used on shutdown)."""
+        with self._cond:
+            self._cond.notify_all()
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Capture sources
+class SoundDeviceSource:
+    """Live microphone via one long-lived sounddevice InputStream."""
+
+    def __init__(self, sample_rate: int = SAMPLE_RATE, frame_length: int = FRAME_LENGTH, device=None):
+        self.sample_rate = sample_rate
+        self.frame_length = frame_length
+        self.device = device
+        self._stream = None
+
+    def start(self, push, finish):
+        import sounddevice as sd
+
+        def _callback(indata, frames, time_info, status):
+            push(indata)
+
+        self._stream = sd.InputStream(
+            samplerate=self.sample_rate,
+            channels=1,
+            dtype="int16",
+            device=self.device,  # None → system default
+            blocksize=self.frame_length,
+            callback=_callback,
+        )
+        self._stream.start()
+
+    def stop(self):
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+
+
+class GeneratorSource:
+    """
+    Headless source: any iterable of int16 sample arrays (any length) is
+    re-blocked into frames and pushed from a background thread. With
+    `realtime=True` frames are paced at the sample rate, like a microphone.
+    """
+
+    def __init__(self, chunks, sample_rate: int = SAMPLE_RATE, frame_length: int = FRAME_LENGTH,
+                 realtime: bool = False):
+        self.sample_rate = sample_rate
+        self.frame_length = frame_length
+        self.realtime = realtime
+        self._chunks = chunks
+        self._stop = Event()
+        self._thread = None
+
+    def start(self, push, finish):
+        self._thread = Thread(target=self._run, args=(push, finish), name="jarvis-audio-source", daemon=True)
+        self._thread.start()
+
+    def _run(self, push, finish):
+        frame = np.zeros(self.frame_length, dtype=np.int16)
+        fill = 0
+        period = self.frame_length / self.sample_rate
+        next_t = time.perf_counter()
+        try:
+            for chunk in self._chunks:
+                chunk = np.asarray(chunk, dtype=np.int16).reshape(-1)
+                pos = 0
+                while pos < len(chunk):
+                    take = min(self.frame_length - fill, len(chunk) - pos)
+                    frame[fill:fill + take] = chunk[pos:pos + take]
+                    fill += take
+                    pos += take
+                    if fill < self.frame_length:
+                        continue
+                    if self._stop.is_set():
+                        return
+                    if self.realtime:
+                        next_t += period
+                        delay = next_t - time.perf_counter()
+                        if delay > 0:
+                            time.sleep(delay)
+                    push(frame)
+                    fill = 0
+        finally:
+            finish()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+
+
+class WavFileSource(GeneratorSource):
+    """Headless source reading a 16-bit mono WAV (at the bus sample rate)."""
+
+    def __init__(self, path: str, frame_length: int = FRAME_LENGTH, realtime: bool = False,
+                 lead_silence: float = 0.0, tail_silence: float = 0.0):
+        with wave.open(path, "rb") as wf:
+            if wf.getnchannels() != 1 or wf.getsampwidth() != 2:
+                raise ValueError(f"{path}: expected 16-bit mono PCM")
+            sample_rate = wf.getframerate()
+            pcm = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+        chunks = [
+            np.zeros(int(lead_silence * sample_rate), dtype=np.int16),
+            pcm,
+            np.zeros(int(tail_silence * sample_rate), dtype=np.int16),
+        ]
+        super().__init__(chunks, sample_rate=sample_rate, frame_length=frame_length, realtime=realtime)
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Shared capture bus
+class AudioBus:
+    """
+    One long-lived capture stream shared by every audio consumer.
+
+    The source pushes frames into a FrameRing; each consumer (wake detector,
+    command recorder, noise-floor tracker, ...) reads through its own
+    `BusReader` cursor, so switching from wake detection to command capture
+    needs no device open/close. `capacity_seconds` of history is retained.
+    """
+
+    def __init__(self, source=None, capacity_seconds: float = 10.0):
+        self.source = source or SoundDeviceSource()
+        self.sample_rate = self.source.sample_rate
+        self.frame_length = self.source.frame_length
+        capacity = max(2, int(capacity_seconds * self.sample_rate / self.frame_length))
+        self.ring = FrameRing(self.frame_length, capacity)
+        self.finished = False  # the source ran dry (file/generator sources)
+        self._started = False
+
+    @property
+    def seq(self) -> int:
+        """Number of frames captured so far."""
+        return self.ring.seq
+
+    def frame_seconds(self, frames: int) -> float:
+        return frames * self.frame_length / self.sample_rate
+
+    def start(self):
+        if not self._started:
+            self._started = True
+            self.source.start(self.ring.push, self._finish)
+        return self
+
+    def _finish(self):
+        self.finished = True
+        self.ring.wake_all()
+
+    def stop(self):
+        self.source.stop()
+        self._finish()
+
+    def reader(self, start: int | None = None) -> "BusReader":
+        """A new consumer cursor, at frame `start` (default: the next frame captured)."""
+        return BusReader(self, self.seq if start is None else start)
+
+
+class BusReader:
+    """A consumer's cursor into an AudioBus."""
+
+    def __init__(self, bus: AudioBus, position: int):
+        self.bus = bus
+        self.position = position
+        self.dropped = 0  # frames lost because this reader fell a full ring behind
+        self.closed = False
+
+    def _next(self, timeout):
+        ring = self.bus.ring
+        while not self.closed:
+            if ring.seq <= self.position:
+                if self.bus.finished:
+                    return None
+                if not ring.wait_for(self.position, timeout):
+                    return None
+                continue
+            oldest = ring.seq - ring.capacity + 1
+            if self.position < oldest:
+                self.dropped += oldest - self.position
+                self.position = oldest
+            n = self.position
+            self.position += 1
+            return n
+        return None
+
+    def read(self, timeout: float | None = None) -> memoryview | None:
+        """Next frame as an int16 memoryview, or None on timeout / end of source / close."""
+        n = self._next(timeout)
+        return None if n is None else self.bus.ring.frame(n)
+
+    def read_array(self, timeout: float | None = None):
+        """Next frame as an int16 ndarray view (valid until overwritten)."""
+        n = self._next(timeout)
+        return None if n is None else self.bus.ring.array(n)
+
+    def seek(self, position: int):
+        self.position = position
+
+    def seek_latest(self):
+        """Skip everything buffered; the next read returns the next frame captured."""
+        self.position = self.bus.seq
+
+    def close(self):
+        self.closed = True
+        self.bus.ring.wake_all()
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Noise floor
+class NoiseFloorTracker:
+    """
+    Bus consumer that keeps a running estimate of the background RMS level.
+    It follows drops in level immediately and rises slowly, so speech bursts
+    barely move it while a noisier room is picked up within seconds.
+    """
+
+    def __init__(self, bus: AudioBus, rise: float = 0.02, initial: float = 300.0):
+        self.rise = rise
+        self.level = initial
+        self._reader = bus.reader()
+        self._thread = Thread(target=self._run, name="jarvis-noise-floor", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._reader.closed:
+            frame = self._reader.read_array(timeout=0.5)
+            if frame is None:
+                if self._reader.bus.finished:
+                    return
+                continue
+            self.update(float(np.sqrt(np.dot(frame, frame.astype(np.float64)) / len(frame))))
+
+    def update(self, rms: float):
+        if rms < self.level:
+            self.level = rms
+        else:
+            self.level += self.rise * (rms - self.level)
+
+    def stop(self):
+        self._reader.close()
@@ -0,0 +1,218 @@
+# jarvis_cache.py
+
+import json
+import os
+import re
+import time
+from collections import OrderedDict
+from threading import Event, Lock
+
+# Pure disfluencies: dropped wherever they fall ("what is, um, a qubit")
+DISFLUENCIES = frozenset({"um", "umm", "uh", "uhh", "er", "erm", "hmm"})
+# Address and politeness: dropped only as a leading or trailing run ("hey jarvis, um, tell me a joke please");
+# inside a sentence a word like "ok" can be the question itself ("is it ok to ...")
+FILLER_WORDS = frozenset({"jarvis", "hey", "ok", "okay", "please"}) | DISFLUENCIES
+
+_PUNCT = re.compile(r"[^\w\s]")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    Case/punctuation/filler folding: "Hey Jarvis, how are you?" → "how are you".
+    Only disfluencies go from the middle; "so what is X" and "what is X"
+    stay different. If nothing but filler is left ("hey!"), the folded text
+    is kept as-is.
+    """
+    text = _SPACES.sub(" ", _PUNCT.sub("", prompt.lower())).strip()
+    words = [w for w in text.split(" ") if w not in DISFLUENCIES]
+    start, end = 0, len(words)
+    while start < end and words[start] in FILLER_WORDS:
+        start += 1
+    while end > start and words[end - 1] in FILLER_WORDS:
+        end -= 1
+    return " ".join(words[start:end]) or text
+
+
+class ResponseCache:
+    """
+    Size-bounded LRU + TTL cache for LLM replies.
+
+    - Keys are a normalized prompt plus the generation parameters (`make_key`).
+    - Identical in-flight requests are coalesced: while one caller computes a
+      key, others block in `get()` and receive its result.
+    - With `path`, entries persist as JSON across restarts (written on `put`).
+    - `stats()` reports hits, misses, and CPU seconds saved (the recorded
+      generation cost of every entry served from the cache).
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = 24 * 3600, path: str | None = None,
+                 clock=time.time):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self._clock = clock
+        self._entries: OrderedDict[str, tuple[str, float, float]] = OrderedDict()  # key → (value, created, cost)
+        self._inflight: dict[str, Event] = {}
+        self._lock = Lock()
+        self._save_lock = Lock()  # one writer of the file at a time
+        self._version = 0         # bumped per snapshot, so an older one never overwrites a newer
+        self._saved_version = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.saved_cpu_seconds = 0.0
+        if path:
+            self._load()
+
+    @staticmethod
+    def make_key(prompt: str, **params) -> str:
+        return normalize_prompt(prompt) + "|" + json.dumps(params, sort_keys=True)
+
+    # ── Lookup / store ───────────────────────────────────────────────────────
+    def _lookup(self, key: str):
+        """Caller holds the lock. Returns the live entry or None (dropping it if expired)."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if self.ttl is not None and self._clock() - entry[1] > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def get(self, key: str, wait: bool = True) -> str | None:
+        """
+        Returns the cached reply or None. If another caller is computing `key`
+        and `wait` is true, blocks until it finishes and returns its result.
+        """
+        with self._lock:
+            entry = self._lookup(key)
+            pending = self._inflight.get(key) if entry is None else None
+        if entry is None and pending is not None and wait:
+            pending.wait()
+            with self._lock:
+                entry = self._lookup(key)
+                if entry is not None:
+                    self.coalesced += 1
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.saved_cpu_seconds += entry[2]
+            return entry[0]
+
+    def begin(self, key: str) -> bool:
+        """
+        Marks `key` as being computed. Returns False if someone else already is
+        (call `get()` to wait for them). Must be followed by `put` or `abandon`.
+        """
+        with self._lock:
+            if key in self._inflight:
+                return False
+            self._inflight[key] = Event()
+            return True
+
+    def abandon(self, key: str):
+        """Releases waiters without storing anything (the computation failed)."""
+        with self._lock:
+            pending = self._inflight.pop(key, None)
+        if pending is not None:
+            pending.set()
+
+    def put(self, key: str, value: str, cost: float = 0.0):
+        """Stores `value`; `cost` is the CPU seconds it took to produce."""
+        with self._lock:
+            self._entries[key] = (value, self._clock(), cost)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            pending = self._inflight.pop(key, None)
+            snapshot = self._snapshot() if self.path else None
+        if pending is not None:
+            pending.set()
+        if snapshot is not None:
+            self._save(*snapshot)
+
+    def get_or_compute(self, key: str, compute) -> str:
+        """Returns the cached reply, or runs `compute()` (once per key, even under concurrency)."""
+        while True:
+            value = self.get(key)
+            if value is not None:
+                return value
+            if self.begin(key):
+                break
+        t0 = time.process_time()
+        try:
+            value = compute()
+        except BaseException:
+            self.abandon(key)
+            raise
+        self.put(key, value, cost=time.process_time() - t0)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            snapshot = self._snapshot()
+        if self.path:
+            self._save(*snapshot)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "saved_cpu_seconds": round(self.saved_cpu_seconds, 3),
+            }
+
+    # ── Persistence ──────────────────────────────────────────────────────────
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"[LLM cache] ignoring unreadable cache file {self.path}: {e}")
+            return
+        now = self._clock()
+        entries = []
+        try:
+            for key, (value, created, cost) in raw:
+                if not isinstance(key, str) or not isinstance(value, str):
+                    raise ValueError(f"bad entry for {key!r}")
+                created, cost = float(created), float(cost)
+                if self.ttl is None or now - created <= self.ttl:
+                    entries.append((key, (value, created, cost)))
+        except (TypeError, ValueError) as e:
+            print(f"[LLM cache] ignoring malformed cache file {self.path}: {e}")
+            return
+        self._entries.update(entries)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _snapshot(self) -> tuple:
+        """Caller holds the lock. (version, entries) for `_save`."""
+        self._version += 1
+        return self._version, list(self._entries.items())
+
+    def _save(self, version: int, items):
+        # Outside the entry lock, so lookups don't wait on the disk; a snapshot older than
+        # the one already written is skipped rather than replacing it
+        with self._save_lock:
+            if version <= self._saved_version:
+                return
+            tmp = f"{self.path}.tmp"
+            try:
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump([[k, list(v)] for k, v in items], f)
+                os.replace(tmp, self.path)
+                self._saved_version = version
+            except OSError as e:
+                print(f"[LLM cache] could not write {self.path}: {e}")
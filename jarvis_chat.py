@@ -0,0 +1,138 @@
+# jarvis_chat.py
+"""
+Multi-turn conversations with the local model. A Conversation keeps the
+turns so far under a token budget. When a new turn would exceed it, the
+oldest turns are folded into one-line summaries (and old summaries dropped).
+Each turn goes to the model as (key, context) for jarvis_llm_worker's
+SessionHost. That way the model keeps its context between turns and only
+processes the new message, and rebuilds from `context` when it has to.
+Turns answered from the response cache never reach the model; the next
+prompt carries them (`catch_up`), so the session continues instead of
+being rebuilt.
+"""
+import itertools
+import re
+import time
+
+SYSTEM_PROMPT = ("You are Jarvis, a helpful voice assistant. Answer in a few short, plain sentences "
+                 "that sound natural when spoken aloud.")
+
+COMPACT_TO = 0.6  # fraction of the budget the history shrinks to when it overflows
+
+_ids = itertools.count(1)
+_SENTENCE = re.compile(r"(?<=[.!?])\s+")
+
+
+# Words that point back into the conversation: "what did she write", "tell me more", "why"
+_REFERS_BACK = re.compile(r"\b(?:it|its|this|that|these|those|he|him|his|she|her|hers|they|them|their|there|"
+                          r"then|one|ones|more|else|also|again|another|other|same|instead|why)\b"
+                          r"|^(?:and|but|so|or|what about|how about)\b")
+
+
+def is_standalone(prompt: str) -> bool:
+    """
+    True when `prompt` doesn't refer back to earlier turns, so its answer
+    doesn't depend on the conversation ("tell me a joke", "who was Ada
+    Lovelace"). Errs towards False: a miss only costs a generation.
+    """
+    return not _REFERS_BACK.search(prompt.lower())
+
+
+def approx_tokens(text: str) -> int:
+    """Rough token count for budgeting (~4 characters per token for English)."""
+    return len(text) // 4 + 1
+
+
+def _clip(text: str, words: int) -> str:
+    parts = text.split()
+    return " ".join(parts[:words]) + (" …" if len(parts) > words else "")
+
+
+def summarize_turn(prompt: str, reply: str) -> str:
+    """One line standing in for a dropped turn: the question and the reply's first sentence."""
+    first = _SENTENCE.split(reply.strip(), 1)[0] if reply.strip() else "(no answer)"
+    return f"- User asked: {_clip(prompt, 16)} You answered: {_clip(first, 24)}"
+
+
+class Conversation:
+    """
+    budget:   tokens the context (system prompt, summaries, turns) plus the
+              next question and its reply (`max_tokens`) may use; keep it
+              under the model's context window (2048 for the default model)
+    idle:     seconds without a turn after which `expired()` is True
+    """
+
+    def __init__(self, system_prompt: str = SYSTEM_PROMPT, budget: int = 1536, idle: float = 300.0):
+        self.id = next(_ids)
+        self.system_prompt = system_prompt
+        self.budget = budget
+        self.idle = idle
+        self.turns = []      # (prompt, reply), oldest first
+        self.summary = []    # one line per turn folded out of `turns`
+        self.epoch = 0       # bumped whenever the history is rewritten (the model's session no longer matches)
+        self.tier = None     # model tier answering it (jarvis_llm.choose_tier)
+        self.unseen = []     # turns answered from the cache since the model last ran
+        self._absorbed = 0   # turns the model only saw inside a later prompt (catch_up)
+        self.last_used = time.monotonic()
+
+    def expired(self, now: float | None = None) -> bool:
+        return (now if now is not None else time.monotonic()) - self.last_used > self.idle
+
+    def context(self) -> str:
+        """The system prompt carrying the conversation so far, for a model that has to rebuild it."""
+        parts = [self.system_prompt]
+        if self.summary:
+            parts.append("Earlier in this conversation:\n" + "\n".join(self.summary))
+        if self.turns:
+            parts.append("Most recently:\n" + "\n".join(f"User: {p}\nJarvis: {r}" for p, r in self.turns))
+        return "\n\n".join(parts)
+
+    def tokens(self) -> int:
+        # Context tokens plus the per-turn template overhead the session adds
+        return approx_tokens(self.context()) + 8 * len(self.turns)
+
+    def request(self, prompt: str, max_tokens: int = 128) -> tuple:
+        """(key, context) for the model's next turn, compacting the history first if it wouldn't fit."""
+        needed = approx_tokens(prompt) + max_tokens + 8
+        if self.tokens() + needed > self.budget:
+            # Well under the limit, so the next several turns reuse the rebuilt session
+            self.compact(int(COMPACT_TO * (self.budget - needed)))
+        seen = len(self.turns) - len(self.unseen) - self._absorbed
+        if seen == 0:
+            self.unseen.clear()  # the model has no session for us yet; `context` carries them
+            seen = len(self.turns) - self._absorbed
+        self.last_used = time.monotonic()
+        return (self.id, self.epoch, seen), self.context()
+
+    def catch_up(self, prompt: str) -> str:
+        """
+        `prompt` for the model, preceded by the turns it missed because the
+        cache answered them; call after `request` and only when the model runs.
+        """
+        if not self.unseen:
+            return prompt
+        missed = "\n".join(f"User: {p}\nJarvis: {r}" for p, r in self.unseen)
+        self._absorbed += len(self.unseen)
+        self.unseen.clear()
+        return f"(Earlier, answered without you:\n{missed})\n\n{prompt}"
+
+    def compact(self, target: int):
+        """Folds the oldest turns into summaries (and drops the oldest summaries) until the context fits `target` tokens."""
+        before = (len(self.turns), len(self.summary))
+        while self.turns and self.tokens() > target:
+            self.summary.append(summarize_turn(*self.turns.pop(0)))
+        while self.summary and self.tokens() > target:
+            self.summary.pop(0)
+        if (len(self.turns), len(self.summary)) != before:
+            self.epoch += 1
+            self.unseen.clear()  # the rebuilt session gets them from `context`
+
+    def add_turn(self, prompt: str, reply: str, from_cache: bool = False):
+        self.turns.append((prompt, reply))
+        if from_cache:
+            self.unseen.append((prompt, reply))
+        self.last_used = time.monotonic()
+
+    def stats(self) -> dict:
+        return {"id": self.id, "turns": len(self.turns), "summarized": len(self.summary),
+                "epoch": self.epoch, "tokens": self.tokens(), "budget": self.budget}
@@ -10,23 +10,40 @@ import socket
 import platform
 import random
 import time
-import struct
-from threading import Event
+from threading import Event, Lock, Thread
 
-import cv2
-import mss
-import numpy as np
-import psutil
+import numpy as np  # the audio pipeline (jarvis_audio, jarvis_vad) needs it from the start anyway
 import pvporcupine
-import pyautogui
-import pygetwindow as gw
-import sounddevice as sd
 import speech_recognition as sr
 from dotenv import load_dotenv
-from speech_recognition import RequestError, WaitTimeoutError
-from win32com.client import Dispatch
-
-from jarvis_llm import chat_with_ai
+from speech_recognition import WaitTimeoutError
+
+from jarvis_audio import AudioBus, NoiseFloorTracker, SoundDeviceSource
+import jarvis_trace
+from jarvis_lazy import lazy_import
+from jarvis_llm import LLM_ERROR_REPLY, chat_with_ai, llm_stats, reset_conversation
+from jarvis_router import CommandRouter, run_blocking
+from jarvis_stt import GoogleBackend, STTError, get_backend
+from jarvis_phrases import CachingBackend, PhraseCache
+from jarvis_tts import NORMAL, SpeechWorker, TTSBackend, Utterance, get_backend as get_tts_backend
+from jarvis_vad import Endpointer, NoSpeech, record_utterance
+
+# Heavy modules that most sessions never touch load on first use (see jarvis_lazy).
+psutil = lazy_import("psutil")
+pyautogui = lazy_import("pyautogui")
+gw = lazy_import("pygetwindow")
+jarvis_proc = lazy_import("jarvis_proc")
+jarvis_windows = lazy_import("jarvis_windows")
+# Subsystems only command handlers use: loaded by their get_*() accessors or the first command.
+sqlite3 = lazy_import("sqlite3")
+jarvis_fileindex = lazy_import("jarvis_fileindex")
+jarvis_intent = lazy_import("jarvis_intent")
+jarvis_media = lazy_import("jarvis_media")
+jarvis_recorder = lazy_import("jarvis_recorder")
+jarvis_sysmon = lazy_import("jarvis_sysmon")
+
+# Preloaded by jarvis_entry's warm-up thread once the wake detector is live.
+WARM_UP_MODULES = ("psutil", "pyautogui", "pygetwindow", "win32com.client", "mss", "cv2")
 
 # ──────────────────────────────────────────────────────────────────────────────
 # Env & Keys
@@ -38,53 +55,221 @@ WAKEWORD = (os.getenv("WAKEWORD") or "jarvis").strip().lower()
 JARVIS_PPN = (os.getenv("JARVIS_PPN") or "").strip()  # absolute path to .ppn if using custom hotword
 
 # ──────────────────────────────────────────────────────────────────────────────
-# TTS via Windows SAPI
-speaker = Dispatch("SAPI.SpVoice")
-speaker.Rate = 0
-speaker.Volume = 100
-
-def speak(text: str):
-    """Speak text out loud and echo to console."""
+# TTS: a background worker plays queued speech (SAPI by default, see jarvis_tts)
+_tts = None
+
+# Folder of pre-rendered phrases (default ~/.jarvis/phrases); "0" turns the phrase cache off.
+PHRASE_CACHE = (os.getenv("JARVIS_PHRASE_CACHE") or "").strip()
+
+def get_tts() -> SpeechWorker:
+    """The shared speech worker; JARVIS_TTS picks the backend (sapi, null, file)."""
+    global _tts
+    if _tts is None:
+        backend = get_tts_backend()
+        if PHRASE_CACHE != "0" and type(backend).render is not TTSBackend.render:
+            try:
+                cache = PhraseCache(PHRASE_CACHE or None)
+                cache.register(FIXED_PHRASES)
+                backend = CachingBackend(backend, cache)
+            except OSError as e:
+                print(f"[TTS cache] disabled: {e}")
+        _tts = SpeechWorker(backend)
+    return _tts
+
+# Lines that say the wake word aloud, tracked so the wake detector can ignore them
+_self_mentions = []
+_self_mentions_lock = Lock()
+WAKE_ECHO_TAIL = 0.5  # seconds after such a line ends that the mic may still be hearing it
+
+def speak(text: str, priority: int = NORMAL, wait: bool = False) -> Utterance:
+    """
+    Queue text for speech and echo to console; returns at once unless `wait`.
+    The returned Utterance can be waited on later when ordering matters.
+    """
     print(f"[Jarvis speaking]: {text}")
+    utt = get_tts().say(text, priority)
+    if WAKEWORD in text.lower():
+        with _self_mentions_lock:
+            _self_mentions.append(utt)
+    if wait:
+        utt.wait()
+    return utt
+
+def wake_muted() -> bool:
+    """
+    True while Jarvis is saying its own wake word (and for WAKE_ECHO_TAIL
+    after), so it can't wake itself; pass as WakeDetector(mute=...).
+    """
+    now = time.perf_counter()
+    with _self_mentions_lock:
+        _self_mentions[:] = [u for u in _self_mentions
+                             if not u.done or now - u.finished_at < WAKE_ECHO_TAIL]
+        return bool(_self_mentions)
+
+def play_earcon(freq: float = 880.0, duration: float = 0.12, volume: float = 0.2):
+    """Short non-blocking beep: a cheaper "I'm listening" cue than a spoken prompt."""
+    import sounddevice as sd
+    rate = 22050
+    t = np.arange(int(rate * duration)) / rate
+    tone = np.sin(2 * np.pi * freq * t) * volume
+    fade = min(len(tone) // 4, int(rate * 0.01))
+    tone[:fade] *= np.linspace(0.0, 1.0, fade)
+    tone[-fade:] *= np.linspace(1.0, 0.0, fade)
     try:
-        speaker.Speak(text)
+        sd.play(tone.astype(np.float32), rate)
     except Exception as e:
-        print(f"[TTS error]: {e}")
+        print(f"[Earcon error]: {e}")
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Audio capture: one long-lived stream shared by wake detection, STT and the noise floor
+audio_bus = None
+noise_floor = None
+
+class _BusStream:
+    """The `stream` speech_recognition reads from: one bus frame per read()."""
+
+    def __init__(self, reader, on_frame=None):
+        self.reader = reader
+        self.on_frame = on_frame
+
+    def read(self, size: int) -> bytes:
+        frame = self.reader.read(timeout=1.0)
+        if frame is None:
+            return b""  # end of stream
+        if self.on_frame is not None:
+            self.on_frame(frame)
+        return frame.tobytes()
+
+    def close(self):
+        self.reader.close()
+
+class BusMicrophone(sr.AudioSource):
+    """speech_recognition AudioSource backed by the shared AudioBus (no PyAudio device open)."""
+
+    def __init__(self, bus: AudioBus, start: int | None = None, on_frame=None):
+        self.bus = bus
+        self.start = start  # bus frame to start from; None → next frame captured
+        self.on_frame = on_frame  # called with every frame as it is read (streaming STT)
+        self.SAMPLE_RATE = bus.sample_rate
+        self.SAMPLE_WIDTH = 2
+        self.CHUNK = bus.frame_length
+        self.stream = None
+
+    def __enter__(self):
+        self.stream = _BusStream(self.bus.reader(self.start), self.on_frame)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stream.close()
+        self.stream = None
 
 # ──────────────────────────────────────────────────────────────────────────────
 # STT Setup
 recognizer = sr.Recognizer()
-mic = sr.Microphone()
-
-def init_audio():
-    """Calibrate ambient noise once. MUST be called by your entrypoint before listening."""
-    with mic as source:
-        recognizer.adjust_for_ambient_noise(source, duration=0.1)
 
-def listen(timeout: float = 5, phrase_time_limit: float = 5) -> str:
+# Endpointing: "vad" (default) closes the utterance TRAILING_SILENCE seconds after speech
+# ends, against a continuously tracked noise floor; "sr" uses speech_recognition's pause detection.
+ENDPOINTER = (os.getenv("JARVIS_ENDPOINTER") or "vad").strip().lower()
+TRAILING_SILENCE = float(os.getenv("JARVIS_TRAILING_SILENCE", "0.5"))
+_stt_backend = None
+
+def get_stt_backend():
+    """The configured STT engine (JARVIS_STT=google|vosk), built on first use."""
+    global _stt_backend
+    if _stt_backend is None:
+        name = (os.getenv("JARVIS_STT") or "google").strip().lower()
+        _stt_backend = GoogleBackend(recognizer) if name == "google" else get_backend(name)
+    return _stt_backend
+
+def init_audio(source=None) -> AudioBus:
     """
-    Listen on the default mic.
+    Start the shared capture bus (default: the system microphone; pass a
+    jarvis_audio WavFileSource/GeneratorSource to run headless) and the
+    noise-floor tracker. MUST be called by your entrypoint before listening.
+    """
+    global audio_bus, noise_floor
+    if audio_bus is None:
+        audio_bus = AudioBus(source or SoundDeviceSource()).start()
+        noise_floor = NoiseFloorTracker(audio_bus)
+    if ENDPOINTER == "sr":
+        # speech_recognition's energy threshold is calibrated once
+        with BusMicrophone(audio_bus) as src:
+            recognizer.adjust_for_ambient_noise(src, duration=0.1)
+    return audio_bus
+
+def listen(timeout: float = 5, phrase_time_limit: float = 5, start: int | None = None) -> str:
+    """
+    Listen on the shared capture bus.
     timeout: seconds to wait for phrase start
     phrase_time_limit: max seconds for the phrase itself
+    start: bus frame to begin at (e.g. WakeDetector.last_wake_frame, so words
+           spoken right after the wake word are kept); None → from now
     """
-    with mic as source:
-        print("[jarvis listening…]")
-        try:
-            audio = recognizer.listen(source, timeout=timeout, phrase_time_limit=phrase_time_limit)
-        except WaitTimeoutError:
-            speak("I didn't hear anything.")
-            return ""
+    if audio_bus is None:
+        init_audio()
+    try:
+        backend = get_stt_backend()
+    except STTError as e:
+        speak(f"Speech service error: {e}")
+        return ""
 
+    on_frame = None
+    if backend.streaming:
+        # Decode while the user is still talking; only the tail is left at end of speech
+        backend.start(audio_bus.sample_rate)
+        last_partial = None
+
+        def _feed_partial(pcm):
+            nonlocal last_partial
+            partial = backend.accept(pcm)
+            if partial and partial != last_partial:
+                last_partial = partial
+                print(f"[Partial]: {partial}")
+
+        on_frame = _feed_partial
+
+    print("[jarvis listening…]")
+    with jarvis_trace.span("capture"):
+        if ENDPOINTER == "sr":
+            # Legacy: speech_recognition's pause detection
+            with BusMicrophone(audio_bus, start, on_frame=on_frame) as source:
+                try:
+                    audio = recognizer.listen(source, timeout=timeout, phrase_time_limit=phrase_time_limit)
+                except WaitTimeoutError:
+                    speak("I didn't hear anything.")
+                    return ""
+            pcm = audio.get_raw_data()
+        else:
+            reader = audio_bus.reader(start)
+            endpointer = Endpointer(
+                audio_bus.sample_rate, audio_bus.frame_length,
+                trailing_silence=TRAILING_SILENCE,
+                noise_floor=noise_floor.level if noise_floor is not None else None,
+            )
+            try:
+                pcm, _ = record_utterance(reader, endpointer, timeout=timeout, max_seconds=phrase_time_limit,
+                                          on_frame=on_frame)
+            except NoSpeech:
+                speak("I didn't hear anything.")
+                return ""
+            finally:
+                reader.close()
+
+    t_end = time.perf_counter()
     try:
-        text = recognizer.recognize_google(audio)
-        print(f"[Recognized]: {text}")
-        return text
-    except RequestError as e:
+        with jarvis_trace.span("stt"):
+            if backend.streaming:
+                text = backend.finish()
+            else:
+                text = backend.transcribe(pcm, audio_bus.sample_rate)
+    except STTError as e:
         speak(f"Speech service error: {e}")
         return ""
-    except sr.UnknownValueError:
+    if not text:
         speak("Sorry, I couldn't understand.")
         return ""
+    print(f"[Recognized by {backend.name} {time.perf_counter() - t_end:.2f}s after capture]: {text}")
+    return text
 
 # ──────────────────────────────────────────────────────────────────────────────
 # Wake Word Detector
@@ -102,9 +287,11 @@ class WakeDetector:
     - Otherwise, tries a custom .ppn:
         • If `keyword` is an absolute path ending with .ppn, uses that.
         • Else it looks for JARVIS_PPN from .env (absolute path).
+    - Detections are ignored while `mute()` is True (default: wake_muted).
     """
 
-    def __init__(self, keyword: str = WAKEWORD, model_path: str | None = None, sensitivity: float = 0.5):
+    def __init__(self, keyword: str = WAKEWORD, model_path: str | None = None, sensitivity: float = 0.5,
+                 bus: AudioBus | None = None, mute=None):
         if not PV_ACCESS_KEY:
             raise RuntimeError(
                 "PV_ACCESS_KEY is missing. Add it to your .env:\n"
@@ -158,29 +345,33 @@ class WakeDetector:
             ) from e
 
         self._stop = Event()
-
-    def _audio_callback(self, indata, frames, time_info, status):
-        if status:
-            # non-fatal audio glitch info
-            pass
-        # Convert bytes → 16-bit PCM tuple for Porcupine
-        pcm = struct.unpack_from("h" * frames, indata.tobytes())
-        if self._porcupine.process(pcm) >= 0:
-            self._stop.set()
+        self._bus = bus
+        self._mute = mute or wake_muted
+        self._reader = None
+        self.last_wake_frame = None  # bus frame right after the keyword ended (start of the pre-roll)
 
     def wait_for_wake(self) -> bool:
         """Blocks until the wake-word is detected. Returns True if detected; False if stopped."""
+        bus = self._bus or audio_bus or init_audio()
+        if (bus.sample_rate, bus.frame_length) != (self._porcupine.sample_rate, self._porcupine.frame_length):
+            raise RuntimeError("Audio bus format does not match Porcupine's sample rate / frame length")
         self._stop.clear()
-        with sd.InputStream(
-            device=None,  # default input
-            samplerate=self._porcupine.sample_rate,
-            blocksize=self._porcupine.frame_length,
-            channels=1,
-            dtype="int16",
-            callback=self._audio_callback,
-        ):
-            self._stop.wait()
-            return True
+        # Fresh cursor each cycle: only audio captured from now on can wake us
+        self._reader = bus.reader()
+        try:
+            while not self._stop.is_set():
+                # int16 memoryview straight out of the bus ring
+                pcm = self._reader.read(timeout=0.5)
+                if pcm is None:
+                    if bus.finished:
+                        return False
+                    continue
+                if self._porcupine.process(pcm) >= 0 and not self._mute():
+                    self.last_wake_frame = self._reader.position
+                    return True
+            return False
+        finally:
+            self._reader.close()
 
     def stop(self):
         self._stop.set()
@@ -202,352 +393,691 @@ JOKES = [
     "Why did the computer show up late to work? It had a hard drive."
 ]
 
-def local_small_talk(cmd: str) -> str:
-    text = cmd.lower()
-    if any(g in text for g in ("hi", "hello", "hey", "good morning", "good afternoon", "good evening")):
-        return random.choice(GREETINGS)
-    if "how are you" in text or "how's it going" in text:
-        return random.choice(HOW_ARE_YOU)
-    if "joke" in text or "tell me a joke" in text:
-        return random.choice(JOKES)
-    return ""
+# Fixed lines worth pre-rendering (see jarvis_phrases); other repeated text is learned as it's spoken.
+FIXED_PHRASES = (
+    *GREETINGS, *HOW_ARE_YOU, *JOKES,
+    "I am Jarvis. How can I assist you today?",
+    "How can I help you?",
+    "Please try again and say 'jarvis' to wake me.",
+    "Sorry, I didn’t understand that. Please say 'jarvis' to wake me and try again.",
+    "I didn't hear anything.",
+    "Sorry, I couldn't understand.",
+    "Goodbye!",
+    LLM_ERROR_REPLY,
+)
 
 # ──────────────────────────────────────────────────────────────────────────────
 # Screen Recording
-def record_screen(duration: int, output_file: str, fps: int = 15):
-    """Capture the entire virtual desktop for `duration` seconds, with console logs."""
+RECORD_SCALE = float(os.getenv("JARVIS_RECORD_SCALE", "1.0"))
+
+def record_screen(duration: int, output_file: str, fps: int = 15, monitor: int = 0,
+                  window: str | None = None, scale: float | None = None):
+    """
+    Capture the screen for `duration` seconds, with console logs: the whole
+    virtual desktop (monitor=0), one monitor, or the rectangle of a window
+    whose title contains `window`; `scale` < 1 downsizes the output.
+    """
+    scale = scale or RECORD_SCALE
     print(f"[Recorder] Starting capture for {duration}s → {output_file}")
     try:
-        with mss.mss() as sct:
-            virtual = sct.monitors[0]
-            width, height = virtual["width"], virtual["height"]
-            fourcc = cv2.VideoWriter_fourcc(*"mp4v")
-            writer = cv2.VideoWriter(output_file, fourcc, fps, (width, height))
-
-            end_time = time.time() + duration
-            interval = 1.0 / fps
-            frame_count = 0
-
-            while time.time() < end_time:
-                start = time.time()
-                img = np.array(sct.grab(virtual))
-                frame = cv2.cvtColor(img, cv2.COLOR_BGRA2BGR)
-                writer.write(frame)
-                frame_count += 1
-
-                # throttle
-                elapsed = time.time() - start
-                if elapsed < interval:
-                    time.sleep(interval - elapsed)
-
-            writer.release()
-            print(f"[Recorder] Finished: wrote {frame_count} frames.")
+        source = jarvis_recorder.MssSource.for_window(window) if window else jarvis_recorder.MssSource(monitor=monitor)
+        recorder = jarvis_recorder.ScreenRecorder(source, fps=fps, scale=scale)
+        stats = recorder.record(duration, output_file)
+        w, h = stats["size"]
+        print(
+            f"[Recorder] Finished: wrote {stats['written']} frames at {w}x{h} "
+            f"({stats['unchanged']} unchanged, {stats['duplicated']} repeated, {stats['dropped']} dropped), "
+            f"capture {stats['capture_fps']:.1f} fps, max queue depth {stats['max_queue_depth']}; "
+            f"{stats['cpu_per_minute']:.1f} CPU s and {stats['bytes_per_minute'] / 1e6:.1f} MB per recorded minute."
+        )
     except Exception as e:
         print(f"[Recorder] ERROR: {e}")
 
 # ──────────────────────────────────────────────────────────────────────────────
-# Command Dispatcher
-def handle_command(cmd: str) -> bool:
+# File index: "find file" / "open file" look names up here instead of globbing
+_file_index = None
+_file_index_lock = Lock()
+
+def get_file_index() -> "jarvis_fileindex.FileIndex | None":
+    """The background file index, crawling from first use; None if JARVIS_INDEX=0."""
+    global _file_index
+    if _file_index is None and os.getenv("JARVIS_INDEX", "1").strip() != "0":
+        with _file_index_lock:  # the warm-up thread and the first command mustn't both start a crawler
+            if _file_index is None and os.getenv("JARVIS_INDEX", "1").strip() != "0":
+                try:
+                    index = jarvis_fileindex.FileIndex()
+                    index.start()
+                    _file_index = index
+                except (OSError, sqlite3.Error) as e:
+                    print(f"[Index] disabled: {e}")
+                    os.environ["JARVIS_INDEX"] = "0"
+    return _file_index
+
+def find_files(name: str, folder: str | None = None, limit: int = 10) -> list:
     """
-    Returns True if a built-in command handled it;
-    False → fall back to LLM.
+    Paths matching a spoken file name, best first. Until the first crawl has
+    finished, or for folders outside the index, falls back to a one-folder glob.
     """
-    cmd = cmd.lower().strip()
-    print(f">>> You said: {cmd}")
-
-    # Small-talk
-    reply = local_small_talk(cmd)
-    if reply:
-        speak(reply)
-        return True
-
-    # Context-aware typing
-    if m := re.match(r"type (.+) on (browser|notepad|word|code)", cmd):
-        text, app = m.group(1), m.group(2)
-        title_map = {
-            "browser": "https://www.google.com",
-            "notepad": "Notepad",
-            "word": "Microsoft Word",
-            "code": "Visual Studio Code"
-        }
-        title = title_map.get(app)
-        if title:
-            wins = gw.getWindowsWithTitle(title)
-            if wins:
-                wins[0].activate(); time.sleep(0.5)
-            else:
-                subprocess.Popen({
-                    'notepad': 'notepad.exe',
-                    'word': 'winword.exe',
-                    'code': 'code'
-                }[app])
-                time.sleep(1)
-        pyautogui.write(text, interval=0.05)
-        speak(f"Typed '{text}' in {app}")
-        return True
+    index = get_file_index()
+    results = []
+    if index is not None and index.ready:
+        results = [h.path for h in index.search(name, folder=folder, limit=limit)]
+    if not results and folder:
+        results = _glob.glob(os.path.join(folder, f"*{name}*"))[:limit]
+    return results
 
-    if m := re.match(r"type (.+)", cmd):
-        text = m.group(1)
-        pyautogui.write(text, interval=0.05)
-        speak(f"Typed '{text}'")
-        return True
-
-    # App control
-    if m := re.match(r"(?:open|launch) app (.+)", cmd):
-        app = m.group(1).strip()
-        speak(f"Opening {app}")
-        subprocess.Popen(app.split())
-        return True
-
-    if m := re.match(r"close app (.+)", cmd):
-        app = m.group(1).strip()
-        speak(f"Closing {app}")
-        os.system(f"taskkill /im {app}.exe /f")
-        return True
-
-    if m := re.match(r"(?:minimize|maximize) window", cmd):
-        win = gw.getActiveWindow()
-        if win:
-            if "minimize" in cmd:
-                win.minimize(); speak("Window minimized")
-            else:
-                win.maximize(); speak("Window maximized")
-        return True
-
-    # Browser & Web Search
-    if re.match(r"open browser", cmd):
-        speak("Opening default browser.")
-        webbrowser.open("https://www.google.com")
-        return True
-
-    if m := re.match(r"search web for (.+)", cmd):
-        q = m.group(1)
-        speak(f"Searching the web for {q}")
-        webbrowser.open(f"https://www.google.com/search?q={q}")
-        return True
-
-    if "recycle bin" in cmd:
-        speak("Opening Recycle Bin.")
-        subprocess.Popen(["explorer", "shell:RecycleBinFolder"])
-        return True
-
-    if "my computer" in cmd or re.match(r"open (?:my )?computer", cmd):
-        speak("Opening This PC.")
-        subprocess.Popen(["explorer", "shell:MyComputerFolder"])
-        return True
-
-    if "open chat" in cmd:
-        speak("Opening ChatGPT.")
-        webbrowser.open("https://chatgpt.com/")
-        return True
-    elif "open google" in cmd:
-        speak("Opening Google.")
-        webbrowser.open("https://google.com/")
-        return True
-    elif "open insta" in cmd:
-        speak("Opening Instagram.")
-        webbrowser.open("https://instagram.com/")
-        return True
-    elif "linkedin" in cmd:
-        speak("Opening Linkedin.")
-        webbrowser.open("https://linkedin.com/")
-        return True
-    elif "open youtube" in cmd:
-        speak("Opening YouTube.")
-        webbrowser.open("https://youtube.com/")
-        return True
-
-    # File & Folder Ops
-    if m := re.match(r"create folder (.+)", cmd):
-        path = m.group(1).strip('"')
-        os.makedirs(path, exist_ok=True)
-        speak(f"Created folder {path}")
-        return True
+# ──────────────────────────────────────────────────────────────────────────────
+# Media library: "play something by X" / "play album X" resolve against it
+_media_library = None
+_media_library_lock = Lock()
+
+def get_media_library() -> "jarvis_media.MediaLibrary | None":
+    """The music library, loaded from disk and rescanned in the background; None if JARVIS_MEDIA=0."""
+    global _media_library
+    if _media_library is None and os.getenv("JARVIS_MEDIA", "1").strip() != "0":
+        with _media_library_lock:  # one scanner, however many threads ask first
+            if _media_library is None and os.getenv("JARVIS_MEDIA", "1").strip() != "0":
+                try:
+                    library = jarvis_media.MediaLibrary()
+                    library.start()
+                    _media_library = library
+                except (OSError, sqlite3.Error) as e:
+                    print(f"[Media] disabled: {e}")
+                    os.environ["JARVIS_MEDIA"] = "0"
+    return _media_library
+
+def play_tracks(tracks: list, description: str):
+    """Hands one track, or a playlist of several, to the default player."""
+    speak(f"Playing {description}")
+    os.startfile(tracks[0].path if len(tracks) == 1 else jarvis_media.write_playlist(tracks))
 
-    if m := re.match(r"delete folder (.+)", cmd):
-        path = m.group(1).strip('"')
-        if os.path.isdir(path):
-            shutil.rmtree(path)
-            speak(f"Deleted folder {path}")
+# ──────────────────────────────────────────────────────────────────────────────
+# Command Registry
+# Each built-in declares its patterns (matched at the start, like re.match) and
+# keywords (whole-word hits) once; the router compiles them at startup.
+# Declaration order is priority order.
+router = CommandRouter()
+
+# Context-aware typing
+# Window handles are cached per app and readiness is polled with backoff (jarvis_windows), not slept for.
+WINDOW_TIMEOUT = float(os.getenv("JARVIS_WINDOW_TIMEOUT", "10"))
+_window_registry = None
+
+def get_window_registry():
+    global _window_registry
+    if _window_registry is None:
+        _window_registry = jarvis_windows.WindowRegistry(timeout=WINDOW_TIMEOUT)
+    return _window_registry
+
+@router.command("type_on_app", patterns=[r"type (.+) on (browser|notepad|word|code)"])
+async def _cmd_type_on_app(cmd, m):
+    text, app = m.group(1), m.group(2)
+    title_map = {
+        "browser": "Google",  # the tab title of the page opened below, in any browser
+        "notepad": "Notepad",
+        "word": "- Word",     # "Document1 - Word"; a bare "word" would also match "Password"
+        "code": "Visual Studio Code"
+    }
+    title = title_map.get(app)
+    if title:
+        if app == "browser":
+            launch = lambda: webbrowser.open("https://www.google.com")
         else:
-            speak(f"Folder {path} not found")
-        return True
-
-    if m := re.match(r"delete file (.+)", cmd):
-        path = m.group(1).strip('"')
-        if os.path.isfile(path):
-            os.remove(path)
-            speak(f"Deleted file {path}")
+            launch = lambda: get_process_index().launch(app)
+        try:
+            result = await run_blocking(get_window_registry().activate, app, title, launch)
+        except OSError:
+            speak(f"I couldn't start {app}")
+            return
+        if result.handle is None:
+            speak(f"{app} wasn't ready after {result.seconds:.0f} seconds, so I didn't type anything")
+            return
+    await run_blocking(pyautogui.write, text, interval=0.05)
+    speak(f"Typed '{text}' in {app}")
+
+@router.command("type", patterns=[r"type (.+)"])
+def _cmd_type(cmd, m):
+    text = m.group(1)
+    pyautogui.write(text, interval=0.05)
+    speak(f"Typed '{text}'")
+
+# App control
+# Apps are started and closed in-process through psutil (jarvis_proc); no shell sees the spoken name.
+_process_index = None
+_process_index_lock = Lock()
+_pending_close = None  # (app key, deadline): a close waiting for "confirm close"
+CLOSE_CONFIRM_SECONDS = 30
+
+def get_process_index():
+    """The running-process index, refreshed in the background from first use."""
+    global _process_index
+    if _process_index is None:
+        with _process_index_lock:  # one refresh thread, whichever of warm-up and a command comes first
+            if _process_index is None:
+                _process_index = jarvis_proc.ProcessIndex().start()
+    return _process_index
+
+@router.command("open_app", patterns=[r"(?:open|launch) app (.+)"])
+def _cmd_open_app(cmd, m):
+    app = m.group(1).strip()
+    speak(f"Opening {app}")
+    try:
+        get_process_index().launch(app)
+    except OSError:
+        speak(f"I couldn't find an app called {app}")
+
+@router.command("close_app", patterns=[r"close app (.+)"])
+def _cmd_close_app(cmd, m):
+    global _pending_close
+    app = m.group(1).strip()
+    report = get_process_index().close(app)
+    if report is not None and report.pending:
+        # Several separate instances, "python"/"node" (which may be anything, including Jarvis's helpers),
+        # or a guess ("teams" matching steam.exe): say what it would close and wait for "confirm close"
+        n = len(report.pending)
+        _pending_close = (report.name, time.monotonic() + CLOSE_CONFIRM_SECONDS)
+        speak(f"That would close {n} {report.name} process{'es' if n > 1 else ''}. Say 'confirm close' to go ahead")
+        return
+    _speak_close(app, report)
+
+@router.command("confirm_close", keywords=["confirm close"])
+def _cmd_confirm_close(cmd, m):
+    global _pending_close
+    pending, _pending_close = _pending_close, None
+    if pending is None or time.monotonic() > pending[1]:
+        speak("There's nothing waiting to be closed")
+        return
+    _speak_close(pending[0], get_process_index().close(pending[0], confirmed=True))
+
+def _speak_close(app, report):
+    if report is None:
+        speak(f"{app} isn't running")
+    elif not (report.closed or report.killed or report.survivors):  # protected, or Jarvis itself
+        speak(f"I'm not allowed to close {report.name}")
+    elif report.survivors:
+        speak(f"{report.name} didn't close; {len(report.survivors)} still running")
+    else:
+        n = len(report.closed) + len(report.killed)
+        speak(f"Closed {report.name}" + (f", {n} instances" if n > 1 else "")
+              + (" (forced)" if report.killed else ""))
+
+@router.command("window", patterns=[r"(?:minimize|maximize) window"])
+def _cmd_window(cmd, m):
+    win = gw.getActiveWindow()
+    if win:
+        if cmd.startswith("minimize"):
+            win.minimize(); speak("Window minimized")
         else:
-            speak(f"File {path} not found")
-        return True
+            win.maximize(); speak("Window maximized")
+
+# Browser & Web Search
+@router.command("open_browser", patterns=[r"open browser"])
+def _cmd_open_browser(cmd, m):
+    speak("Opening default browser.")
+    webbrowser.open("https://www.google.com")
+
+@router.command("search_web", patterns=[r"search web for (.+)"])
+def _cmd_search_web(cmd, m):
+    q = m.group(1)
+    speak(f"Searching the web for {q}")
+    webbrowser.open(f"https://www.google.com/search?q={q}")
+
+@router.command("recycle_bin", keywords=["recycle bin"])
+def _cmd_recycle_bin(cmd, m):
+    speak("Opening Recycle Bin.")
+    subprocess.Popen(["explorer", "shell:RecycleBinFolder"])
+
+@router.command("my_computer", patterns=[r"open (?:my )?computer"], keywords=["my computer"])
+def _cmd_my_computer(cmd, m):
+    speak("Opening This PC.")
+    subprocess.Popen(["explorer", "shell:MyComputerFolder"])
+
+_SITES = {
+    "open chat": ("ChatGPT", "https://chatgpt.com/"),
+    "open google": ("Google", "https://google.com/"),
+    "open insta": ("Instagram", "https://instagram.com/"),
+    "linkedin": ("Linkedin", "https://linkedin.com/"),
+    "open youtube": ("YouTube", "https://youtube.com/"),
+}
 
-    if m := re.match(r"open file (.+)", cmd):
-        path = m.group(1).strip('"')
-        if os.path.exists(path):
-            speak(f"Opening file {path}")
-            os.startfile(path)
-        else:
+def _open_site(key):
+    def handler(cmd, m):
+        label, url = _SITES[key]
+        speak(f"Opening {label}.")
+        webbrowser.open(url)
+    return handler
+
+router.register("site_chat", _open_site("open chat"), keywords=["open chat"])
+router.register("site_google", _open_site("open google"), keywords=["open google"])
+router.register("site_insta", _open_site("open insta"), keywords=["open insta", "open instagram"])
+router.register("site_linkedin", _open_site("linkedin"), keywords=["linkedin"])
+router.register("site_youtube", _open_site("open youtube"), keywords=["open youtube"])
+
+# File & Folder Ops
+@router.command("create_folder", patterns=[r"create folder (.+)"])
+def _cmd_create_folder(cmd, m):
+    path = m.group(1).strip('"')
+    os.makedirs(path, exist_ok=True)
+    speak(f"Created folder {path}")
+
+@router.command("delete_folder", patterns=[r"delete folder (.+)"])
+def _cmd_delete_folder(cmd, m):
+    path = m.group(1).strip('"')
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+        speak(f"Deleted folder {path}")
+    else:
+        speak(f"Folder {path} not found")
+
+@router.command("delete_file", patterns=[r"delete file (.+)"])
+def _cmd_delete_file(cmd, m):
+    path = m.group(1).strip('"')
+    if os.path.isfile(path):
+        os.remove(path)
+        speak(f"Deleted file {path}")
+    else:
+        speak(f"File {path} not found")
+
+@router.command("open_file", patterns=[r"open file (.+)"])
+def _cmd_open_file(cmd, m):
+    path = m.group(1).strip('"')
+    if not os.path.exists(path):
+        # A spoken name rather than a path: open the best match from the index
+        results = find_files(path, limit=1)
+        if not results:
             speak(f"File {path} not found")
-        return True
-
-    if m := re.match(r"find file (.+) in (.+)", cmd):
-        name, folder = m.group(1), m.group(2)
-        results = _glob.glob(os.path.join(folder, f"*{name}*"))
-        if results:
-            speak(f"Found {len(results)} files; opening first.")
-            os.startfile(results[0])
-        else:
-            speak("No matching files found.")
-        return True
-
-    # Media Control
-    if m := re.match(r"play music from (.+)", cmd):
-        folder = m.group(1).strip('"')
-        if os.path.isdir(folder):
-            tracks = _glob.glob(os.path.join(folder, "*.mp3"))
-            if tracks:
-                speak(f"Playing {os.path.basename(tracks[0])}")
-                os.startfile(tracks[0])
-            else:
-                speak("No mp3 files found.")
+            return
+        path = results[0]
+    speak(f"Opening file {os.path.basename(path)}")
+    os.startfile(path)
+
+@router.command("find_file", patterns=[r"find file (.+) in (.+)", r"find file (.+)"])
+def _cmd_find_file(cmd, m):
+    name = m.group(1).strip('"')
+    spoken_folder = m.group(2) if m.lastindex == 2 else None
+    folder = (jarvis_fileindex.resolve_folder(spoken_folder) or spoken_folder) if spoken_folder else None
+    results = find_files(name, folder)
+    if results:
+        speak(f"Found {len(results)} files; opening {os.path.basename(results[0])}.")
+        os.startfile(results[0])
+    else:
+        speak("No matching files found.")
+
+# Media Control
+@router.command("play_music_from", patterns=[r"play music from (.+)"])
+def _cmd_play_music_from(cmd, m):
+    spoken = m.group(1).strip('"')
+    folder = spoken if os.path.isdir(spoken) else jarvis_fileindex.resolve_folder(spoken)
+    if folder:
+        library = get_media_library()
+        tracks = library.in_folder(folder) if library is not None else []
+        if not tracks:
+            paths = sorted(os.path.join(d, f) for d, _, files in os.walk(folder)
+                           for f in files if os.path.splitext(f)[1].lower() in jarvis_media.AUDIO_EXTS)
+            tracks = [jarvis_media.track_from_path(p) for p in paths]
+        if tracks:
+            play_tracks(tracks, f"{len(tracks)} songs from {os.path.basename(folder.rstrip(os.sep)) or folder}")
         else:
-            speak(f"Folder {folder} not found")
-        return True
-
-    if "play" in cmd:
-        pyautogui.press("playpause")
-        speak("Toggled play/pause")
-        return True
-
-    if "next" in cmd:
-        pyautogui.press("nexttrack")
-        speak("Next track")
-        return True
-
-    if "previous" in cmd:
-        pyautogui.press("prevtrack")
-        speak("Previous track")
-        return True
-
-    # Volume Control
-    if m := re.match(r"set volume to (\d+)", cmd):
-        vol = max(0, min(100, int(m.group(1))))
-        speaker.Volume = vol
-        speak(f"Volume set to {vol}%")
-        return True
-
-    if "mute" in cmd:
-        pyautogui.press("volumemute")
-        speak("Muted")
-        return True
-
-    if "unmute" in cmd:
-        speaker.Volume = 100
-        speak("Unmuted")
-        return True
-
-    if "volume up" in cmd:
-        pyautogui.press("volumeup")
-        speak("Volume up")
-        return True
-
-    if "volume down" in cmd:
-        pyautogui.press("volumedown")
-        speak("Volume down")
-        return True
-
-    # Screenshots & Recording
-    if "screenshot" in cmd:
-        fn = f"screenshot_{int(time.time())}.png"
-        pyautogui.screenshot().save(fn)
-        speak(f"Saved screenshot as {fn}")
-        return True
-
-    if any(phrase in cmd for phrase in ["record screen", "start recording", "capture screen", "screen capture", "record video", "start record"]):
-        # parse duration or default to 10
-        m = re.search(r'(\d+)', cmd)
-        duration = int(m.group(1)) if m else 10
-        fn = f"recording_{int(time.time())}.mp4"
-        speak(f"Recording of {duration} seconds of screen is starting now.")
-
-        # run in background to avoid blocking Jarvis’s main loop
-        import threading
-        t = threading.Thread(target=record_screen, args=(duration, fn), daemon=True)
-        t.start()
-        return True
-
-    # System Info
-    if "what time" in cmd:
-        now = time.strftime("%I:%M %p")
-        speak(f"The time is {now}")
-        return True
-
-    if "what date" in cmd:
-        today = time.strftime("%B %d, %Y")
-        speak(f"Today is {today}")
-        return True
-
-    if "battery" in cmd:
-        batt = psutil.sensors_battery()
-        speak(f"Battery at {int(batt.percent)}%") if batt else speak("Battery info unavailable")
-        return True
-
-    if "cpu usage" in cmd:
-        speak(f"CPU at {psutil.cpu_percent()}%")
-        return True
+            speak("No music files found.")
+        return
+    # Not a folder: "play music from Queen" means the artist
+    _cmd_play_media(f"play music by {spoken}", None)
+
+@router.command("play_media", patterns=[
+    r"play (?:something|anything|songs|music|tracks) by .+",
+    r"play (?:the )?(?:album|song|track) .+",
+    r"play .+ by .+",
+])
+def _cmd_play_media(cmd, m):
+    library = get_media_library()
+    if library is None or not len(library):
+        speak("Your music library is empty or still being scanned.")
+        return
+    tracks, description = library.resolve(cmd)
+    if tracks:
+        play_tracks(tracks, description)
+    else:
+        speak("I couldn't find that in your music.")
+
+@router.command("play_pause", keywords=["play"])
+def _cmd_play_pause(cmd, m):
+    pyautogui.press("playpause")
+    speak("Toggled play/pause")
+
+@router.command("next_track", keywords=["next"])
+def _cmd_next_track(cmd, m):
+    pyautogui.press("nexttrack")
+    speak("Next track")
+
+@router.command("previous_track", keywords=["previous"])
+def _cmd_previous_track(cmd, m):
+    pyautogui.press("prevtrack")
+    speak("Previous track")
+
+# Volume Control
+@router.command("set_volume", patterns=[r"set volume to (\d+)"])
+def _cmd_set_volume(cmd, m):
+    vol = max(0, min(100, int(m.group(1))))
+    get_tts().volume = vol
+    speak(f"Volume set to {vol}%")
+
+@router.command("unmute", keywords=["unmute"])
+def _cmd_unmute(cmd, m):
+    get_tts().volume = 100
+    speak("Unmuted")
+
+@router.command("mute", keywords=["mute"])
+def _cmd_mute(cmd, m):
+    pyautogui.press("volumemute")
+    speak("Muted")
+
+@router.command("volume_up", keywords=["volume up"])
+def _cmd_volume_up(cmd, m):
+    pyautogui.press("volumeup")
+    speak("Volume up")
+
+@router.command("volume_down", keywords=["volume down"])
+def _cmd_volume_down(cmd, m):
+    pyautogui.press("volumedown")
+    speak("Volume down")
+
+# Screenshots & Recording
+@router.command("screenshot", keywords=["screenshot"])
+def _cmd_screenshot(cmd, m):
+    fn = f"screenshot_{int(time.time())}.png"
+    pyautogui.screenshot().save(fn)
+    speak(f"Saved screenshot as {fn}")
+
+_DURATION_RE = re.compile(r"(\d+)")
+_MONITOR_RE = re.compile(r"\b(?:monitor|display) (\d+)")
+_WINDOW_RE = re.compile(r"\bwindow ([a-z][\w ]*?)(?: for \d+| \d+|$)")
+_SMALL_RE = re.compile(r"\b(?:half size|small|low res(?:olution)?)\b")
+
+@router.command("record_screen", keywords=[
+    "record screen", "start recording", "capture screen", "screen capture", "record video", "start record",
+    "record monitor", "record display", "record window",
+])
+def _cmd_record_screen(cmd, m):
+    # optional target: "monitor 2" or "window notepad"; "half size" downscales
+    mon = _MONITOR_RE.search(cmd)
+    win = _WINDOW_RE.search(cmd)
+    opts = {
+        "monitor": int(mon.group(1)) if mon else 0,
+        "window": win.group(1).strip() if win else None,
+        "scale": 0.5 if _SMALL_RE.search(cmd) else None,
+    }
+    # parse duration (ignoring the monitor number) or default to 10
+    d = _DURATION_RE.search(_MONITOR_RE.sub("", cmd))
+    duration = int(d.group(1)) if d else 10
+    fn = f"recording_{int(time.time())}.mp4"
+    speak(f"Recording of {duration} seconds of screen is starting now.")
+
+    # run in background to avoid blocking Jarvis’s main loop
+    t = Thread(target=record_screen, args=(duration, fn), kwargs=opts, daemon=True)
+    t.start()
+
+# System Info
+@router.command("time", keywords=["what time"])
+def _cmd_time(cmd, m):
+    now = time.strftime("%I:%M %p")
+    speak(f"The time is {now}")
+
+@router.command("date", keywords=["what date"])
+def _cmd_date(cmd, m):
+    today = time.strftime("%B %d, %Y")
+    speak(f"Today is {today}")
+
+# CPU / RAM / battery come from the background sampler's buffers (jarvis_sysmon)
+_system_monitor = None
+_system_monitor_lock = Lock()
+_SPAN_RE = re.compile(r"(?:last|past) (?:(\d+|a|an|one|few) )?(second|minute|hour)s?")
+
+def get_system_monitor() -> "jarvis_sysmon.SystemMonitor | None":
+    """The background metrics sampler, started on first use; None if JARVIS_SYSMON=0."""
+    global _system_monitor
+    if _system_monitor is None and os.getenv("JARVIS_SYSMON", "1").strip() != "0":
+        with _system_monitor_lock:  # a second sampler thread would run unseen
+            if _system_monitor is None and os.getenv("JARVIS_SYSMON", "1").strip() != "0":
+                try:
+                    _system_monitor = jarvis_sysmon.from_env().start()
+                except ImportError as e:
+                    print(f"[Sysmon] disabled: {e}")
+                    os.environ["JARVIS_SYSMON"] = "0"
+    return _system_monitor
+
+def _window_seconds(cmd: str) -> float | None:
+    """ "over the last minute" → 60, "last 30 seconds" → 30; None if no window was spoken."""
+    w = _SPAN_RE.search(cmd)
+    if w is None:
+        return None
+    n = {"a": 1, "an": 1, "one": 1, "few": 3, None: 1}.get(w.group(1)) or int(w.group(1))
+    return n * {"second": 1, "minute": 60, "hour": 3600}[w.group(2)]
+
+def _window_phrase(seconds: float) -> str:
+    if seconds >= 60 and seconds % 60 == 0:
+        n = int(seconds // 60)
+        return "the last minute" if n == 1 else f"the last {n} minutes"
+    return f"the last {int(seconds)} seconds"
+
+def _monitor_ready(timeout: float = 2.0) -> "jarvis_sysmon.SystemMonitor | None":
+    monitor = get_system_monitor()
+    return monitor if monitor is not None and monitor.ready.wait(timeout) else None
+
+@router.command("battery", keywords=["battery"])
+def _cmd_battery(cmd, m):
+    monitor = _monitor_ready()
+    batt = monitor.battery() if monitor is not None else None
+    if batt is None:
+        speak("Battery info unavailable")
+        return
+    percent, plugged = batt
+    speak(f"Battery at {int(percent)}%" + (", charging" if plugged else ""))
+
+@router.command("cpu_usage", keywords=["cpu usage", "cpu load", "processor load"])
+def _cmd_cpu_usage(cmd, m):
+    monitor = _monitor_ready()
+    if monitor is None:
+        speak(f"CPU at {psutil.cpu_percent(interval=0.5)}%")
+        return
+    window = _window_seconds(cmd)
+    if window and window > monitor.covered():
+        window = monitor.covered()  # only as much history as has been sampled
+    if "core" in cmd:
+        cores = ", ".join(f"{v:.0f}" for v in monitor.per_core(window))
+        speak(f"Per core: {cores} percent")
+    elif window:
+        speak(f"CPU averaged {monitor.cpu(window):.0f}% over {_window_phrase(window)}, "
+              f"peaking at {monitor.cpu_peak(window):.0f}%")
+    else:
+        speak(f"CPU at {monitor.cpu():.0f}%")
 
-    if "memory usage" in cmd:
+@router.command("memory_usage", keywords=["memory usage", "ram usage"])
+def _cmd_memory_usage(cmd, m):
+    monitor = _monitor_ready()
+    if monitor is None:
         speak(f"RAM at {psutil.virtual_memory().percent}%")
-        return True
-
-    if "ip address" in cmd:
-        ip = socket.gethostbyname(socket.gethostname())
-        speak(f"Your IP address is {ip}")
-        return True
-
-    if "system info" in cmd:
-        info = f"{platform.system()} {platform.release()}, {platform.machine()}"
-        speak(info)
-        return True
-
-    # Power & Lock
-    shutdown_keywords = ["shutdown", "shut down", "power off"]
-    restart_keywords  = ["restart", "reboot"]
-    cancel_keywords   = ["cancel shutdown", "abort shutdown", "stop shutdown", "cancel restart", "abort restart", "stop restart"]
-    lock_keywords     = ["lock workstation", "lock screen"]
-
-    # Shutdown
-    if any(kw in cmd for kw in shutdown_keywords):
-        speak("Shutting down in 30 seconds. Say 'cancel shutdown' to abort.")
-        os.system("shutdown /s /t 30")  # 30 second delay
-        return True
-
-    # Restart
-    if any(kw in cmd for kw in restart_keywords):
-        speak("Restarting in 30 seconds. Say 'cancel restart' to abort.")
-        os.system("shutdown /r /t 30")  # FIXED
-        return True
-
-    # Cancel pending shutdown/restart
-    if any(kw in cmd for kw in cancel_keywords):
-        speak("Shutdown/Restart cancelled.")
-        os.system("shutdown /a")
-        return True
+        return
+    window = _window_seconds(cmd)
+    if window:
+        window = min(window, monitor.covered())
+        speak(f"RAM averaged {monitor.memory(window):.0f}% over {_window_phrase(window)}")
+    else:
+        used = monitor.memory_used()
+        speak(f"RAM at {monitor.memory():.0f}%, {used / 2**30:.1f} gigabytes in use")
+
+@router.command("top_processes", keywords=[
+    "top processes", "what's using the cpu", "what is using the cpu", "what's using memory",
+    "what is using memory", "what's using the memory", "what is using the memory",
+])
+def _cmd_top_processes(cmd, m):
+    monitor = _monitor_ready()
+    if monitor is None:
+        speak("Process info unavailable")
+        return
+    by = "memory" if "memory" in cmd or "ram" in cmd.split() else "cpu"
+    procs = monitor.top_processes(3, by=by)
+    if not procs:
+        speak("Process info isn't ready yet")
+        return
+    if by == "memory":
+        listing = ", ".join(f"{p.name} {p.rss / 2**20:.0f} megabytes" for p in procs)
+    else:
+        listing = ", ".join(f"{p.name} {p.cpu:.0f}%" for p in procs)
+    speak(f"Top processes by {by}: {listing}")
+
+@router.command("ip_address", keywords=["ip address"])
+def _cmd_ip_address(cmd, m):
+    ip = socket.gethostbyname(socket.gethostname())
+    speak(f"Your IP address is {ip}")
+
+@router.command("system_info", keywords=["system info"])
+def _cmd_system_info(cmd, m):
+    info = f"{platform.system()} {platform.release()}, {platform.machine()}"
+    speak(info)
+
+# Latency tracing (jarvis_trace)
+@router.command("start_tracing", keywords=["start tracing", "enable tracing"])
+def _cmd_start_tracing(cmd, m):
+    jarvis_trace.enable()
+    speak("Tracing on.")
+
+@router.command("stop_tracing", keywords=["stop tracing", "disable tracing"])
+def _cmd_stop_tracing(cmd, m):
+    jarvis_trace.export()
+    jarvis_trace.disable()
+    speak("Tracing off; the report is saved.")
+
+@router.command("save_trace", keywords=["save trace", "export trace", "latency report"])
+def _cmd_save_trace(cmd, m):
+    json_path, _ = jarvis_trace.export()
+    print(jarvis_trace.report())
+    speak(f"Trace saved to {os.path.dirname(json_path)}")
+
+# Conversation memory (jarvis_chat)
+@router.command("new_conversation", keywords=["new conversation", "forget our conversation", "forget the conversation"])
+def _cmd_new_conversation(cmd, m):
+    reset_conversation()
+    speak("Okay, starting a new conversation.")
+
+@router.command("model_status", keywords=["model status", "llm status"])
+def _cmd_model_status(cmd, m):
+    parts = []
+    for tier, s in llm_stats().items():
+        memory = f" using {s['rss_bytes'] / 2**30:.1f} gigabytes" if s["loaded"] and s.get("rss_bytes") else ""
+        state = "loaded" if s["loaded"] else "not loaded"
+        parts.append(f"the {tier} model is {state}{memory} and has answered {s['routed']} requests")
+    speak("; ".join(parts).capitalize() + ".")
+
+# Power & Lock
+# "cancel shutdown" outranks "shutdown": nested keyword hits are dropped by the router.
+@router.command("cancel_shutdown", keywords=[
+    "cancel shutdown", "abort shutdown", "stop shutdown", "cancel restart", "abort restart", "stop restart",
+])
+def _cmd_cancel_shutdown(cmd, m):
+    speak("Shutdown/Restart cancelled.")
+    os.system("shutdown /a")
+
+@router.command("shutdown", keywords=["shutdown", "shut down", "power off"])
+def _cmd_shutdown(cmd, m):
+    speak("Shutting down in 30 seconds. Say 'cancel shutdown' to abort.")
+    os.system("shutdown /s /t 30")  # 30 second delay
+
+@router.command("restart", keywords=["restart", "reboot"])
+def _cmd_restart(cmd, m):
+    speak("Restarting in 30 seconds. Say 'cancel restart' to abort.")
+    os.system("shutdown /r /t 30")
+
+@router.command("lock", keywords=["lock workstation", "lock screen"])
+def _cmd_lock(cmd, m):
+    speak("Locking workstation.", wait=True)
+    ctypes.windll.user32.LockWorkStation()
+
+# Small-talk (after the commands, so "type hi on notepad" still types)
+@router.command("greeting", keywords=["hi", "hello", "hey", "good morning", "good afternoon", "good evening"])
+def _cmd_greeting(cmd, m):
+    speak(random.choice(GREETINGS))
+
+@router.command("how_are_you", keywords=["how are you", "how's it going"])
+def _cmd_how_are_you(cmd, m):
+    speak(random.choice(HOW_ARE_YOU))
+
+@router.command("joke", keywords=["joke"])
+def _cmd_joke(cmd, m):
+    speak(random.choice(JOKES))
+
+# Exit
+@router.command("exit", keywords=["exit", "quit", "goodbye"])
+def _cmd_exit(cmd, m):
+    speak("Goodbye!")
+
+router.compile()
 
-    # Lock screen
-    if any(kw in cmd for kw in lock_keywords):
-        speak("Locking workstation.")
-        ctypes.windll.user32.LockWorkStation()
+# ──────────────────────────────────────────────────────────────────────────────
+# Intent classifier: a second chance for phrasings no pattern/keyword covers
+# ("what's the time", "make it louder"), and the LLM-or-not decision.
+INTENT_EXAMPLES = (os.getenv("JARVIS_INTENT_EXAMPLES") or "").strip() or \
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "intent_examples.json")
+INTENT_THRESHOLD = float(os.getenv("JARVIS_INTENT_THRESHOLD", "0.6"))
+# Never run on a guess: these only fire on their exact keywords.
+_NO_GUESS = {"shutdown", "restart", "lock", "exit", "confirm_close"}
+_intent_classifier = None
+_intent_lock = Lock()
+
+def get_intent_classifier() -> "jarvis_intent.IntentClassifier | None":
+    """
+    Trained from the router's own patterns/keywords plus INTENT_EXAMPLES,
+    cached on disk until either changes; None if JARVIS_INTENT=0. Loading
+    can mean training: call it off the event loop.
+    """
+    global _intent_classifier
+    if _intent_classifier is None and os.getenv("JARVIS_INTENT", "1").strip() != "0":
+        with _intent_lock:  # the warm-up thread and the first command mustn't both train and save
+            if _intent_classifier is None:
+                examples = jarvis_intent.examples_from_router(router)
+                if os.path.exists(INTENT_EXAMPLES):
+                    examples += jarvis_intent.load_examples(INTENT_EXAMPLES)
+                _intent_classifier = jarvis_intent.load_or_train(examples)
+    return _intent_classifier
+
+def classify_intent(text: str) -> tuple[str, float]:
+    """(command name or "llm", confidence); ("llm", 0.0) with the classifier off."""
+    model = get_intent_classifier()
+    return model.classify(text) if model is not None else (jarvis_intent.UNKNOWN, 0.0)
+
+def _intent_fallback(text: str) -> str | None:
+    name, confidence = classify_intent(text)
+    command = router.get(name)
+    # Commands with patterns need their arguments (app name, folder, ...), which only the regex extracts
+    if command is None or command.patterns or name in _NO_GUESS or confidence < INTENT_THRESHOLD:
+        return None
+    print(f"[Intent] {text!r} → {name} ({confidence:.0%})")
+    return name
+
+router.fallback = _intent_fallback
+
+def wants_llm(cmd: str) -> bool:
+    """Should an utterance no command took go to the LLM (rather than "didn't understand")?"""
+    if cmd.split()[:1] in (["hi"], ["hello"], ["hey"], ["how"]):
         return True
+    name, confidence = classify_intent(cmd)
+    return name == jarvis_intent.UNKNOWN and confidence >= INTENT_THRESHOLD
 
-    # Exit
-    if any(k in cmd for k in ("exit", "quit", "goodbye")):
-        speak("Goodbye!")
-        return True
+# ──────────────────────────────────────────────────────────────────────────────
+# Command Dispatcher
+def handle_command(cmd: str) -> bool:
+    """
+    Returns True if a built-in command handled it;
+    False → fall back to LLM.
+    """
+    cmd = cmd.lower().strip()
+    print(f">>> You said: {cmd}")
+    return router.dispatch(cmd)
 
-    # Fallback → LLM
-    return False
+async def handle_command_async(cmd: str, executor=None) -> bool:
+    """handle_command for the asyncio main loop: blocking handlers run on `executor`."""
+    cmd = cmd.lower().strip()
+    print(f">>> You said: {cmd}")
+    return await router.dispatch_async(cmd, executor)
 
 # ──────────────────────────────────────────────────────────────────────────────
 # Startup Greeting
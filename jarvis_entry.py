@@ -1,12 +1,23 @@
+import jarvis_lazy  # first: starts the startup clock
+import asyncio
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
 from dotenv import load_dotenv
 
 # Load .env from project root (.. relative to this file)
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), "..", ".env"))
 
-from jarvis_llm import chat_with_ai
+import jarvis_trace
+from jarvis_llm import get_conversation, speak_stream, start_llm
+from jarvis_router import run_blocking
 from jarvis_wake import WakeDetector
-from jarvis_core import handle_command, speak, listen, greet_on_startup, init_audio
+from jarvis_core import (
+    handle_command_async, speak, listen, greet_on_startup, init_audio, play_earcon, get_tts, get_file_index, get_media_library,
+    get_intent_classifier, get_system_monitor, get_process_index, wants_llm, wake_muted,
+    WARM_UP_MODULES,
+)
 
 EXIT_KEYWORDS = ("exit", "quit", "goodbye")
 
@@ -14,28 +25,105 @@ def _get_wakeword():
     # Prefer WAKEWORD from .env, fall back to "jarvis"
     return os.getenv("WAKEWORD", "jarvis").strip().lower() or "jarvis"
 
-if __name__ == "__main__":
-    # Calibrate mic once (moved out of import-time side effects)
-    init_audio()
+def _wake_prompt_mode():
+    # JARVIS_WAKE_PROMPT=earcon: beep and keep the audio right after the wake word,
+    # so "Jarvis, open browser" works in one breath. Default: spoken prompt, then listen.
+    mode = os.getenv("JARVIS_WAKE_PROMPT", "speech").strip().lower()
+    return mode if mode in ("speech", "earcon") else "speech"
 
-    # Build exactly one WakeDetector here
-    # If you're using a custom .ppn for the "jarvis" hotword, set JARVIS_PPN in .env
-    # Example:
-    #   JARVIS_PPN=V:\Vinit\jarvis\resources\jarvis_en_windows.ppn
-    wake = WakeDetector(keyword=_get_wakeword())
+def _busy_policy():
+    # JARVIS_ON_BUSY: what a new wake word does to commands still running.
+    # "queue" (default) lets them finish and runs the new one after them;
+    # "interrupt" cancels them: an LLM reply or an async handler stops at its
+    # next await, but a blocking step already running on a thread can't be
+    # stopped, so the next command still waits (holding the command lock) until it returns.
+    mode = os.getenv("JARVIS_ON_BUSY", "queue").strip().lower()
+    return mode if mode in ("queue", "interrupt") else "queue"
 
-    greet_on_startup()
-    speak("I am Jarvis. How can I assist you today?")
+def _warm_up_enabled():
+    # JARVIS_WARMUP=0 disables background preloading of heavy modules and the LLM
+    return os.getenv("JARVIS_WARMUP", "1").strip() != "0"
+
+def _capture(wake, bus, prompt_mode):
+    # Prompt and listen (blocking; runs on the mic thread)
+    t_wake = time.perf_counter()
+    if prompt_mode == "earcon":
+        play_earcon()
+        start = wake.last_wake_frame  # pre-roll: capture begins where the keyword ended
+    else:
+        speak("How can I help you?", wait=True)  # finish the prompt before the mic listens
+        start = bus.seq
+    print(f"[Latency] wake → command capture ({prompt_mode}): "
+          f"{time.perf_counter() - t_wake:.3f}s wall, "
+          f"{bus.frame_seconds(start - wake.last_wake_frame):.3f}s of audio after the keyword skipped")
+    cmd = listen(timeout=8, phrase_time_limit=12, start=start) or ""
+    jarvis_trace.record("pipeline.wake_to_command", time.perf_counter() - t_wake)
+    # Ends when the first reply (or retry prompt) is audible; see SpeechWorker
+    jarvis_trace.arm("pipeline.wake_to_reply", "first_audio", start=t_wake)
+    return cmd.lower().strip()
+
+async def _run_command(cmd, lock, reply_cancels):
+    with jarvis_trace.span("pipeline.command"):  # includes time queued behind other commands
+        async with lock:  # handlers drive one keyboard/screen: run them one at a time
+            # 3) Built-in commands
+            if await handle_command_async(cmd):
+                return
+
+            # 4) Small talk and questions via LLM: streamed, the first sentence plays while
+            # the rest is still generating; a wake word cuts it off (barge-in)
+            if await run_blocking(wants_llm, cmd):  # may wait for the classifier to load
+                cancel = Event()
+                reply_cancels.add(cancel)
+                try:
+                    await run_blocking(speak_stream, cmd, speak, cancel=cancel,
+                                       conversation=get_conversation())
+                finally:
+                    reply_cancels.discard(cancel)
+                return
+
+            # 5) Nothing matched → retry
+            speak("Sorry, I didn’t understand that. Please say 'jarvis' to wake me and try again.")
+
+def _log_failure(task):
+    if not task.cancelled() and task.exception() is not None:
+        print(f"[Command] ERROR: {task.exception()!r}")
+
+async def main_loop(wake, bus, prompt_mode, tts):
+    """
+    Wake detection and capture run on one mic thread; each command then runs
+    as its own task (blocking handlers on the command pool) while the loop is
+    already waiting for the next wake word. Speech plays from the TTS worker
+    throughout.
+    """
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=4, thread_name_prefix="jarvis-cmd"))
+    mic = ThreadPoolExecutor(max_workers=1, thread_name_prefix="jarvis-mic")
+    policy = _busy_policy()
+    lock = asyncio.Lock()
+    running = set()
+    reply_cancels = set()  # set one to cut off the LLM reply being spoken
 
     while True:
         # 1) Wait for the wake word
-        if not wake.wait_for_wake():
+        if not await loop.run_in_executor(mic, wake.wait_for_wake):
             continue
 
+        # Barge-in: stop whatever Jarvis is still saying
+        jarvis_trace.disarm("first_audio")
+        for cancel in list(reply_cancels):
+            cancel.set()
+        if tts.cancel():
+            print("[TTS] interrupted by wake word")
+        if running:
+            if policy == "interrupt":
+                for task in running:
+                    task.cancel()
+                print(f"[Command] interrupted {len(running)} running command(s)")
+            else:
+                print(f"[Command] {len(running)} command(s) still running; the next one queues behind them")
+
         # 2) Prompt and listen
-        speak("How can I help you?")
-        cmd = listen(timeout=8, phrase_time_limit=12) or ""
-        cmd = cmd.lower().strip()
+        cmd = await loop.run_in_executor(mic, _capture, wake, bus, prompt_mode)
         if not cmd:
             speak("Please try again and say 'jarvis' to wake me.")
             continue
@@ -45,15 +133,40 @@ if __name__ == "__main__":
             speak("Goodbye!")
             continue
 
-        # 3) Built-in commands
-        if handle_command(cmd):
-            continue
+        # 3–5) Run it in the background and go straight back to wake detection
+        task = asyncio.create_task(_run_command(cmd, lock, reply_cancels), name=f"command: {cmd}")
+        running.add(task)
+        task.add_done_callback(running.discard)
+        task.add_done_callback(_log_failure)
 
-        # 4) Small-talk via LLM
-        if cmd.split()[0] in ("hi", "hello", "hey", "how"):
-            reply = chat_with_ai(cmd)
-            speak(reply)
-            continue
+if __name__ == "__main__":
+    jarvis_lazy.mark("imports done")
+
+    # Start the shared capture bus and calibrate the mic once (moved out of import-time side effects)
+    bus = init_audio()
+    jarvis_lazy.mark("audio calibrated")
+
+    # Build exactly one WakeDetector here
+    # If you're using a custom .ppn for the "jarvis" hotword, set JARVIS_PPN in .env
+    # Example:
+    #   JARVIS_PPN=V:\Vinit\jarvis\resources\jarvis_en_windows.ppn
+    # mute: ignore the wake word while Jarvis itself says it ("say 'jarvis' to wake me")
+    wake = WakeDetector(keyword=_get_wakeword(), bus=bus, mute=wake_muted)
+    jarvis_lazy.mark("wake detector ready")
+
+    # Wake detection is live: preload what the first commands will need in the background
+    if _warm_up_enabled():
+        jarvis_lazy.warm_up(modules=WARM_UP_MODULES, callables=(start_llm, get_file_index, get_media_library,
+                                                                get_intent_classifier, get_system_monitor,
+                                                                get_process_index))
+
+    greet_on_startup()
+    speak("I am Jarvis. How can I assist you today?")
+
+    prompt_mode = _wake_prompt_mode()
+    tts = get_tts()
+
+    jarvis_lazy.mark("listening")
+    jarvis_lazy.report_startup_if_requested()
 
-        # 5) Nothing matched → retry
-        speak("Sorry, I didn’t understand that. Please say 'jarvis' to wake me and try again.")
+    asyncio.run(main_loop(wake, bus, prompt_mode, tts))
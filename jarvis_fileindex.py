@@ -0,0 +1,367 @@
+# jarvis_fileindex.py
+
+import difflib
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from threading import Event, Thread
+
+DEFAULT_DB = os.path.join(os.path.expanduser("~"), ".jarvis", "files.db")
+
+# Folders nobody asks for by voice; skipping them keeps the index small.
+EXCLUDE_DIRS = {
+    "node_modules", "__pycache__", ".git", ".svn", ".hg", ".venv", "venv", ".tox",
+    "$recycle.bin", "system volume information", "appdata",
+}
+
+# Spoken folder names → folders under the home directory.
+KNOWN_FOLDERS = ("desktop", "documents", "downloads", "music", "pictures", "videos")
+
+Hit = namedtuple("Hit", "path name score mtime")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS dirs (
+    id    INTEGER PRIMARY KEY,
+    path  TEXT NOT NULL UNIQUE,
+    mtime REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    id     INTEGER PRIMARY KEY,
+    dir_id INTEGER NOT NULL,
+    name   TEXT NOT NULL,
+    key    TEXT NOT NULL,
+    stem   TEXT NOT NULL,
+    mtime  REAL NOT NULL,
+    is_dir INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_dir ON files(dir_id);
+CREATE INDEX IF NOT EXISTS files_stem ON files(stem);
+CREATE VIRTUAL TABLE IF NOT EXISTS names USING fts5(key, content='files', content_rowid='id', tokenize='trigram');
+CREATE TRIGGER IF NOT EXISTS files_ai AFTER INSERT ON files BEGIN
+    INSERT INTO names(rowid, key) VALUES (new.id, new.key);
+END;
+CREATE TRIGGER IF NOT EXISTS files_ad AFTER DELETE ON files BEGIN
+    INSERT INTO names(names, rowid, key) VALUES ('delete', old.id, old.key);
+END;
+"""
+
+_SELECT = "SELECT d.path, f.name, f.stem, f.mtime FROM {src} JOIN dirs d ON d.id = f.dir_id WHERE {cond}"
+
+_NON_ALNUM = re.compile(r"[\W_]+")
+
+
+def name_key(name: str) -> str:
+    """
+    Search key for a file name or a spoken query: lowercase letters and
+    digits only, so "budget report" finds budget_report.xlsx and BudgetReport.pdf.
+    """
+    return _NON_ALNUM.sub("", name.lower())
+
+
+def default_roots() -> list:
+    """JARVIS_INDEX_ROOTS (os.pathsep-separated), else the usual folders under home."""
+    env = (os.getenv("JARVIS_INDEX_ROOTS") or "").strip()
+    if env:
+        return [p for p in env.split(os.pathsep) if p]
+    home = os.path.expanduser("~")
+    return [p for p in (os.path.join(home, f.capitalize()) for f in KNOWN_FOLDERS) if os.path.isdir(p)]
+
+
+def resolve_folder(spoken: str) -> str | None:
+    """A spoken folder ("documents", "my downloads") or a literal path → directory, or None."""
+    spoken = spoken.strip().strip('"')
+    if os.path.isdir(spoken):
+        return os.path.abspath(spoken)
+    words = spoken.lower().split()
+    for folder in KNOWN_FOLDERS:
+        if folder in words or folder.rstrip("s") in words:
+            path = os.path.join(os.path.expanduser("~"), folder.capitalize())
+            if os.path.isdir(path):
+                return path
+    return None
+
+
+class FileIndex:
+    """
+    Persistent file-name index in SQLite, with an FTS5 trigram table over
+    `name_key(name)` for substring lookups that don't scan.
+
+    `refresh()` crawls the roots incrementally: a directory whose mtime is
+    unchanged since the last crawl isn't listed again (no entries were added,
+    removed or renamed), only stat'ed, and its subdirectories come from the
+    index. So a refresh of an unchanged tree costs one stat per directory.
+    A file edited in place doesn't touch its directory's mtime, though, so
+    its stored mtime (and recency ranking) only catches up on a deep
+    refresh, which lists every directory. `start()` runs a first crawl and
+    periodic refreshes on a background thread, a deep one every `restat`
+    seconds.
+
+    `search()` ranks substring matches (exact name, prefix, word boundary,
+    shorter, more recent, shallower first), then tries the query's words in
+    any order, and finally a typo-tolerant fuzzy match.
+    """
+
+    def __init__(self, db_path: str | None = None, roots=None, exclude=EXCLUDE_DIRS):
+        self.db_path = db_path or (os.getenv("JARVIS_INDEX_DB") or "").strip() or DEFAULT_DB
+        self.roots = [os.path.abspath(r) for r in (roots if roots is not None else default_roots())]
+        self.exclude = {e.lower() for e in exclude}
+        self.last_refresh = {}
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._stop = Event()
+        self._ready = Event()
+        self._thread = None
+        if os.path.dirname(self.db_path):
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        with self._conn() as conn:
+            conn.executescript(_SCHEMA)
+            if conn.execute("SELECT 1 FROM dirs LIMIT 1").fetchone():
+                self._ready.set()  # a previous session's index is usable right away
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread; WAL lets lookups run while the crawler writes
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @property
+    def ready(self) -> bool:
+        """True once a crawl has completed (in this or an earlier session)."""
+        return self._ready.is_set()
+
+    def wait_ready(self, timeout: float | None = None) -> bool:
+        return self._ready.wait(timeout)
+
+    # ── crawling ────────────────────────────────────────────────────────────
+    def refresh(self, roots=None, deep: bool = False) -> dict:
+        """
+        Brings the index up to date with the file system; returns crawl stats.
+        `deep` lists unchanged directories too, picking up in-place edits.
+        """
+        t0 = time.perf_counter()
+        stats = {"dirs_listed": 0, "dirs_unchanged": 0, "added": 0, "removed": 0, "updated": 0, "deep": deep}
+        roots = [os.path.abspath(r) for r in (roots or self.roots)]
+        with self._write_lock:
+            conn = self._conn()
+            known = {path: (did, mtime) for did, path, mtime in conn.execute("SELECT id, path, mtime FROM dirs")}
+            seen = set()
+            pending = 0
+            for root in roots:
+                stack = [root]
+                while stack and not self._stop.is_set():
+                    path = stack.pop()
+                    try:
+                        mtime = os.stat(path).st_mtime
+                    except OSError:
+                        continue
+                    seen.add(path)
+                    entry = known.get(path)
+                    if entry is not None and entry[1] == mtime and not deep:
+                        stats["dirs_unchanged"] += 1
+                        stack.extend(os.path.join(path, name) for (name,) in conn.execute(
+                            "SELECT name FROM files WHERE dir_id = ? AND is_dir = 1", (entry[0],)))
+                        continue
+                    stats["dirs_listed"] += 1
+                    subdirs = self._sync_dir(conn, path, mtime, entry, stats)
+                    stack.extend(subdirs)
+                    pending += 1
+                    if pending >= 200:
+                        conn.commit()
+                        pending = 0
+            if not self._stop.is_set():
+                # Directories under the roots that no longer exist (or are now excluded)
+                for path, (did, _) in known.items():
+                    if path not in seen and any(_under(path, r) for r in roots):
+                        stats["removed"] += conn.execute("DELETE FROM files WHERE dir_id = ?", (did,)).rowcount
+                        conn.execute("DELETE FROM dirs WHERE id = ?", (did,))
+            conn.commit()
+        stats["seconds"] = time.perf_counter() - t0
+        self.last_refresh = stats
+        if not self._stop.is_set():
+            self._ready.set()
+        return stats
+
+    def _sync_dir(self, conn, path, mtime, entry, stats) -> list:
+        """Re-lists one changed directory into the index; returns its subdirectories to crawl."""
+        try:
+            with os.scandir(path) as it:
+                listing = {}
+                for e in it:
+                    try:
+                        is_dir = e.is_dir(follow_symlinks=False)
+                        if is_dir and (e.name.startswith(".") or e.name.lower() in self.exclude):
+                            continue
+                        listing[e.name] = (e.stat(follow_symlinks=False).st_mtime, int(is_dir))
+                    except OSError:
+                        continue
+        except OSError:
+            return []
+        if entry is None:
+            did = conn.execute("INSERT INTO dirs(path, mtime) VALUES (?, ?)", (path, mtime)).lastrowid
+            old = {}
+        else:
+            did = entry[0]
+            conn.execute("UPDATE dirs SET mtime = ? WHERE id = ?", (mtime, did))
+            old = {name: (fid, fm, d) for fid, name, fm, d in conn.execute(
+                "SELECT id, name, mtime, is_dir FROM files WHERE dir_id = ?", (did,))}
+        gone = [(old[name][0],) for name in old.keys() - listing.keys()]
+        if gone:
+            conn.executemany("DELETE FROM files WHERE id = ?", gone)
+            stats["removed"] += len(gone)
+        new = [(did, name, name_key(name), name_key(os.path.splitext(name)[0] if not d else name), m, d)
+               for name, (m, d) in listing.items() if name not in old]
+        if new:
+            conn.executemany("INSERT INTO files(dir_id, name, key, stem, mtime, is_dir) VALUES (?, ?, ?, ?, ?, ?)", new)
+            stats["added"] += len(new)
+        changed = [(m, old[name][0]) for name, (m, d) in listing.items() if name in old and old[name][1] != m]
+        if changed:
+            conn.executemany("UPDATE files SET mtime = ? WHERE id = ?", changed)
+            stats["updated"] += len(changed)
+        return [os.path.join(path, name) for name, (_, d) in listing.items() if d]
+
+    def start(self, interval: float | None = None, restat: float | None = None) -> Thread:
+        """
+        Crawls now and then every `interval` seconds (JARVIS_INDEX_REFRESH,
+        default 600) in the background; every `restat` seconds
+        (JARVIS_INDEX_RESTAT, default 3600) the crawl is a deep one.
+        """
+        if self._thread is not None:
+            return self._thread
+        interval = interval or float(os.getenv("JARVIS_INDEX_REFRESH", "600"))
+        restat = restat or float(os.getenv("JARVIS_INDEX_RESTAT", "3600"))
+
+        def _loop():
+            last_deep = time.monotonic()  # the first crawl is incremental: the saved index is usable as is
+            while not self._stop.is_set():
+                deep = time.monotonic() - last_deep >= restat
+                try:
+                    st = self.refresh(deep=deep)
+                    if deep:
+                        last_deep = time.monotonic()
+                    print(f"[Index] {st['dirs_listed']} dirs listed, {st['dirs_unchanged']} unchanged, "
+                          f"+{st['added']} -{st['removed']} ~{st['updated']} files in {st['seconds']:.1f}s"
+                          + (" (deep)" if deep else ""))
+                except sqlite3.Error as e:
+                    print(f"[Index] refresh failed: {e}")
+                self._stop.wait(interval)
+
+        self._thread = Thread(target=_loop, name="jarvis-file-index", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self):
+        self._stop.set()
+
+    # ── lookups ─────────────────────────────────────────────────────────────
+    def search(self, query: str, folder: str | None = None, limit: int = 10, fuzzy: bool = True) -> list:
+        """Best matches for `query` (optionally only under `folder`), highest score first."""
+        qkey = name_key(query)
+        if not qkey:
+            return []
+        where, params = "", []
+        if folder:
+            folder = os.path.abspath(folder)
+            where = " AND (d.path = ? OR d.path BETWEEN ? AND ?)"
+            params = [folder, folder + os.sep, folder + os.sep + "\uffff"]
+        conn = self._conn()
+        pool = limit * 20
+        rows = []
+        if len(qkey) >= 3:
+            # Trigram phrase query = substring match. No ORDER BY rank: bm25 over every match
+            # costs ~100 ms on common words at 1M files; the candidates are ranked below instead.
+            rows = self._matching(conn, f'"{qkey}"', where, params, pool)
+            # Names that start with the query (exact names first), via the stem index, so the
+            # best hits are candidates even when thousands of names merely contain it
+            rows += conn.execute(_SELECT.format(src="files f", cond="f.stem BETWEEN ? AND ?" + where) + " LIMIT ?",
+                                 [qkey, qkey + "\uffff", *params, pool]).fetchall()
+            words = [w for w in (name_key(w) for w in query.split()) if len(w) >= 3]
+            if not rows and len(words) > 1:
+                # The same words in another order or with other words in between
+                rows = self._matching(conn, " AND ".join(f'"{w}"' for w in words), where, params, pool)
+        else:
+            rows = conn.execute(_SELECT.format(src="files f", cond="instr(f.key, ?) > 0" + where) + " LIMIT ?",
+                                [qkey, *params, pool]).fetchall()
+        if rows:
+            hits = {row[:2]: self._rank_substring(qkey, *row) for row in rows}.values()
+        elif fuzzy and len(qkey) >= 6:
+            hits = self._fuzzy(conn, where, params, qkey)
+        else:
+            hits = []
+        return sorted(hits, key=lambda h: h.score, reverse=True)[:limit]
+
+    @staticmethod
+    def _matching(conn, match, where, params, limit) -> list:
+        return conn.execute(
+            _SELECT.format(src="names JOIN files f ON f.id = names.rowid", cond="names MATCH ?" + where) + " LIMIT ?",
+            [match, *params, limit]).fetchall()
+
+    def _fuzzy(self, conn, where, params, qkey) -> list:
+        # Pigeonhole: a name within one or two typos of the query still contains one of its
+        # 2-3 pieces verbatim. A piece shared by few names says more than a common one, so
+        # candidates are weighted by 1/matches per piece before the edit-similarity check.
+        n = 3 if len(qkey) >= 9 else 2
+        step = len(qkey) / n
+        pieces = [qkey[round(i * step):round((i + 1) * step)] for i in range(n)]
+        found = {}
+        for piece in pieces:
+            rows = self._matching(conn, f'"{piece}"', where, params, 500)
+            for row in rows:
+                weight, _ = found.get(row[:2], (0.0, row))
+                found[row[:2]] = (weight + 1 / len(rows), row)
+        best = sorted(found.values(), key=lambda wr: wr[0], reverse=True)[:200]
+        hits = []
+        for _, (path, name, stem, mtime) in best:
+            ratio = difflib.SequenceMatcher(None, qkey, stem).ratio()
+            if ratio >= 0.75:
+                hits.append(Hit(os.path.join(path, name), name, 50 * ratio + _recency(mtime), mtime))
+        return hits
+
+    @staticmethod
+    def _rank_substring(qkey, path, name, stem, mtime) -> Hit:
+        score = 0.0
+        if stem == qkey:
+            score += 100
+        elif stem.startswith(qkey):
+            score += 40
+        elif name_key(name).find(qkey) in _word_starts(name):
+            score += 25
+        score += 20 * len(qkey) / max(len(stem), len(qkey))  # coverage: prefer short names
+        score += _recency(mtime)
+        score -= 0.5 * path.count(os.sep)
+        return Hit(os.path.join(path, name), name, score, mtime)
+
+    def stats(self) -> dict:
+        conn = self._conn()
+        dirs, = conn.execute("SELECT count(*) FROM dirs").fetchone()
+        files, = conn.execute("SELECT count(*) FROM files").fetchone()
+        size = os.path.getsize(self.db_path) if os.path.exists(self.db_path) else 0
+        return {"dirs": dirs, "files": files, "db_bytes": size, "ready": self.ready, **self.last_refresh}
+
+
+def _under(path: str, root: str) -> bool:
+    return path == root or path.startswith(root.rstrip(os.sep) + os.sep)
+
+
+_WORD = re.compile(r"[A-Z]?[a-z]+|[A-Z]+(?![a-z])|\d+")
+
+def _word_starts(name: str) -> set:
+    """Offsets in name_key(name) where a word begins (separators and camelCase both count)."""
+    starts, pos = set(), 0
+    for w in _WORD.findall(name):
+        starts.add(pos)
+        pos += len(w)
+    return starts
+
+
+def _recency(mtime: float) -> float:
+    """Up to +10 for files touched recently, fading over about a month."""
+    age_days = max(0.0, time.time() - mtime) / 86400
+    return 10 * math.exp(-age_days / 30)
@@ -0,0 +1,282 @@
+# jarvis_intent.py
+
+import hashlib
+import json
+import os
+import random
+import re
+import time
+import zlib
+
+import numpy as np
+
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:
+    import sre_parse
+
+UNKNOWN = "llm"  # label for anything that should go to the LLM fallback
+DEFAULT_DIM = 1 << 15
+DEFAULT_MODEL = os.path.join(os.path.expanduser("~"), ".jarvis", "intent.npz")
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Features: hashed word 1-2 grams and character 3-grams
+_WORD = re.compile(r"[a-z0-9']+")
+
+
+def _hashed(text: str, dim: int) -> tuple[np.ndarray, np.ndarray]:
+    """Feature indices and L2-normalized counts for one utterance."""
+    words = _WORD.findall(text.lower())
+    grams = [f"w:{w}" for w in words]
+    grams += [f"b:{a} {b}" for a, b in zip(words, words[1:])]
+    padded = f" {' '.join(words)} "
+    grams += [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+    if not grams:
+        return np.zeros(0, np.int64), np.zeros(0, np.float32)
+    # crc32, not hash(): stable across processes, so a saved model stays valid
+    idx, counts = np.unique(np.fromiter((zlib.crc32(g.encode()) % dim for g in grams), np.int64, len(grams)),
+                            return_counts=True)
+    values = counts.astype(np.float32)
+    return idx, values / np.sqrt((values * values).sum())
+
+
+def featurize(texts, dim: int = DEFAULT_DIM):
+    """Batch features in CSR form: (indices, values, row offsets)."""
+    rows = [_hashed(t, dim) for t in texts]
+    offsets = np.zeros(len(rows) + 1, np.int64)
+    offsets[1:] = np.cumsum([len(r[0]) for r in rows])
+    if not rows:
+        return np.zeros(0, np.int64), np.zeros(0, np.float32), offsets
+    return np.concatenate([r[0] for r in rows]), np.concatenate([r[1] for r in rows]), offsets
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Model
+class IntentClassifier:
+    """
+    Multinomial logistic regression over hashed n-gram features.
+
+    Weights are a (dim, n_labels) matrix, so scoring an utterance is a
+    gather of its ~50 feature rows plus a softmax: tens of microseconds.
+    """
+
+    def __init__(self, labels, dim: int = DEFAULT_DIM):
+        self.labels = list(labels)
+        self.dim = dim
+        self.W = np.zeros((dim, len(self.labels)), np.float32)
+        self.b = np.zeros(len(self.labels), np.float32)
+        self.signature = None  # hash of the training examples, for the on-disk cache
+        self._index = {label: i for i, label in enumerate(self.labels)}
+
+    def _logits(self, idx, values, offsets):
+        n = len(offsets) - 1
+        out = np.tile(self.b, (n, 1))
+        lengths = np.diff(offsets)
+        nonempty = lengths > 0
+        if len(idx):
+            contrib = self.W[idx] * values[:, None]
+            out[nonempty] += np.add.reduceat(contrib, offsets[:-1][nonempty], axis=0)
+        return out
+
+    @staticmethod
+    def _softmax(z):
+        z = z - z.max(axis=1, keepdims=True)
+        e = np.exp(z)
+        return e / e.sum(axis=1, keepdims=True)
+
+    def predict_proba(self, texts) -> np.ndarray:
+        return self._softmax(self._logits(*featurize(texts, self.dim)))
+
+    def classify(self, text: str) -> tuple[str, float]:
+        """(label, confidence) for one utterance."""
+        idx, values = _hashed(text, self.dim)
+        z = self.b + (self.W[idx] * values[:, None]).sum(axis=0)
+        z = np.exp(z - z.max())
+        best = int(z.argmax())
+        return self.labels[best], float(z[best] / z.sum())
+
+    def classify_batch(self, texts) -> list:
+        """[(label, confidence), ...] for many utterances in one pass."""
+        p = self.predict_proba(texts)
+        best = p.argmax(axis=1)
+        return [(self.labels[b], float(p[i, b])) for i, b in enumerate(best)]
+
+    def fit(self, texts, labels, epochs: int = 12, batch_size: int = 64, lr: float = 0.05,
+            l2: float = 1e-5, seed: int = 0) -> dict:
+        """Mini-batch Adam on the cross-entropy; returns training stats."""
+        t0 = time.perf_counter()
+        y = np.array([self._index[label] for label in labels])
+        idx, values, offsets = featurize(texts, self.dim)
+        rows = [(idx[offsets[i]:offsets[i + 1]], values[offsets[i]:offsets[i + 1]]) for i in range(len(texts))]
+        mW, vW = np.zeros_like(self.W), np.zeros_like(self.W)
+        mb, vb = np.zeros_like(self.b), np.zeros_like(self.b)
+        beta1, beta2, eps = 0.9, 0.999, 1e-8
+        rng = np.random.default_rng(seed)
+        step = 0
+        for _ in range(epochs):
+            order = rng.permutation(len(rows))
+            for start in range(0, len(order), batch_size):
+                batch = order[start:start + batch_size]
+                b_idx = np.concatenate([rows[i][0] for i in batch])
+                b_val = np.concatenate([rows[i][1] for i in batch])
+                b_off = np.zeros(len(batch) + 1, np.int64)
+                b_off[1:] = np.cumsum([len(rows[i][0]) for i in batch])
+                p = self._softmax(self._logits(b_idx, b_val, b_off))
+                p[np.arange(len(batch)), y[batch]] -= 1.0
+                p /= len(batch)
+                # Sparse gradient: only the rows of features present in the batch
+                row_of = np.repeat(np.arange(len(batch)), np.diff(b_off))
+                touched, inverse = np.unique(b_idx, return_inverse=True)
+                gW = np.zeros((len(touched), len(self.labels)), np.float32)
+                np.add.at(gW, inverse, p[row_of] * b_val[:, None])
+                gW += l2 * self.W[touched]
+                gb = p.sum(axis=0)
+                step += 1
+                corr = np.sqrt(1 - beta2 ** step) / (1 - beta1 ** step)
+                mW[touched] = beta1 * mW[touched] + (1 - beta1) * gW
+                vW[touched] = beta2 * vW[touched] + (1 - beta2) * gW * gW
+                self.W[touched] -= lr * corr * mW[touched] / (np.sqrt(vW[touched]) + eps)
+                mb = beta1 * mb + (1 - beta1) * gb
+                vb = beta2 * vb + (1 - beta2) * gb * gb
+                self.b -= lr * corr * mb / (np.sqrt(vb) + eps)
+        acc = float((self.predict_proba(texts).argmax(axis=1) == y).mean()) if len(texts) else 0.0
+        return {"examples": len(texts), "labels": len(self.labels), "train_accuracy": acc,
+                "seconds": time.perf_counter() - t0}
+
+    def save(self, path: str):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp.npz"
+        np.savez_compressed(tmp, W=self.W, b=self.b, labels=np.array(self.labels), dim=self.dim,
+                            signature=np.array(self.signature or ""))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "IntentClassifier":
+        with np.load(path) as data:
+            model = cls([str(x) for x in data["labels"]], int(data["dim"]))
+            model.W = data["W"].astype(np.float32)
+            model.b = data["b"].astype(np.float32)
+            model.signature = str(data["signature"]) or None
+        return model
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Training examples from the command registry
+PREFIXES = ("", "", "", "jarvis ", "please ", "can you ", "could you ", "hey jarvis ", "i want to ", "i'd like to ")
+SUFFIXES = ("", "", "", " please", " now", " for me", " jarvis")
+SLOT_WORDS = ("report", "notes", "budget", "photos", "chrome", "spotify", "my project", "holiday pictures",
+              "the latest news", "python tutorials", "hello world", "meeting at noon", "downloads", "music",
+              "calculator", "taylor swift", "queen", "weather today", "recipes", "invoice 2024", "resume")
+
+# Things that aren't commands: the LLM answers them
+_QUESTION_STARTS = ("what is", "who was", "who is", "explain", "tell me about", "how does", "why is", "why do",
+                    "write a poem about", "define", "how many", "where is", "what do you know about",
+                    "give me a fact about", "describe", "summarize", "can you explain")
+_TOPICS = ("black holes", "the roman empire", "photosynthesis", "quantum computing", "the moon", "gravity",
+           "dolphins", "the french revolution", "machine learning", "coffee", "volcanoes", "shakespeare",
+           "the internet", "dna", "the ocean", "electricity", "rainbows", "the stock market", "bees",
+           "climate change", "the pyramids", "magnets", "jazz", "chess", "the human brain", "einstein")
+
+
+def _sample_regex(pattern: str, rng: random.Random) -> str:
+    """One random string matching `pattern` (the subset the command patterns use)."""
+
+    def walk(items):
+        out = []
+        for op, av in items:
+            name = str(op)
+            if name == "LITERAL":
+                out.append(chr(av))
+            elif name == "SUBPATTERN":
+                out.append(walk(av[-1]))
+            elif name == "BRANCH":
+                out.append(walk(rng.choice(av[1])))
+            elif name in ("MAX_REPEAT", "MIN_REPEAT"):
+                lo, hi, sub = av
+                if len(sub) == 1 and str(sub[0][0]) in ("ANY", "IN") and hi > 1:
+                    out.append(_slot(sub[0], rng))  # .+ / \d+ / [\w ]*? : a filler
+                elif lo == 0 and hi == 1:
+                    if rng.random() < 0.5:
+                        out.append(walk(sub))
+                else:
+                    out.append("".join(walk(sub) for _ in range(max(lo, 1))))
+            elif name == "IN":
+                out.append(_slot((op, av), rng, single=True))
+            elif name == "ANY":
+                out.append(rng.choice("abcdefghij"))
+            # AT (\b, $, ^) matches no text
+        return "".join(out)
+
+    return walk(sre_parse.parse(pattern))
+
+
+def _slot(item, rng: random.Random, single: bool = False) -> str:
+    op, av = item
+    if str(op) == "IN" and any(str(o) == "CATEGORY" and "DIGIT" in str(a) for o, a in av):
+        return str(rng.randint(1, 9)) if single else str(rng.randint(1, 100))
+    if single:
+        return rng.choice("abcdefghijklmnopqrstuvwxyz")
+    return rng.choice(SLOT_WORDS)
+
+
+def examples_from_router(router, per_command: int = 40, seed: int = 0) -> list:
+    """(text, command name) pairs: each pattern sampled and each keyword wrapped in carrier phrases."""
+    rng = random.Random(seed)
+    examples = []
+    for command in router.commands:
+        for i in range(per_command):
+            sources = list(command.patterns) + list(command.keywords)
+            src = sources[i % len(sources)]
+            core = _sample_regex(src, rng) if src in command.patterns else src
+            examples.append((f"{rng.choice(PREFIXES)}{core}{rng.choice(SUFFIXES)}".strip(), command.name))
+    for _ in range(per_command * 3):
+        examples.append((f"{rng.choice(_QUESTION_STARTS)} {rng.choice(_TOPICS)}", UNKNOWN))
+    return examples
+
+
+def load_examples(path: str) -> list:
+    """
+    Extra examples from JSON or YAML: {"intent": ["utterance", ...], ...}.
+    Intents may be command names or "llm".
+    """
+    with open(path, encoding="utf-8") as f:
+        if path.lower().endswith((".yaml", ".yml")):
+            import yaml  # optional: pip install pyyaml
+            data = yaml.safe_load(f)
+        else:
+            data = json.load(f)
+    return [(str(text).lower().strip(), str(intent)) for intent, texts in (data or {}).items() for text in texts]
+
+
+def train(examples, dim: int = DEFAULT_DIM, **fit_kwargs) -> tuple[IntentClassifier, dict]:
+    labels = sorted({label for _, label in examples})
+    model = IntentClassifier(labels, dim)
+    stats = model.fit([t for t, _ in examples], [label for _, label in examples], **fit_kwargs)
+    model.signature = examples_signature(examples, dim)
+    return model, stats
+
+
+def examples_signature(examples, dim: int = DEFAULT_DIM) -> str:
+    h = hashlib.sha1(str(dim).encode())
+    for text, label in examples:
+        h.update(f"{label}\0{text}\n".encode("utf-8"))
+    return h.hexdigest()
+
+
+def load_or_train(examples, path: str | None = None, dim: int = DEFAULT_DIM) -> IntentClassifier:
+    """The model saved at `path` if it was trained on exactly `examples`, else a freshly trained (and saved) one."""
+    path = path or (os.getenv("JARVIS_INTENT_MODEL") or "").strip() or DEFAULT_MODEL
+    signature = examples_signature(examples, dim)
+    try:
+        model = IntentClassifier.load(path)
+        if model.signature == signature:
+            return model
+    except (OSError, KeyError, ValueError):
+        pass
+    model, stats = train(examples, dim)
+    print(f"[Intent] trained on {stats['examples']} examples, {stats['labels']} intents "
+          f"in {stats['seconds']:.2f}s (train accuracy {stats['train_accuracy']:.1%})")
+    try:
+        model.save(path)
+    except OSError as e:
+        print(f"[Intent] could not save the model: {e}")
+    return model
@@ -0,0 +1,128 @@
+# jarvis_lazy.py
+
+import importlib
+import os
+import sys
+import time
+from threading import Lock, Thread
+
+# Reference point for the startup timeline; this module is imported first by jarvis_entry.
+_T0 = time.perf_counter()
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Lazy modules
+class LazyModule:
+    """
+    Stand-in for a heavy module. The real import happens on first attribute
+    access (e.g. `cv2.VideoWriter`), then every lookup goes straight to it.
+    """
+
+    def __init__(self, name: str):
+        self.__dict__["_name"] = name
+        self.__dict__["_module"] = None
+        self.__dict__["_lock"] = Lock()
+
+    def _load(self):
+        module = self.__dict__["_module"]
+        if module is None:
+            with self.__dict__["_lock"]:
+                module = self.__dict__["_module"]
+                if module is None:
+                    t0 = time.perf_counter()
+                    module = importlib.import_module(self.__dict__["_name"])
+                    _load_times[self.__dict__["_name"]] = time.perf_counter() - t0
+                    self.__dict__["_module"] = module
+        return module
+
+    @property
+    def loaded(self) -> bool:
+        return self.__dict__["_module"] is not None
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __repr__(self):
+        state = "loaded" if self.loaded else "not loaded"
+        return f"<lazy module {self.__dict__['_name']!r} ({state})>"
+
+
+_lazy_modules: dict[str, LazyModule] = {}
+_load_times: dict[str, float] = {}
+
+
+def lazy_import(name: str) -> LazyModule:
+    """Returns a shared LazyModule for `name`; nothing is imported yet."""
+    mod = _lazy_modules.get(name)
+    if mod is None:
+        mod = _lazy_modules.setdefault(name, LazyModule(name))
+    return mod
+
+
+def load_times() -> dict:
+    """Seconds spent importing each lazy module that has been loaded so far."""
+    return dict(_load_times)
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Background warm-up
+def warm_up(modules=(), callables=()) -> Thread:
+    """
+    Preload `modules` (names) and run `callables` (e.g. model loaders) on a
+    daemon thread, so the first command that needs them doesn't pay the cost.
+    Failures are logged, not raised: the on-demand path will retry and report.
+    """
+    def _run():
+        t0 = time.perf_counter()
+        for name in modules:
+            try:
+                lazy_import(name)._load()
+            except Exception as e:
+                print(f"[Warm-up] {name} failed: {e}")
+        for fn in callables:
+            try:
+                fn()
+            except Exception as e:
+                print(f"[Warm-up] {getattr(fn, '__name__', fn)} failed: {e}")
+        mark("warm-up done")
+        print(f"[Warm-up] finished in {time.perf_counter() - t0:.2f}s")
+
+    t = Thread(target=_run, name="jarvis-warmup", daemon=True)
+    t.start()
+    return t
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Startup timeline
+_marks: list[tuple[str, float]] = []
+
+
+def mark(label: str):
+    """Record `label` at the current time (seconds since this module was imported)."""
+    _marks.append((label, time.perf_counter() - _T0))
+
+
+def startup_report() -> str:
+    lines = ["[Startup] timeline (s since launch):"]
+    prev = 0.0
+    for label, t in _marks:
+        lines.append(f"  {t:8.3f}  (+{t - prev:6.3f})  {label}")
+        prev = t
+    if _load_times:
+        lines.append("[Startup] lazy imports so far:")
+        for name, dt in sorted(_load_times.items(), key=lambda kv: -kv[1]):
+            lines.append(f"  {dt:8.3f}  {name}")
+    return "\n".join(lines)
+
+
+def report_startup_if_requested():
+    """
+    Honour JARVIS_STARTUP_REPORT: "1" prints the timeline, "exit" prints it
+    and exits (used by bench_startup.py to time launch → listening).
+    """
+    mode = (os.getenv("JARVIS_STARTUP_REPORT") or "").strip().lower()
+    if not mode or mode == "0":
+        return
+    print(startup_report(), flush=True)
+    if mode == "exit":
+        sys.exit(0)
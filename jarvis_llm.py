@@ -1,40 +1,385 @@
 # jarvis_llm.py
 
+import atexit
 import os
+import re
 import sys
-from gpt4all import GPT4All
-from contextlib import contextmanager
+import time
+from collections import Counter
+from queue import Queue
+from threading import Event, Lock, Thread
 
-@contextmanager
-def _suppress_c_stderr():
+import jarvis_trace
+from jarvis_cache import ResponseCache
+from jarvis_chat import Conversation, is_standalone
+from jarvis_llm_worker import LLMTimeout, LLMWorker, SessionHost, suppress_c_stderr as _suppress_c_stderr
+
+MODEL_NAME = "Meta-Llama-3-8B-Instruct.Q4_0.gguf"
+
+# The model runs in its own process (jarvis_llm_worker) unless JARVIS_LLM_WORKER=0,
+# which loads it into this one as before. Replies are cut off after LLM_TIMEOUT seconds.
+LLM_WORKER = os.getenv("JARVIS_LLM_WORKER", "1").strip() != "0"
+LLM_TIMEOUT = float(os.getenv("JARVIS_LLM_TIMEOUT", "60"))
+
+# Follow-up questions keep their context: history up to CHAT_BUDGET tokens, forgotten after CHAT_IDLE seconds.
+CHAT_BUDGET = int(os.getenv("JARVIS_CHAT_BUDGET", "1536"))
+CHAT_IDLE = float(os.getenv("JARVIS_CHAT_IDLE", "300"))
+
+# Model tiers (worker mode): short, simple prompts go to a small model; longer or open-ended ones
+# (explain, write, compare, ...) escalate to MODEL_NAME. JARVIS_LLM_SMALL=0 sends everything to
+# MODEL_NAME. Each tier's process exits after LLM_IDLE_UNLOAD idle seconds (0 = never) and is
+# reloaded on the next request.
+SMALL_MODEL = (os.getenv("JARVIS_LLM_SMALL") or "Llama-3.2-1B-Instruct-Q4_0.gguf").strip()
+LLM_IDLE_UNLOAD = float(os.getenv("JARVIS_LLM_IDLE_UNLOAD", "600"))
+ESCALATE_WORDS = int(os.getenv("JARVIS_LLM_ESCALATE_WORDS", "12"))
+TIER_MODELS = {"small": SMALL_MODEL, "large": MODEL_NAME} if SMALL_MODEL != "0" else {"large": MODEL_NAME}
+_ESCALATE = re.compile(r"\b(?:explain|why|how (?:does|do|did|can|would)|compare|difference|write|story|poem|"
+                       r"essay|summari[sz]e|code|program|plan|analy[sz]e|step by step|in detail|more detail|"
+                       r"pros and cons|translate)\b")
+
+# The model is loaded on first use (or by jarvis_entry's warm-up thread),
+# not at import time: constructing it takes seconds and gigabytes of RAM.
+_bot = None
+_bot_lock = Lock()
+model_load_seconds = None
+
+def get_bot():
+    """Returns the shared GPT4All instance, loading it under suppressed stderr if needed."""
+    global _bot, model_load_seconds
+    if _bot is None:
+        with _bot_lock:
+            if _bot is None:
+                t0 = time.perf_counter()
+                from gpt4all import GPT4All
+                with _suppress_c_stderr():
+                    _bot = GPT4All(
+                        MODEL_NAME,
+                        allow_download=True,
+                        verbose=False
+                    )
+                model_load_seconds = time.perf_counter() - t0
+    return _bot
+
+def __getattr__(name):
+    # Backwards compatibility: `from jarvis_llm import bot` still works (and loads the model).
+    if name == "bot":
+        return get_bot()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+_workers = {}                # tier → LLMWorker
+tier_requests = Counter()    # tier → requests routed to it
+
+def get_worker(tier: str = "large") -> LLMWorker:
+    """The tier's model process, started (not awaited: the model loads in the background) on first use."""
+    worker = _workers.get(tier)
+    if worker is None:
+        with _bot_lock:
+            worker = _workers.get(tier)
+            if worker is None:
+                worker = LLMWorker(TIER_MODELS[tier], idle_unload=LLM_IDLE_UNLOAD,
+                                   on_load=lambda seconds: jarvis_trace.record(f"llm.load.{tier}", seconds))
+                atexit.register(worker.close)
+                _workers[tier] = worker
+    return worker.start()
+
+def choose_tier(prompt: str, conversation: Conversation | None = None) -> str:
     """
-    Redirect C-level stderr (file descriptor 2) to os.devnull
-    so native DLL load errors don’t print.
+    "small" for short, simple prompts; "large" for long or open-ended ones,
+    and for the rest of a conversation once it has escalated.
     """
-    devnull = open(os.devnull, 'w')
-    # Duplicate original stderr fd
-    original_stderr_fd = os.dup(2)
-    # Replace stderr fd (2) with devnull
-    os.dup2(devnull.fileno(), 2)
-    try:
-        yield
-    finally:
-        # Restore original stderr
-        os.dup2(original_stderr_fd, 2)
-        os.close(original_stderr_fd)
-        devnull.close()
-
-# Initialize GPT4All under suppressed stderr
-with _suppress_c_stderr():
-    bot = GPT4All(
-        "Meta-Llama-3-8B-Instruct.Q4_0.gguf",
-        allow_download=True,
-        verbose=False
-    )
-
-def chat_with_ai(prompt: str, max_tokens: int = 128) -> str:
-    """Zero-quota local LLM via GPT4All (CPU-only by default)."""
+    if "small" not in TIER_MODELS or not LLM_WORKER:
+        return "large"
+    if conversation is not None and conversation.tier == "large":
+        return "large"
+    if len(prompt.split()) > ESCALATE_WORDS or _ESCALATE.search(prompt.lower()):
+        return "large"
+    return "small"
+
+def start_llm():
+    """Warm-up hook: spawns the first tier's worker (returns at once), or loads the in-process model."""
+    if LLM_WORKER:
+        get_worker(next(iter(TIER_MODELS)))
+    else:
+        get_bot()
+
+def llm_stats() -> dict:
+    """Per tier: model, requests routed, and its worker's state (resident memory, load times, ...)."""
+    return {tier: {"model": model, "routed": tier_requests[tier],
+                   **(_workers[tier].stats() if tier in _workers else {"alive": False, "loaded": False})}
+            for tier, model in TIER_MODELS.items()}
+
+def _llm_gauges() -> dict:
+    gauges = {}
+    for tier, s in llm_stats().items():
+        gauges[f"llm.{tier}.loaded"] = int(s["loaded"])
+        gauges[f"llm.{tier}.requests"] = s["routed"]
+        for key in ("rss_bytes", "load_seconds", "loads", "unloads", "restarts"):
+            if s.get(key) is not None:
+                gauges[f"llm.{tier}.{key}"] = s[key]
+    return gauges
+
+jarvis_trace.add_gauges(_llm_gauges)
+
+# One generation at a time: a cancelled reply may still be finishing when the next starts.
+_generate_lock = Lock()
+_host = None  # chat sessions of the in-process model
+
+def stream_chat(prompt: str, max_tokens: int = 128, cancel: Event | None = None, timeout: float | None = None,
+                session=None, tier: str | None = None):
+    """
+    Yields tokens as the local model produces them, until the reply ends,
+    `cancel` is set or `timeout` (default LLM_TIMEOUT) passes (LLMTimeout).
+    `session` (from Conversation.request) continues a conversation; `tier`
+    defaults to choose_tier(prompt).
+    """
+    global _host
+    timeout = LLM_TIMEOUT if timeout is None else timeout
+    if LLM_WORKER:
+        tier = tier or choose_tier(prompt)
+        tier_requests[tier] += 1
+        yield from get_worker(tier).stream(prompt, max_tokens=max_tokens, timeout=timeout, cancel=cancel,
+                                           session=session)
+        return
+    deadline = time.monotonic() + timeout
+    with _generate_lock:
+        if _host is None or _host.model is not get_bot():
+            _host = SessionHost(get_bot())
+        tokens = _host.generate(prompt, max_tokens, session)
+        complete = False
+        try:
+            for tok in tokens:
+                if cancel is not None and cancel.is_set():
+                    return
+                yield tok
+                if time.monotonic() > deadline:
+                    raise LLMTimeout(f"reply not finished within {timeout:g}s")
+            complete = True
+        finally:
+            tokens.close()
+            if not complete:
+                _host.abandon()
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Conversation: questions asked within CHAT_IDLE seconds of each other share context
+_conversation = None
+
+def get_conversation() -> Conversation:
+    """The ongoing conversation, or a fresh one if the last turn was more than CHAT_IDLE seconds ago."""
+    global _conversation
+    if _conversation is None or _conversation.expired():
+        _conversation = Conversation(budget=CHAT_BUDGET, idle=CHAT_IDLE)
+    return _conversation
+
+def reset_conversation():
+    global _conversation
+    _conversation = None
+
+# Replies to repeated small talk are served from here instead of the model.
+# JARVIS_LLM_CACHE=<file.json> persists them across restarts.
+response_cache = ResponseCache(
+    max_entries=int(os.getenv("JARVIS_LLM_CACHE_SIZE", "256")),
+    ttl=float(os.getenv("JARVIS_LLM_CACHE_TTL", str(24 * 3600))),
+    path=(os.getenv("JARVIS_LLM_CACHE") or "").strip() or None,
+)
+
+def cache_stats() -> dict:
+    """Hit/miss counters and CPU seconds saved by the response cache."""
+    return response_cache.stats()
+
+@jarvis_trace.traced("llm.chat")
+def chat_with_ai(prompt: str, max_tokens: int = 128, conversation: Conversation | None = None) -> str:
+    """
+    Zero-quota local LLM via GPT4All (CPU-only by default). With a
+    `conversation` the reply sees (and joins) the earlier turns; see
+    speak_stream for which prompts the response cache may answer.
+    """
+    tier = choose_tier(prompt, conversation)
+    if conversation is not None:
+        conversation.tier = tier
+    history = conversation is not None and bool(conversation.turns or conversation.summary)
+    generated = []
+
+    def generate():
+        session = conversation.request(prompt, max_tokens) if history else None
+        text = conversation.catch_up(prompt) if history else prompt
+        generated.append(True)
+        return "".join(stream_chat(text, max_tokens=max_tokens, session=session, tier=tier))
+
     try:
-        return bot.generate(prompt, max_tokens=max_tokens)
+        if not history or is_standalone(prompt):
+            key = response_cache.make_key(prompt, max_tokens=max_tokens, model=TIER_MODELS[tier])
+            reply = response_cache.get_or_compute(key, generate)
+        else:
+            reply = generate()
     except Exception as e:
         return f"[Local LLM error]: {e}"
+    if conversation is not None:
+        conversation.add_turn(prompt, reply, from_cache=not generated)
+    return reply
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Sentence-by-sentence speech while the model is still generating
+
+# A boundary is only final once the next token starts with whitespace, so "3.5" or "e.g" stay intact.
+_SENTENCE_END = re.compile(r"[.!?]+[\"')\]]*\s+|\n+")
+_CLAUSE_END = re.compile(r"[,;:]\s+")
+
+def iter_segments(tokens, min_clause_chars: int = 40):
+    """
+    Groups a token stream into speakable segments: every full sentence, plus
+    clauses (split on , ; :) once they are at least `min_clause_chars` long,
+    so long sentences start playing early without sounding choppy.
+    """
+    buf = ""
+    for tok in tokens:
+        buf += tok
+        while True:
+            m = _SENTENCE_END.search(buf)
+            if m is None and len(buf) >= min_clause_chars:
+                m = _CLAUSE_END.search(buf, min_clause_chars - 1)
+            if m is None:
+                break
+            segment, buf = buf[:m.end()].strip(), buf[m.end():]
+            if segment:
+                yield segment
+    if buf.strip():
+        yield buf.strip()
+
+# Timings of the most recent speak_stream() call, in seconds from the call.
+last_stream_stats = {}
+_last_stream_call = None  # that call's own stats dict
+
+# Spoken instead of the reply when the model fails; the exception itself goes to the log.
+LLM_ERROR_REPLY = "Sorry, I couldn't come up with an answer just now."
+
+def _note_first_audio(stats: dict, utt, t0: float):
+    """Adds time_to_first_audio once `utt` (the reply's first segment) has played or been dropped."""
+    utt.wait()
+    if utt.first_audio_at is None:
+        return  # cancelled before it was heard
+    stats["time_to_first_audio"] = utt.first_audio_at - t0
+    jarvis_trace.record("llm.stream.time_to_first_audio", stats["time_to_first_audio"])
+    if _last_stream_call is stats:  # not overtaken by a newer reply
+        last_stream_stats["time_to_first_audio"] = stats["time_to_first_audio"]
+
+def speak_stream(prompt: str, speak, max_tokens: int = 128, cancel: Event | None = None,
+                 conversation: Conversation | None = None) -> str:
+    """
+    Generates a reply on a background thread and hands each finished
+    sentence/clause to `speak` as soon as it is complete, so playback of the
+    first sentence overlaps generation of the rest. Returns the part of the
+    reply handed to `speak`. Setting `cancel` (barge-in) stops both the
+    generation and the hand-off at the next segment; a cut-off reply isn't cached.
+    Cached replies (see `response_cache`) are spoken without touching the model.
+    With a `conversation` the reply sees the earlier turns and is added to
+    them unless it was cut off (the user never heard the rest, so later
+    turns mustn't build on it). Within a conversation only questions that
+    stand on their own (jarvis_chat.is_standalone) use the cache; a
+    follow-up ("what did she write?") always goes to the model. A cached
+    turn never reaches the model's chat session; the next prompt that does
+    carries it (Conversation.catch_up), so the session isn't rebuilt.
+    Timings land in `last_stream_stats` (time_to_first_token,
+    time_to_first_segment, time_to_first_audio, total, segments, cached):
+    the first segment is when `speak` got the first sentence, first audio
+    when it became audible. That comes from the Utterance `speak` returned
+    (jarvis_core.speak does) and is filled in once the sentence has played,
+    which may be after this returns; it stays None for a `speak` that
+    returns no Utterance.
+    """
+    cancel = cancel or Event()
+    t0 = time.perf_counter()
+    stats = {"time_to_first_token": None, "time_to_first_segment": None, "time_to_first_audio": None,
+             "total": None, "segments": 0, "cached": False}
+    segments = Queue()
+    done = object()
+
+    # Follow-ups depend on the history, so they are neither served from nor stored in the cache
+    cacheable = conversation is None or not (conversation.turns or conversation.summary) or is_standalone(prompt)
+    tier = choose_tier(prompt, conversation)
+    if conversation is not None:
+        conversation.tier = tier
+    key = response_cache.make_key(prompt, max_tokens=max_tokens, model=TIER_MODELS[tier])
+    cached = response_cache.get(key) if cacheable else None
+    while cacheable and cached is None and not response_cache.begin(key):
+        cached = response_cache.get(key)  # an identical request is generating; share its reply
+    stats["cached"] = cached is not None
+    session = conversation.request(prompt, max_tokens) if conversation is not None and cached is None else None
+    text = conversation.catch_up(prompt) if session is not None else prompt
+
+    def _tokens():
+        for tok in stream_chat(text, max_tokens=max_tokens, cancel=cancel, session=session, tier=tier):
+            if stats["time_to_first_token"] is None:
+                stats["time_to_first_token"] = time.perf_counter() - t0
+            yield tok
+
+    def _produce():
+        cpu0 = time.process_time()
+        reply = []
+        tokens = _tokens()
+        try:
+            for segment in iter_segments(tokens):
+                if cancel.is_set():
+                    break
+                reply.append(segment)
+                segments.put(segment)
+        except Exception as e:
+            if cacheable:
+                response_cache.abandon(key)
+            print(f"[LLM] reply failed: {e!r}")
+            segments.put(LLM_ERROR_REPLY)
+        else:
+            if cancel.is_set():
+                if cacheable:
+                    response_cache.abandon(key)
+                # No turn: the next request carries the same turn count, so the model's session
+                # (which saw the cut-off reply) doesn't match and is rebuilt from the history
+            else:
+                if cacheable:
+                    response_cache.put(key, " ".join(reply), cost=time.process_time() - cpu0)
+                if conversation is not None and reply:
+                    conversation.add_turn(prompt, " ".join(reply))
+        finally:
+            tokens.close()  # stops the model (and releases the generation lock in-process)
+            segments.put(done)
+
+    if cached is not None:
+        for segment in iter_segments([cached]):
+            segments.put(segment)
+        segments.put(done)
+        if conversation is not None:
+            conversation.add_turn(prompt, cached, from_cache=True)
+    else:
+        Thread(target=_produce, name="jarvis-llm-stream", daemon=True).start()
+
+    spoken = []
+    first = None  # Utterance of the first segment
+    while (segment := segments.get()) is not done:
+        if cancel.is_set():
+            continue  # drain until the producer notices
+        if stats["time_to_first_segment"] is None:
+            stats["time_to_first_segment"] = time.perf_counter() - t0
+        stats["segments"] += 1
+        spoken.append(segment)
+        utt = speak(segment)
+        if first is None:
+            first = utt
+
+    stats["total"] = time.perf_counter() - t0
+    if jarvis_trace.enabled():
+        for stage in ("time_to_first_token", "time_to_first_segment", "total"):
+            if stats[stage] is not None:
+                jarvis_trace.record(f"llm.stream.{stage}", stats[stage])
+    global _last_stream_call
+    _last_stream_call = stats
+    last_stream_stats.clear()
+    last_stream_stats.update(stats)
+    if hasattr(first, "first_audio_at"):
+        if first.done:
+            _note_first_audio(stats, first, t0)
+        else:  # still queued or playing: don't hold the command until it has been heard
+            Thread(target=_note_first_audio, args=(stats, first, t0), name="jarvis-llm-first-audio",
+                   daemon=True).start()
+    if stats["time_to_first_segment"] is not None:
+        print(f"[LLM] first segment to TTS after {stats['time_to_first_segment']:.2f}s, "
+              f"{stats['segments']} segments in {stats['total']:.2f}s")
+    return " ".join(spoken)
@@ -0,0 +1,446 @@
+# jarvis_llm_worker.py
+"""
+Hosts the local model in a separate process, so a slow or runaway
+generation can be cut off (or the process killed) without freezing the
+assistant, and so Jarvis can start listening while the model still loads.
+
+The worker takes requests one at a time from a queue and streams tokens
+back; between tokens it checks for cancellations and the request's
+deadline. The parent side (LLMWorker) restarts the process if it dies or
+stops answering. A cancel that arrives during prompt processing (before
+the first token) lets that finish: killing the worker then would cost a
+full model reload.
+"""
+import importlib
+import inspect
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import sys
+import time
+from contextlib import ExitStack, contextmanager
+from threading import Event, Lock, Thread, Timer
+
+DEFAULT_FACTORY = "jarvis_llm_worker:load_gpt4all"
+RESTART_BACKOFF = (0.5, 1.0, 2.0, 5.0, 10.0, 30.0)  # seconds before the 1st, 2nd, ... consecutive restart
+
+
+class LLMError(RuntimeError):
+    pass
+
+
+class LLMTimeout(LLMError, TimeoutError):
+    pass
+
+
+class LLMCancelled(LLMError):
+    """The request was cancelled but the worker did not stop, so it was restarted."""
+
+
+class WorkerCrashed(LLMError):
+    pass
+
+
+@contextmanager
+def suppress_c_stderr():
+    """
+    Redirect C-level stderr (file descriptor 2) to os.devnull
+    so native DLL load errors don’t print.
+    """
+    devnull = open(os.devnull, 'w')
+    # Duplicate original stderr fd
+    original_stderr_fd = os.dup(2)
+    # Replace stderr fd (2) with devnull
+    os.dup2(devnull.fileno(), 2)
+    try:
+        yield
+    finally:
+        # Restore original stderr
+        os.dup2(original_stderr_fd, 2)
+        os.close(original_stderr_fd)
+        devnull.close()
+
+
+def load_gpt4all(model_name: str):
+    from gpt4all import GPT4All
+    with suppress_c_stderr():
+        return GPT4All(model_name, allow_download=True, verbose=False)
+
+
+def _resolve(spec: str):
+    module, _, attr = spec.partition(":")
+    return getattr(importlib.import_module(module), attr)
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Chat sessions: the model keeps its context (KV cache) between turns of one
+# conversation, so a follow-up only processes the new message.
+class SessionHost:
+    """
+    Keeps at most one chat session open on `model`. A request's session is
+    (key, context): `key` = (conversation id, epoch, turns so far) and
+    `context` the system prompt with the conversation so far as text. A key
+    that continues the open session reuses it; anything else reopens the
+    session from `context`, which the model then processes once.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.key = None      # key the next turn must carry to reuse the open session
+        self.reused = 0
+        self.rebuilt = 0
+        self._stack = None
+
+    def generate(self, prompt: str, max_tokens: int, session=None):
+        if session is None:
+            self.close()  # a stateless prompt must not see (or join) a conversation
+            return self.model.generate(prompt, max_tokens=max_tokens, streaming=True)
+        key, context = session
+        if key == self.key:
+            self.reused += 1
+        else:
+            self.close()
+            self._stack = ExitStack()
+            self._stack.enter_context(_chat_session(self.model, context))
+            self.rebuilt += 1
+        self.key = key[:-1] + (key[-1] + 1,)
+        return self.model.generate(prompt, max_tokens=max_tokens, streaming=True)
+
+    def abandon(self):
+        """The last turn was cut short: its history no longer matches the caller's."""
+        self.close()
+
+    def close(self):
+        if self._stack is not None:
+            self._stack.close()
+            self._stack = None
+        self.key = None
+
+
+def _chat_session(model, system: str):
+    # gpt4all 3.x calls it system_message, 2.x system_prompt
+    params = inspect.signature(model.chat_session).parameters
+    return model.chat_session(**{"system_message" if "system_message" in params else "system_prompt": system})
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Worker process
+def _serve(factory: str, model_name: str, requests, events, cancels):
+    """
+    Child main loop. Requests are (id, prompt, max_tokens, deadline, session)
+    with the deadline on the time.monotonic() clock (system-wide, so both
+    processes agree) and session as in SessionHost; None shuts down. Events back: ("ready", None, load seconds),
+    ("failed", None, message), ("token", id, text), ("error", id, message),
+    ("done", id, "complete" | "cancelled" | "deadline").
+    """
+    trace = sys.modules.get("jarvis_trace")
+    if trace is not None:
+        trace.disable()  # imported along with the parent's main module; only the parent exports
+    t0 = time.perf_counter()
+    try:
+        model = _resolve(factory)(model_name)
+    except Exception as e:
+        events.put(("failed", None, f"{type(e).__name__}: {e}"))
+        return
+    events.put(("ready", None, time.perf_counter() - t0))
+
+    host = SessionHost(model)
+    cancelled = set()
+
+    def is_cancelled(rid: int) -> bool:
+        while True:
+            try:
+                cancelled.add(cancels.get_nowait())
+            except queue.Empty:
+                return rid in cancelled
+
+    while True:
+        request = requests.get()
+        if request is None:
+            return
+        rid, prompt, max_tokens, deadline, session = request
+        cancelled = {i for i in cancelled if i >= rid}  # requests run in id order
+        if is_cancelled(rid) or time.monotonic() > deadline:
+            events.put(("done", rid, "cancelled" if rid in cancelled else "deadline"))
+            continue
+        reason = "complete"
+        try:
+            tokens = host.generate(prompt, max_tokens, session)
+        except Exception as e:
+            host.abandon()
+            events.put(("error", rid, f"{type(e).__name__}: {e}"))
+            continue
+        try:
+            for tok in tokens:
+                events.put(("token", rid, tok))
+                if is_cancelled(rid):
+                    reason = "cancelled"
+                    break
+                if time.monotonic() > deadline:
+                    reason = "deadline"
+                    break
+        except Exception as e:
+            reason = None
+            events.put(("error", rid, f"{type(e).__name__}: {e}"))
+        finally:
+            close = getattr(tokens, "close", None)
+            if close is not None:
+                close()  # stops the model mid-generation
+        if reason != "complete":
+            host.abandon()
+        if reason is not None:
+            events.put(("done", rid, reason))
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Parent side
+def _rss(pid: int) -> int | None:
+    try:
+        import psutil
+    except ImportError:
+        return None
+    try:
+        return psutil.Process(pid).memory_info().rss
+    except psutil.Error:
+        return None
+
+
+class LLMWorker:
+    """
+    Handle to the model process. `stream()` yields a reply's tokens and
+    raises LLMTimeout / LLMCancelled / WorkerCrashed / LLMError; it is safe to call from
+    several threads (requests are served in order).
+
+    factory: "module:function" building the model from `model_name` inside
+             the worker (must be importable there; default: GPT4All)
+    grace:   seconds a cancelled or overdue request may take to stop before
+             the worker is considered stuck and restarted; for a cancel the
+             clock starts at the first token (prompt processing can't be
+             interrupted and is allowed to finish)
+    idle_unload: seconds without requests after which the process exits,
+             freeing the model's memory; the next request starts it again
+             (0 = keep it loaded)
+    on_load: called with the load time in seconds each time the model loads
+    """
+
+    def __init__(self, model_name: str, factory: str = DEFAULT_FACTORY, grace: float = 2.0,
+                 backoff=RESTART_BACKOFF, idle_unload: float = 0.0, on_load=None):
+        self.model_name = model_name
+        self.factory = factory
+        self.grace = grace
+        self.backoff = backoff
+        self.idle_unload = idle_unload
+        self.on_load = on_load
+        self.load_seconds = None
+        self.load_error = None
+        self.restarts = 0
+        self.loads = 0
+        self.unloads = 0
+        self.requests = 0
+        self._last_used = time.monotonic()
+        self._ctx = mp.get_context("spawn")
+        self._ids = itertools.count(1)
+        self._pending = {}           # request id → queue.Queue of (kind, payload)
+        self._lock = Lock()
+        self._settled = Event()      # set once the model loaded or failed to
+        self._failures = 0           # consecutive deaths without a successful load
+        self._proc = None
+        self._closed = False
+
+    # -- lifecycle -----------------------------------------------------------
+    def start(self) -> "LLMWorker":
+        """Spawns the worker if it isn't running; returns at once (the model loads in the background)."""
+        with self._lock:
+            if self._proc is None and not self._closed:
+                self._spawn()
+        return self
+
+    def _spawn(self):
+        # Fresh queues per process: a killed worker can leave a queue's lock held.
+        self._requests = self._ctx.Queue()
+        self._events = self._ctx.Queue()
+        self._cancels = self._ctx.Queue()
+        self._settled.clear()
+        self.load_error = None
+        proc = self._ctx.Process(target=_serve, name="jarvis-llm-worker", daemon=True,
+                                 args=(self.factory, self.model_name, self._requests, self._events, self._cancels))
+        proc.start()
+        self._proc = proc
+        Thread(target=self._pump, args=(proc, self._events), name="jarvis-llm-events", daemon=True).start()
+
+    def _pump(self, proc, events):
+        """Routes the worker's events to waiting requests; restarts the worker when it dies."""
+        while self._proc is proc:
+            try:
+                kind, rid, payload = events.get(timeout=0.5)
+            except queue.Empty:
+                if not proc.is_alive():
+                    self._restart(proc, f"worker exited with code {proc.exitcode}")
+                    return
+                if self.idle_unload and time.monotonic() - self._last_used > self.idle_unload and self.unload(proc):
+                    return
+                continue
+            except (EOFError, OSError):
+                self._restart(proc, "worker connection lost")
+                return
+            if kind == "ready":
+                self.load_seconds = payload
+                self.loads += 1
+                self._failures = 0
+                print(f"[LLM] {self.model_name} loaded in the worker in {payload:.1f}s (pid {proc.pid})")
+                self._settled.set()
+                if self.on_load is not None:
+                    self.on_load(payload)
+            elif kind == "failed":
+                self.load_error = payload
+                print(f"[LLM] worker could not load the model: {payload}")
+                self._settled.set()
+            else:
+                target = self._pending.get(rid)
+                if target is not None:
+                    target.put((kind, payload))
+
+    def _restart(self, proc, reason: str):
+        """Kills `proc` (if still current), fails its requests and schedules a new worker after the backoff."""
+        with self._lock:
+            if self._proc is not proc or self._closed:
+                return
+            if proc.is_alive():
+                proc.kill()
+            proc.join(timeout=5)
+            pending, self._pending = self._pending, {}
+            self._proc = None
+        for target in pending.values():
+            target.put(("crashed", reason))
+        delay = self.backoff[min(self._failures, len(self.backoff) - 1)]
+        self._failures += 1
+        self.restarts += 1
+        print(f"[LLM] {reason}; restarting the worker in {delay:.1f}s")
+        timer = Timer(delay, self.start)
+        timer.daemon = True
+        timer.start()
+
+    def unload(self, proc=None) -> bool:
+        """
+        Stops the worker (or `proc`, if still the current one) unless a
+        request is waiting; the next `stream()` loads the model again.
+        """
+        with self._lock:
+            if self._proc is None or (proc is not None and self._proc is not proc) or self._pending:
+                return False
+            proc, self._proc = self._proc, None
+            requests = self._requests
+            self._settled.clear()
+        idle = time.monotonic() - self._last_used
+        self._stop(proc, requests)
+        self.unloads += 1
+        print(f"[LLM] {self.model_name} unloaded after {idle:.0f}s idle")
+        return True
+
+    def close(self, timeout: float = 2.0):
+        with self._lock:
+            self._closed = True
+            proc, self._proc = self._proc, None
+        if proc is not None:
+            self._stop(proc, self._requests, timeout)
+
+    @staticmethod
+    def _stop(proc, requests, timeout: float = 2.0):
+        try:
+            requests.put(None)
+        except (OSError, ValueError):
+            pass
+        proc.join(timeout)
+        if proc.is_alive():
+            proc.kill()
+
+    def stats(self) -> dict:
+        """Process state and counters; `rss_bytes` is the worker's resident memory (None when not running)."""
+        proc = self._proc
+        alive = bool(proc and proc.is_alive())
+        return {"alive": alive, "pid": proc.pid if proc else None,
+                "loaded": alive and self._settled.is_set() and self.load_error is None,
+                "rss_bytes": _rss(proc.pid) if alive else None, "load_seconds": self.load_seconds,
+                "loads": self.loads, "unloads": self.unloads, "restarts": self.restarts,
+                "requests": self.requests, "pending": len(self._pending),
+                "idle_seconds": time.monotonic() - self._last_used}
+
+    # -- requests ------------------------------------------------------------
+    def stream(self, prompt: str, max_tokens: int = 128, timeout: float = 60.0,
+               cancel: Event | None = None, load_timeout: float = 120.0, session=None):
+        """
+        Yields tokens of the reply. The `timeout` deadline starts once the
+        model is loaded (waiting up to `load_timeout` for that). Setting
+        `cancel`, or closing the generator, stops the generation. `session`
+        continues a conversation (see SessionHost).
+        """
+        rid = next(self._ids)
+        replies = queue.Queue()
+        self._last_used = time.monotonic()  # keeps the idle unload off while we wait
+        load_deadline = time.monotonic() + load_timeout
+        while True:
+            self.start()
+            if not self._settled.wait(max(0.0, load_deadline - time.monotonic())):
+                raise LLMTimeout(f"model not loaded after {load_timeout:g}s")
+            if self.load_error:
+                raise LLMError(self.load_error)
+            with self._lock:
+                if self._closed:
+                    raise LLMError("worker closed")
+                # Unloaded or restarted since the wait: wait for the new process's model instead
+                if self._proc is not None and self._settled.is_set():
+                    proc = self._proc
+                    self._pending[rid] = replies
+                    self.requests += 1
+                    self._last_used = time.monotonic()
+                    requests, cancels = self._requests, self._cancels
+                    break
+        deadline = time.monotonic() + timeout
+        requests.put((rid, prompt, max_tokens, deadline, session))
+        stop_requested = None   # why the worker was asked to stop: "cancel" or "deadline"
+        stopping_since = None   # monotonic time from which it gets `grace` seconds to stop
+        tokens_seen = False
+        finished = False
+        try:
+            while True:
+                if not stop_requested and cancel is not None and cancel.is_set():
+                    cancels.put(rid)
+                    stop_requested = "cancel"
+                    if tokens_seen:
+                        stopping_since = time.monotonic()
+                    # else: still processing the prompt; it checks for cancels after the first token
+                try:
+                    kind, payload = replies.get(timeout=0.05)
+                except queue.Empty:
+                    now = time.monotonic()
+                    if stopping_since is None and now > deadline:
+                        if not stop_requested:
+                            cancels.put(rid)
+                        stop_requested = "deadline"
+                        stopping_since = now
+                    elif stopping_since is not None and now - stopping_since > self.grace:
+                        # Deaf to cancellation (stuck inside one native call): only a kill stops it
+                        self._restart(proc, "worker did not stop in time")
+                        if stop_requested == "cancel":
+                            raise LLMCancelled("cancelled; the worker did not stop and was restarted")
+                        raise LLMTimeout(f"no reply within {timeout:g}s")
+                    continue
+                if kind == "token":
+                    tokens_seen = True
+                    if not stop_requested:
+                        yield payload
+                    elif stopping_since is None:
+                        stopping_since = time.monotonic()  # past the prompt: the next check stops it
+                    continue  # the worker stops at its next check
+                finished = True
+                if kind == "done":
+                    if payload == "deadline":
+                        raise LLMTimeout(f"reply not finished within {timeout:g}s")
+                    return
+                if kind == "crashed":
+                    raise WorkerCrashed(payload)
+                raise LLMError(payload)
+        finally:
+            with self._lock:
+                self._pending.pop(rid, None)
+                self._last_used = time.monotonic()
+            if not finished and not stop_requested:
+                cancels.put(rid)  # the caller stopped early (generator closed or an exception)
@@ -0,0 +1,418 @@
+# jarvis_media.py
+
+import heapq
+import os
+import random
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from threading import Event, Thread
+
+from jarvis_fileindex import _under
+
+try:
+    import mutagen as _mutagen  # optional: `pip install mutagen` for embedded ID3/Vorbis/MP4 tags
+except ImportError:
+    _mutagen = None
+
+DEFAULT_DB = os.path.join(os.path.expanduser("~"), ".jarvis", "media.db")
+AUDIO_EXTS = {".mp3", ".flac", ".m4a", ".aac", ".ogg", ".opus", ".wav", ".wma"}
+FIELDS = ("title", "artist", "album", "genre")
+_WEIGHTS = (3, 2, 2, 1)  # per field, when ranking search hits
+
+Track = namedtuple("Track", "path title artist album genre track_no duration")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tracks (
+    path     TEXT PRIMARY KEY,
+    mtime    REAL NOT NULL,
+    size     INTEGER NOT NULL,
+    title    TEXT NOT NULL,
+    artist   TEXT NOT NULL,
+    album    TEXT NOT NULL,
+    genre    TEXT NOT NULL,
+    track_no INTEGER NOT NULL,
+    duration REAL NOT NULL
+);
+"""
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_LEADING_NO = re.compile(r"^\s*(\d{1,3})\s*[-._ ]\s*")
+
+
+def tokens(text: str) -> list:
+    return _TOKEN.findall(text.lower().replace("'", ""))
+
+
+def default_roots() -> list:
+    """JARVIS_MUSIC_ROOTS (os.pathsep-separated), else ~/Music."""
+    env = (os.getenv("JARVIS_MUSIC_ROOTS") or "").strip()
+    if env:
+        return [p for p in env.split(os.pathsep) if p]
+    music = os.path.join(os.path.expanduser("~"), "Music")
+    return [music] if os.path.isdir(music) else []
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Tag extraction
+def tags_from_path(path: str) -> dict:
+    """
+    Best-effort tags from the usual layouts: .../Artist/Album/07 - Title.mp3
+    or .../Artist - Title.mp3.
+    """
+    stem = os.path.splitext(os.path.basename(path))[0]
+    parent = os.path.basename(os.path.dirname(path))
+    grandparent = os.path.basename(os.path.dirname(os.path.dirname(path)))
+    tags = {"title": stem, "artist": "", "album": "", "genre": "", "track_no": 0, "duration": 0.0}
+    m = _LEADING_NO.match(stem)
+    if m:
+        tags["track_no"] = int(m.group(1))
+        stem = stem[m.end():]
+        tags["title"] = stem
+    if " - " in stem:
+        artist, title = stem.split(" - ", 1)
+        tags["artist"], tags["title"] = artist.strip(), title.strip()
+    elif parent and grandparent:
+        tags["artist"], tags["album"] = grandparent, parent
+    return tags
+
+
+def track_from_path(path: str) -> Track:
+    """A Track for a file outside the library, tagged from its path only."""
+    t = tags_from_path(path)
+    return Track(path, t["title"], t["artist"], t["album"], t["genre"], t["track_no"], t["duration"])
+
+
+def read_tags(path: str) -> dict:
+    """Embedded tags via mutagen when it is installed, filling gaps from the path."""
+    tags = tags_from_path(path)
+    if _mutagen is None:
+        return tags
+    try:
+        f = _mutagen.File(path, easy=True)
+    except Exception:
+        return tags
+    if f is None:
+        return tags
+    found = f.tags or {}
+    for field in FIELDS:
+        value = found.get(field)
+        if value:
+            tags[field] = str(value[0]).strip()
+    number = found.get("tracknumber")
+    if number:
+        m = re.match(r"\d+", str(number[0]))
+        if m:
+            tags["track_no"] = int(m.group())
+    if getattr(f, "info", None) is not None:
+        tags["duration"] = float(getattr(f.info, "length", 0.0) or 0.0)
+    return tags
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Library
+class MediaLibrary:
+    """
+    Music library: tracks under `roots` with their tags, persisted in SQLite
+    and searchable through an in-memory inverted index (token → track ids,
+    per field and across fields).
+
+    `scan()` is incremental: the walk compares each file's (mtime, size) with
+    the stored row and only new or changed files have their tags read, in a
+    thread pool (tag reading is mostly waiting on the disk). `start()` loads
+    the stored library at once and rescans in the background periodically.
+    """
+
+    def __init__(self, db_path: str | None = None, roots=None, tag_reader=read_tags, workers: int | None = None):
+        self.db_path = db_path or (os.getenv("JARVIS_MEDIA_DB") or "").strip() or DEFAULT_DB
+        self.roots = [os.path.abspath(r) for r in (roots if roots is not None else default_roots())]
+        self.tag_reader = tag_reader
+        self.workers = workers or min(16, (os.cpu_count() or 2) * 2)
+        self.last_scan = {}
+        self._tracks = []  # Track per id (list position)
+        self._norm = []    # per id: normalized field values, in FIELDS order
+        self._index = {}   # (field | None, token) → set of ids
+        self._lock = threading.Lock()
+        self._stop = Event()
+        self._thread = None
+        if os.path.dirname(self.db_path):
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def __len__(self):
+        return len(self._tracks)
+
+    # ── scanning ────────────────────────────────────────────────────────────
+    def load(self):
+        """Loads the stored library into memory and builds the search index."""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT path, title, artist, album, genre, track_no, duration FROM tracks").fetchall()
+        self._build([Track(*row) for row in rows])
+
+    def scan(self, roots=None) -> dict:
+        """Brings the library up to date with the music folders; returns scan stats."""
+        t0 = time.perf_counter()
+        stats = {"files": 0, "unchanged": 0, "added": 0, "updated": 0, "removed": 0, "tag_seconds": 0.0,
+                 "interrupted": False}
+        roots = [os.path.abspath(r) for r in (roots or self.roots)]
+        todo = gone = ()
+        with self._lock:
+            conn = self._connect()
+            try:
+                stored = {p: (m, s) for p, m, s in conn.execute("SELECT path, mtime, size FROM tracks")}
+                on_disk = {}
+                for root in roots:
+                    if not self._walk(root, on_disk):
+                        # Stopped mid-walk: what wasn't walked would look deleted, so change nothing
+                        stats["interrupted"] = True
+                        break
+                else:
+                    todo, gone = self._apply(conn, roots, stored, on_disk, stats)
+            finally:
+                conn.close()
+            if todo or gone or not self._tracks:
+                self.load()
+        stats["seconds"] = time.perf_counter() - t0
+        self.last_scan = stats
+        return stats
+
+    def _apply(self, conn, roots: list, stored: dict, on_disk: dict, stats: dict) -> tuple:
+        """Writes the difference between a complete walk and the stored library; (changed paths, removed rows)."""
+        stats["files"] = len(on_disk)
+        todo = []
+        for path, sig in on_disk.items():
+            old = stored.get(path)
+            if old is None:
+                todo.append(path)
+                stats["added"] += 1
+            elif old != sig:
+                todo.append(path)
+                stats["updated"] += 1
+        stats["unchanged"] = len(on_disk) - len(todo)
+
+        if todo:
+            t_tags = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="jarvis-media-tags") as pool:
+                results = list(pool.map(self._safe_tags, todo, chunksize=64))
+            stats["tag_seconds"] = time.perf_counter() - t_tags
+            conn.executemany(
+                "INSERT OR REPLACE INTO tracks VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(p, *on_disk[p], t["title"], t["artist"], t["album"], t["genre"], t["track_no"],
+                  t["duration"]) for p, t in zip(todo, results)])
+        gone = [(p,) for p in stored.keys() - on_disk.keys() if any(_under(p, r) for r in roots)]
+        if gone:
+            conn.executemany("DELETE FROM tracks WHERE path = ?", gone)
+            stats["removed"] = len(gone)
+        conn.commit()
+        return todo, gone
+
+    def _walk(self, root: str, out: dict) -> bool:
+        """Adds the audio files under `root` to `out`; False if stop() cut the walk short."""
+        stack = [root]
+        while stack and not self._stop.is_set():
+            path = stack.pop()
+            try:
+                with os.scandir(path) as it:
+                    for e in it:
+                        try:
+                            if e.is_dir(follow_symlinks=False):
+                                if not e.name.startswith("."):
+                                    stack.append(e.path)
+                            elif os.path.splitext(e.name)[1].lower() in AUDIO_EXTS:
+                                st = e.stat(follow_symlinks=False)
+                                out[e.path] = (st.st_mtime, st.st_size)
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+        return not stack
+
+    def _safe_tags(self, path: str) -> dict:
+        try:
+            return self.tag_reader(path)
+        except Exception:
+            return tags_from_path(path)
+
+    def _build(self, tracks: list):
+        index = {}
+        norm = []
+        for i, t in enumerate(tracks):
+            values = []
+            for field in FIELDS:
+                toks = tokens(getattr(t, field))
+                values.append(" ".join(toks))
+                for tok in toks:
+                    index.setdefault((field, tok), set()).add(i)
+                    index.setdefault((None, tok), set()).add(i)
+            norm.append(tuple(values))
+        # Swap in one go: searches running meanwhile keep using the old lists
+        self._tracks, self._norm, self._index = tracks, norm, index
+
+    def start(self, interval: float | None = None) -> Thread:
+        """Loads the stored library now, then rescans every `interval` s (JARVIS_MEDIA_RESCAN, default 1800)."""
+        if self._thread is not None:
+            return self._thread
+        interval = interval or float(os.getenv("JARVIS_MEDIA_RESCAN", "1800"))
+        self.load()
+
+        def _loop():
+            while not self._stop.is_set():
+                try:
+                    st = self.scan()
+                    if st["interrupted"]:
+                        break
+                    print(f"[Media] {st['files']} tracks: +{st['added']} ~{st['updated']} -{st['removed']} "
+                          f"in {st['seconds']:.1f}s")
+                except sqlite3.Error as e:
+                    print(f"[Media] scan failed: {e}")
+                self._stop.wait(interval)
+
+        self._thread = Thread(target=_loop, name="jarvis-media-scan", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self):
+        self._stop.set()
+
+    # ── lookups ─────────────────────────────────────────────────────────────
+    def search(self, query: str, field: str | None = None, limit: int | None = 50) -> list:
+        """
+        Tracks matching every word of `query` (in `field`, or any field),
+        best first: whole-field matches, then title/artist/album hits.
+        Falls back to tracks matching most of the words.
+        """
+        return self._rank(self._match(query, field), query, field, limit)
+
+    def _match(self, query: str, field: str | None) -> set:
+        index = self._index
+        words = tokens(query)
+        if not words:
+            return set()
+        postings = [index.get((field, w), set()) for w in words]
+        # The last word may be cut short ("play something by cold")
+        if not postings[-1]:
+            last = words[-1]
+            postings[-1] = set().union(*(ids for (f, tok), ids in index.items()
+                                         if f == field and tok.startswith(last))) if len(last) >= 3 else set()
+        if all(postings):
+            hits = set.intersection(*sorted(postings, key=len))
+            if hits:
+                return hits
+        # Most words matched
+        counts = {}
+        for ids in postings:
+            for i in ids:
+                counts[i] = counts.get(i, 0) + 1
+        need = max(1, (len(words) + 1) // 2)
+        return {i for i, c in counts.items() if c >= need}
+
+    def _rank(self, hits: set, query: str, field: str | None, limit: int | None) -> list:
+        tracks, norm = self._tracks, self._norm
+        phrase = " ".join(tokens(query))
+        weighted = [(k, w) for k, (f, w) in enumerate(zip(FIELDS, _WEIGHTS)) if field in (None, f)]
+
+        def key(i):
+            values = norm[i]
+            s = 0
+            for k, w in weighted:
+                if values[k] == phrase:
+                    s += 10 * w
+                elif phrase in values[k]:
+                    s += w
+            t = tracks[i]
+            return -s, t.album, t.track_no, t.title
+
+        # One pass instead of a full sort when only the best few are wanted
+        ranked = heapq.nsmallest(limit, hits, key=key) if limit and limit < len(hits) // 8 else sorted(hits, key=key)
+        return [tracks[i] for i in ranked[:limit]]
+
+    def resolve(self, request: str) -> tuple[list, str]:
+        """
+        Turns a spoken request into (tracks to play, description for speech):
+        "something by X" (shuffled), "album X" (in track order), "song X",
+        "X by Y", or a plain name matched against every field.
+        """
+        req = parse_request(request)
+        if "artist" in req and "title" in req:
+            hits = self._match(req["title"], "title") & self._match(req["artist"], "artist")
+            tracks = self._rank(hits, req["title"], "title", limit=1)
+            if tracks:
+                return tracks, f"{tracks[0].title} by {tracks[0].artist}"
+            req = {"any": f"{req['title']} {req['artist']}"}
+        if "artist" in req:
+            tracks = self.search(req["artist"], "artist", limit=None)
+            exact = " ".join(tokens(req["artist"]))
+            if any(" ".join(tokens(t.artist)) == exact for t in tracks[:1]):
+                # "by Queen" means Queen, not also every artist with "queen" in the name
+                tracks = [t for t in tracks if t.artist == tracks[0].artist]
+            random.shuffle(tracks)
+            if not tracks:
+                return [], ""
+            if len({t.artist for t in tracks}) > 1:
+                return tracks, f"{len(tracks)} songs by artists matching {req['artist']}"
+            return tracks, f"{len(tracks)} songs by {tracks[0].artist}"
+        if "album" in req:
+            tracks = self.search(req["album"], "album", limit=None)
+            if tracks:
+                album = tracks[0].album  # one album, not every album sharing a word
+                tracks = sorted((t for t in tracks if t.album == album), key=lambda t: (t.track_no, t.title))
+                return tracks, f"the album {album}"
+            return [], ""
+        if "title" in req:
+            tracks = self.search(req["title"], "title", limit=1)
+        else:
+            tracks = self.search(req["any"], limit=1)
+        if not tracks:
+            return [], ""
+        t = tracks[0]
+        return [t], f"{t.title} by {t.artist}" if t.artist else t.title
+
+    def in_folder(self, folder: str) -> list:
+        """Tracks under `folder`, in folder/album order."""
+        folder = os.path.abspath(folder)
+        return sorted((t for t in self._tracks if _under(t.path, folder)),
+                      key=lambda t: (os.path.dirname(t.path), t.track_no, t.path))
+
+    def stats(self) -> dict:
+        return {"tracks": len(self._tracks), "index_keys": len(self._index), "tag_reader":
+                "mutagen" if _mutagen is not None and self.tag_reader is read_tags else "path", **self.last_scan}
+
+
+_REQUESTS = [
+    re.compile(r"(?:something|anything|songs?|music|tracks?) (?:by|from) (?P<artist>.+)"),
+    re.compile(r"(?:the )?album (?P<album>.+)"),
+    re.compile(r"(?:the )?(?:song|track) (?P<title>.+?)(?: by (?P<artist>.+))?"),
+    re.compile(r"(?P<title>.+) by (?P<artist>.+)"),
+]
+_PLAY_PREFIX = re.compile(r"^(?:please )?(?:play|put on|listen to)\s+(?:some\s+|me\s+)?")
+
+
+def parse_request(text: str) -> dict:
+    """"play something by Queen" → {"artist": "queen"}; unknown forms → {"any": text}."""
+    text = _PLAY_PREFIX.sub("", text.lower().strip())
+    for pattern in _REQUESTS:
+        m = pattern.fullmatch(text)
+        if m:
+            return {k: v.strip() for k, v in m.groupdict().items() if v}
+    return {"any": text}
+
+
+def write_playlist(tracks, path: str | None = None) -> str:
+    """An .m3u8 playlist of `tracks` (for handing several songs to the default player)."""
+    path = path or os.path.join(tempfile.gettempdir(), "jarvis_playlist.m3u8")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("#EXTM3U\n")
+        for t in tracks:
+            f.write(f"#EXTINF:{int(t.duration) or -1},{t.artist} - {t.title}\n{t.path}\n")
+    return path
+
@@ -1,21 +1,14 @@
-import os, openai
-from dotenv import load_dotenv
-load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), "..", ".env"))
+from jarvis_core import INTENT_THRESHOLD, classify_intent
 
-
-load_dotenv()
-openai.api_key = os.getenv("OPENAI_API_KEY")
+# Labels older callers expect; every other command maps to its upper-cased name.
+_LEGACY = {"open_browser": "OPEN_BROWSER", "time": "GET_TIME", "exit": "EXIT"}
 
 def parse_intent(text):
-    prompt = (
-        "You are an assistant that maps user requests into one of: "
-        "OPEN_BROWSER, GET_TIME, EXIT, UNKNOWN. "
-        f"User: \"{text}\"\nIntent:"
-    )
-    resp = openai.Completion.create(
-        model="gpt-3.5-turbo",
-        prompt=prompt,
-        max_tokens=10,
-        temperature=0
-    )
-    return resp.choices[0].text.strip()
\ No newline at end of file
+    """
+    Maps a request to an intent name (OPEN_BROWSER, GET_TIME, EXIT, ... or
+    UNKNOWN) with the local classifier in jarvis_intent; no network call.
+    """
+    name, confidence = classify_intent(text.lower().strip())
+    if name == "llm" or confidence < INTENT_THRESHOLD:
+        return "UNKNOWN"
+    return _LEGACY.get(name, name.upper())
@@ -0,0 +1,257 @@
+# jarvis_phrases.py
+
+import hashlib
+import os
+import time
+import wave
+from queue import Queue
+from threading import Event, Lock, Thread
+
+import numpy as np
+
+from jarvis_tts import TTSBackend
+
+DEFAULT_FOLDER = os.path.join(os.path.expanduser("~"), ".jarvis", "phrases")
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Phrase cache: rendered PCM on disk, loaded into memory on first use
+class PhraseCache:
+    """
+    Rendered speech for fixed phrases, one 16-bit mono WAV per phrase under
+    `folder`, keyed by text + voice + rate so a voice change never plays
+    stale audio. Entries are kept in memory once loaded.
+
+    Phrases passed to `register()` are always worth rendering; any other text
+    becomes worth it once it has been spoken live `learn_after` times (0
+    turns learning off), up to `max_entries` files.
+    """
+
+    def __init__(self, folder: str | None = None, learn_after: int = 2, max_entries: int = 512):
+        self.folder = folder or DEFAULT_FOLDER
+        self.learn_after = learn_after
+        self.max_entries = max_entries
+        self._mem = {}          # key → (int16 pcm, sample rate)
+        self._registered = set()
+        self._misses = {}       # text → live syntheses so far
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.folder, exist_ok=True)
+        self._on_disk = len([n for n in os.listdir(self.folder) if n.endswith(".wav")])
+
+    @staticmethod
+    def make_key(text: str, voice: str, rate: int) -> str:
+        return hashlib.sha1(f"{voice}\0{rate}\0{text.strip()}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.folder, key + ".wav")
+
+    def register(self, phrases):
+        with self._lock:
+            self._registered.update(p.strip() for p in phrases)
+
+    @property
+    def registered(self) -> list:
+        with self._lock:
+            return sorted(self._registered)
+
+    def get(self, text: str, voice: str, rate: int):
+        """(pcm, sample_rate) from memory or disk, or None."""
+        key = self.make_key(text, voice, rate)
+        entry = self._mem.get(key)
+        if entry is None:
+            entry = self._read(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return entry
+
+    def contains(self, text: str, voice: str, rate: int) -> bool:
+        key = self.make_key(text, voice, rate)
+        return key in self._mem or os.path.exists(self._path(key))
+
+    def wants(self, text: str) -> bool:
+        """Called after a live synthesis: should this text be rendered into the cache?"""
+        text = text.strip()
+        with self._lock:
+            if text in self._registered:
+                return True
+            if not self.learn_after or self._on_disk >= self.max_entries:
+                return False
+            self._misses[text] = self._misses.get(text, 0) + 1
+            return self._misses[text] >= self.learn_after
+
+    def put(self, text: str, voice: str, rate: int, pcm, sample_rate: int):
+        key = self.make_key(text, voice, rate)
+        pcm = np.ascontiguousarray(pcm, dtype=np.int16)
+        tmp = self._path(key) + ".tmp"
+        with wave.open(tmp, "wb") as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(sample_rate)
+            wf.writeframes(pcm.tobytes())
+        os.replace(tmp, self._path(key))
+        with self._lock:
+            self._mem[key] = (pcm, sample_rate)
+            self._misses.pop(text.strip(), None)
+            self._on_disk += 1
+
+    def _read(self, key: str):
+        try:
+            with wave.open(self._path(key), "rb") as wf:
+                entry = (np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16), wf.getframerate())
+        except (FileNotFoundError, wave.Error, EOFError):
+            return None
+        with self._lock:
+            self._mem[key] = entry
+        return entry
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "in_memory": len(self._mem),
+                "on_disk": self._on_disk,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Playback
+class PcmPlayer:
+    """
+    Plays int16 PCM through one long-lived sounddevice output stream, so a
+    cached phrase starts with the next audio callback instead of waiting for
+    a device open. The stream is (re)opened when the sample rate changes.
+    """
+
+    def __init__(self, device=None):
+        self.device = device
+        self._stream = None
+        self._rate = None
+        self._current = None  # [float32 samples, position, done Event, first-callback time]
+
+    def _ensure_stream(self, sample_rate: int):
+        if self._stream is not None and self._rate == sample_rate:
+            return
+        import sounddevice as sd
+        self.close()
+        self._stream = sd.OutputStream(samplerate=sample_rate, channels=1, dtype="float32",
+                                       latency="low", device=self.device, callback=self._callback)
+        self._stream.start()
+        self._rate = sample_rate
+
+    def _callback(self, out, frames, time_info, status):
+        cur = self._current
+        if cur is None:
+            out.fill(0)
+            return
+        if cur[3] is None:
+            cur[3] = time.perf_counter()
+        samples, pos = cur[0], cur[1]
+        chunk = samples[pos:pos + frames]
+        out[:len(chunk), 0] = chunk
+        out[len(chunk):] = 0
+        cur[1] = pos + frames
+        if cur[1] >= len(samples):
+            self._current = None
+            cur[2].set()
+
+    def play(self, pcm, sample_rate: int, cancelled: Event, volume: int = 100):
+        """
+        Blocks until played or `cancelled`; returns (finished, first_sample_at)
+        where first_sample_at estimates when the first sample reached the DAC
+        (first callback + the stream's output latency).
+        """
+        self._ensure_stream(sample_rate)
+        samples = pcm.astype(np.float32) * (volume / 100 / 32768.0)
+        done = Event()
+        cur = [samples, 0, done, None]
+        self._current = cur
+        finished = True
+        while not done.wait(0.02):
+            if cancelled.is_set():
+                self._current = None
+                finished = False
+                break
+        first = cur[3] + self._stream.latency if cur[3] is not None else None
+        return finished, first
+
+    def close(self):
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Backend wrapper
+class CachingBackend(TTSBackend):
+    """
+    Wraps a TTS backend that can `render()` text to PCM. Cached phrases play
+    straight from memory; anything else is synthesized live by the wrapped
+    backend and, if the cache `wants()` it, rendered afterwards on a
+    background thread (never delaying the speech queue). Registered phrases
+    that aren't on disk yet are rendered when the backend opens, so they are
+    cached from the first run on.
+    """
+
+    def __init__(self, backend: TTSBackend, cache: PhraseCache, player: PcmPlayer | None = None):
+        self.backend = backend
+        self.cache = cache
+        self.player = player or PcmPlayer()
+        self.name = backend.name
+        self._render_q = Queue()
+        self._render_thread = None
+        self._play_failed = False
+
+    @property
+    def voice_id(self) -> str:
+        return self.backend.voice_id
+
+    @property
+    def rate(self) -> int:
+        return self.backend.rate
+
+    def open(self):
+        self.backend.open()
+        self.first_audio_at = None
+        self._render_thread = Thread(target=self._render_loop, name="jarvis-tts-render", daemon=True)
+        self._render_thread.start()
+        for phrase in self.cache.registered:
+            if not self.cache.contains(phrase, self.voice_id, self.rate):
+                self._render_q.put(phrase)
+
+    def say(self, text: str, cancelled: Event) -> bool:
+        entry = None if self._play_failed else self.cache.get(text, self.voice_id, self.rate)
+        if entry is not None:
+            try:
+                finished, self.first_audio_at = self.player.play(entry[0], entry[1], cancelled, self.volume)
+                return finished
+            except Exception as e:
+                print(f"[TTS cache] playback failed ({e}); using live synthesis only")
+                self._play_failed = True
+        self.backend.volume = self.volume
+        self.backend.first_audio_at = None
+        spoken = self.backend.say(text, cancelled)
+        self.first_audio_at = self.backend.first_audio_at
+        if spoken and self.cache.wants(text):
+            self._render_q.put(text)
+        return spoken
+
+    def _render_loop(self):
+        while (text := self._render_q.get()) is not None:
+            if self.cache.contains(text, self.voice_id, self.rate):
+                continue
+            try:
+                pcm, sample_rate = self.backend.render(text)
+            except Exception as e:
+                print(f"[TTS cache] rendering failed ({e}); phrase cache disabled")
+                return
+            self.cache.put(text, self.voice_id, self.rate, pcm, sample_rate)
+
+    def close(self):
+        self._render_q.put(None)
+        self.player.close()
+        self.backend.close()
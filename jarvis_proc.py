@@ -0,0 +1,370 @@
+# jarvis_proc.py
+
+import difflib
+import os
+import re
+import shutil
+import subprocess
+import sys
+import time
+from collections import namedtuple
+from threading import Event, Lock, Thread
+
+import psutil
+
+# `proc` is the psutil.Process made when the pid was indexed: it remembers create_time, so signalling
+# through it fails (NoSuchProcess) instead of hitting an unrelated process that reused the pid.
+# `exe` is the lowercase executable name without .exe; `key` (proc_key) is what spoken names match.
+ProcInfo = namedtuple("ProcInfo", "pid name key create_time proc exe")
+# pending: pids a close() left alone until it is confirmed (several separate instances, a generic name,
+# or a guessed match)
+CloseReport = namedtuple("CloseReport", "name closed killed survivors denied seconds pending", defaults=((),))
+
+# Spoken names → executable names (without .exe), for apps whose binary isn't called what people say.
+ALIASES = {
+    "google chrome": "chrome", "chrome browser": "chrome", "edge": "msedge", "microsoft edge": "msedge",
+    "firefox": "firefox", "mozilla firefox": "firefox",
+    "visual studio code": "code", "vs code": "code", "vscode": "code", "code": "code",
+    "word": "winword", "microsoft word": "winword", "excel": "excel", "microsoft excel": "excel",
+    "powerpoint": "powerpnt", "outlook": "outlook", "onenote": "onenote",
+    "notepad": "notepad", "notepad plus plus": "notepad++", "calculator": "calculatorapp",
+    "paint": "mspaint", "task manager": "taskmgr", "command prompt": "cmd", "terminal": "windowsterminal",
+    "spotify": "spotify", "discord": "discord", "teams": "ms-teams", "microsoft teams": "ms-teams",
+    "zoom": "zoom", "slack": "slack", "steam": "steam", "vlc": "vlc", "obs": "obs64",
+}
+
+# Never closed by voice: the OS would crash or log out, or it is Jarvis itself.
+PROTECTED = {
+    "system", "idle", "registry", "smss", "csrss", "wininit", "winlogon", "services", "lsass", "svchost",
+    "dwm", "explorer", "fontdrvhost", "memory compression", "init", "systemd", "launchd", "kernel_task",
+}
+
+# Interpreters and hosts: the name says nothing about which program is running, and Jarvis is one of them.
+GENERIC = {
+    "python", "pythonw", "python3", "py", "node", "java", "javaw", "ruby", "perl", "php", "dotnet",
+    "powershell", "pwsh", "cmd", "conhost", "bash", "sh", "zsh", "wscript", "cscript", "rundll32", "dllhost",
+}
+
+_NON_ALNUM = re.compile(r"[^a-z0-9+]+")
+
+
+def proc_key(name: str) -> str:
+    """Match key of an executable or spoken name: lowercase, no extension, no spaces or punctuation."""
+    name = name.lower()
+    if name.endswith(".exe"):
+        name = name[:-4]
+    return _NON_ALNUM.sub("", name)
+
+def exe_name(name: str) -> str:
+    """Exact executable name of a process or spoken name: lowercase, no extension, single spaces."""
+    name = " ".join(name.lower().split())
+    return name[:-4] if name.endswith(".exe") else name
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Index
+class ProcessIndex:
+    """
+    Running processes by executable name. `refresh()` is incremental: it
+    lists the pids (cheap) and only asks the OS about processes that weren't
+    there last time. `start()` refreshes on a background thread; lookups
+    refresh first when the index is older than `max_age` seconds.
+    """
+
+    def __init__(self, interval: float = 5.0, max_age: float = 1.0, aliases=ALIASES, protected=PROTECTED,
+                 generic=GENERIC):
+        self.interval = interval
+        self.max_age = max_age
+        self.aliases = {proc_key(k): exe_name(v) for k, v in aliases.items()}  # key → exact executable
+        self.protected = {proc_key(p) for p in protected}
+        self.generic = {proc_key(g) for g in generic}
+        self._launched = []       # psutil.Process of each app launch() started (our children, but closable)
+        self._procs = {}          # pid → ProcInfo
+        self._by_key = {}         # key → {pid}
+        self._lock = Lock()
+        self._stop = Event()
+        self._thread = None
+        self.refreshed_at = 0.0
+        self.last_refresh = {}
+
+    def refresh(self) -> dict:
+        t0 = time.perf_counter()
+        pids = set(psutil.pids())
+        with self._lock:
+            known = set(self._procs)
+        added = []
+        for pid in pids - known:
+            try:
+                p = psutil.Process(pid)
+                name = p.name()
+                added.append(ProcInfo(pid, name, proc_key(name), p.create_time(), p, exe_name(name)))
+            except psutil.Error:
+                continue
+        with self._lock:
+            for pid in known - pids:
+                info = self._procs.pop(pid)
+                self._by_key.get(info.key, set()).discard(pid)
+            for info in added:
+                self._procs[info.pid] = info
+                self._by_key.setdefault(info.key, set()).add(info.pid)
+            self._by_key = {k: v for k, v in self._by_key.items() if v}
+        self.refreshed_at = time.monotonic()
+        self.last_refresh = {"processes": len(pids), "added": len(added), "removed": len(known - pids),
+                             "seconds": time.perf_counter() - t0}
+        return self.last_refresh
+
+    def start(self) -> "ProcessIndex":
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = Thread(target=self._run, name="jarvis-proc-index", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"[Proc] refresh failed: {e}")
+            self._stop.wait(self.interval)
+
+    def _forget(self, infos):
+        """Drops entries whose pid was reused, so the next refresh looks the new process up."""
+        with self._lock:
+            for info in infos:
+                if self._procs.get(info.pid) is info:
+                    del self._procs[info.pid]
+                    self._by_key.get(info.key, set()).discard(info.pid)
+            self._by_key = {k: v for k, v in self._by_key.items() if v}
+
+    def track(self, pid: int):
+        """Marks a child process as started for the user, so close() may close it (launch() does this)."""
+        self._launched = [p for p in self._launched if p.is_running()]
+        try:
+            self._launched.append(psutil.Process(pid))
+        except psutil.Error:  # already gone
+            pass
+
+    def _ours(self, proc: psutil.Process) -> bool:
+        """
+        Jarvis, the process that started it, or a descendant Jarvis started
+        for itself (the LLM worker, ...). Apps started by `launch()` are
+        descendants too, but are the user's to close.
+        """
+        me = psutil.Process()
+        if proc.pid in (me.pid, os.getppid()):
+            return True
+        try:
+            while proc is not None:
+                if proc in self._launched:  # Process equality includes create_time, so a reused pid isn't
+                    return False
+                proc = proc.parent()        # None at the top, or once the ppid belongs to a newer process
+                if proc == me:
+                    return True
+        except psutil.Error:
+            pass
+        return False
+
+    def _fresh(self):
+        if time.monotonic() - self.refreshed_at > self.max_age:
+            self.refresh()
+
+    def names(self) -> list:
+        """Distinct executable keys currently running."""
+        self._fresh()
+        with self._lock:
+            return sorted(self._by_key)
+
+    def find(self, spoken: str, cutoff: float = 0.75) -> tuple[str | None, list, bool]:
+        """
+        Best running executable for a spoken app name → (key, [ProcInfo, ...], exact).
+        Tries the alias table and the whole name, then a fuzzy match on the
+        whole name; single words ("the code window") only when those fail.
+        `exact` is True only when an alias or the whole name is an executable
+        name as it is ("notepad" is notepad.exe, not notepad++.exe); the
+        processes are then only those of that executable.
+        """
+        self._fresh()
+        spoken = exe_name(spoken)
+        whole = proc_key(spoken)
+        words = [proc_key(w) for w in spoken.split()]
+        with self._lock:
+            running = dict(self._by_key)
+            targets = [t for t in (self.aliases.get(whole), spoken) if t]
+            for target in targets:
+                exact = [self._procs[pid] for pid in running.get(proc_key(target), ())
+                         if self._procs[pid].exe == target]
+                if exact:
+                    return proc_key(target), exact, True
+            key = next((k for k in map(proc_key, targets) if k in running), None)
+            if key is None:
+                close = difflib.get_close_matches(whole, list(running), n=1, cutoff=cutoff)
+                key = close[0] if close else None
+            if key is None:
+                key = next((proc_key(k) for k in [self.aliases.get(w) for w in words] + words
+                            if k and proc_key(k) in running), None)
+            if key is None:
+                return None, [], False
+            return key, [self._procs[pid] for pid in running[key]], False
+
+    # ── control ─────────────────────────────────────────────────────────────
+    def close(self, spoken: str, timeout: float = 3.0, kill_timeout: float = 2.0,
+              confirmed: bool = False) -> CloseReport | None:
+        """
+        Closes every instance of the app matching `spoken`: asks them all to
+        exit at once (windows get WM_CLOSE on Windows, SIGTERM elsewhere),
+        waits up to `timeout` seconds for all of them together, then kills
+        the rest and waits up to `kill_timeout`. None if nothing matched.
+        Jarvis, its parent and the helpers it started (not the apps from
+        `launch()`) are never touched.
+        Unless `confirmed`, several separate instances (process trees; one
+        Chrome with its dozens of helper processes counts once), a generic
+        name (python, node, ...) or a match that isn't exact (fuzzy, one word
+        of the name, punctuation aside: see `find`) only come back as
+        `pending`, with nothing closed.
+        """
+        self.refresh()  # incremental, so cheap; catches instances started since the last pass
+        key, infos, exact = self.find(spoken)
+        stale = [i for i in infos if not i.proc.is_running()]  # exited, and the pid now belongs to another process
+        if stale:
+            self._forget(stale)
+            self.refresh()
+            key, infos, exact = self.find(spoken)
+        if key is None:
+            return None
+        if key in self.protected:
+            return CloseReport(key, [], [], [], [i.pid for i in infos], 0.0)
+        infos = [i for i in infos if not self._ours(i.proc)]
+        if infos and not confirmed and (not exact or key in self.generic or len(instances(infos)) > 1):
+            return CloseReport(key, [], [], [], [], 0.0, sorted(i.pid for i in infos))
+        report = terminate([i.proc for i in infos], timeout, kill_timeout)
+        self.refresh()
+        return report._replace(name=key)
+
+    def launch(self, spoken: str) -> subprocess.Popen | None:
+        """
+        Starts an app by spoken name without a shell: an executable on PATH
+        (after aliases), else, on Windows, whatever the App Paths registry maps
+        the name to. Raises FileNotFoundError if neither knows it.
+        """
+        key = self.aliases.get(proc_key(spoken), proc_key(spoken))
+        for name in (key, spoken.strip()):
+            path = shutil.which(name)
+            if path:
+                proc = subprocess.Popen([path], stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                                        stderr=subprocess.DEVNULL)
+                self.track(proc.pid)
+                return proc
+        if sys.platform == "win32":
+            os.startfile(key)  # raises FileNotFoundError for unknown names
+            return None
+        raise FileNotFoundError(spoken)
+
+def instances(infos) -> list:
+    """
+    The separately started instances among `infos` (one app's processes):
+    those whose parent isn't one of them. A browser or Electron app's
+    renderer and helper processes belong to the instance that spawned them.
+    """
+    pids = {i.pid for i in infos}
+    roots = []
+    for info in infos:
+        try:
+            parent = info.proc.ppid()
+        except psutil.Error:
+            parent = None
+        if parent not in pids:
+            roots.append(info)
+    return roots
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Termination
+def _close_windows(pids: set) -> set:
+    """Posts WM_CLOSE to the visible top-level windows of `pids` (Windows); the pids that had one."""
+    import win32con
+    import win32gui
+    import win32process
+    hwnds = []
+
+    def collect(hwnd, _):
+        if win32gui.IsWindowVisible(hwnd):
+            pid = win32process.GetWindowThreadProcessId(hwnd)[1]
+            if pid in pids:
+                hwnds.append((hwnd, pid))
+        return True
+
+    win32gui.EnumWindows(collect, None)
+    asked = set()
+    for hwnd, pid in hwnds:
+        try:
+            win32gui.PostMessage(hwnd, win32con.WM_CLOSE, 0, 0)
+            asked.add(pid)
+        except win32gui.error:  # the window closed meanwhile
+            pass
+    return asked
+
+
+def terminate(pids, timeout: float = 3.0, kill_timeout: float = 2.0) -> CloseReport:
+    """
+    Graceful-then-forced termination of all `pids` (ints, or psutil.Process
+    objects, which are skipped if their pid has been reused) in parallel. On Windows
+    the graceful step closes the processes' windows (so apps can save or
+    prompt); processes without windows, and everything elsewhere, get
+    terminate(). Returns which pids exited on request, which had to be
+    killed, which survived, and which we weren't allowed to touch.
+    """
+    t0 = time.perf_counter()
+    procs, denied = [], []
+    for pid in pids:
+        try:
+            p = pid if isinstance(pid, psutil.Process) else psutil.Process(pid)
+        except psutil.NoSuchProcess:
+            continue
+        except psutil.AccessDenied:
+            denied.append(pid)
+            continue
+        if p.is_running():  # False once the pid is gone or reused
+            procs.append(p)
+
+    asked = set()  # pids sent WM_CLOSE; the windowless rest (helpers, background processes) get terminate()
+    if sys.platform == "win32":
+        try:
+            asked = _close_windows({p.pid for p in procs})
+        except ImportError:
+            pass
+    exited = []
+    for p in procs:
+        if p.pid not in asked:
+            try:
+                p.terminate()  # SIGTERM; TerminateProcess on Windows
+            except psutil.NoSuchProcess:
+                exited.append(p)
+            except psutil.AccessDenied:
+                denied.append(p.pid)
+    procs = [p for p in procs if p.pid not in denied and p not in exited]
+
+    gone, alive = psutil.wait_procs(procs, timeout=timeout)
+    gone += exited
+    if alive and asked:
+        # Windows that ignored WM_CLOSE (or a "save changes?" prompt): terminate, then kill below
+        for p in alive:
+            try:
+                p.terminate()
+            except psutil.Error:
+                pass
+        more, alive = psutil.wait_procs(alive, timeout=min(0.5, kill_timeout))
+        gone += more
+    killed = []
+    for p in alive:
+        try:
+            p.kill()
+            killed.append(p)
+        except psutil.NoSuchProcess:
+            gone.append(p)
+        except psutil.AccessDenied:
+            denied.append(p.pid)
+    _, survivors = psutil.wait_procs(killed, timeout=kill_timeout)
+    return CloseReport(None, sorted(p.pid for p in gone), sorted(p.pid for p in killed if p not in survivors),
+                       sorted(p.pid for p in survivors), sorted(denied), time.perf_counter() - t0)
@@ -0,0 +1,379 @@
+# jarvis_recorder.py
+
+import os
+import time
+from queue import Empty, Full, Queue
+from threading import Event, Thread
+
+import numpy as np
+
+from jarvis_lazy import lazy_import
+
+cv2 = lazy_import("cv2")
+mss = lazy_import("mss")
+gw = lazy_import("pygetwindow")
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Frame sources
+class MssSource:
+    """
+    Screen capture via mss. `monitor=0` is the whole virtual desktop, 1.. are
+    single monitors; `region=(left, top, width, height)` captures just that
+    rectangle (see `for_window`).
+    """
+
+    def __init__(self, monitor: int = 0, region: tuple | None = None):
+        with mss.mss() as sct:
+            if not 0 <= monitor < len(sct.monitors):
+                raise ValueError(f"No monitor {monitor} (have {len(sct.monitors) - 1})")
+            bounds = dict(sct.monitors[monitor])
+        if region is not None:
+            left, top, width, height = (int(v) for v in region)
+            bounds = {"left": left, "top": top, "width": width, "height": height}
+        # mp4v wants even dimensions
+        bounds["width"] -= bounds["width"] % 2
+        bounds["height"] -= bounds["height"] % 2
+        if bounds["width"] <= 0 or bounds["height"] <= 0:
+            raise ValueError(f"Empty capture region: {bounds}")
+        self.monitor = monitor
+        self.bounds = bounds
+        self.size = (bounds["width"], bounds["height"])
+        self._sct = None
+
+    @classmethod
+    def for_window(cls, title: str):
+        """Captures the on-screen rectangle of the first window whose title contains `title`."""
+        wins = [w for w in gw.getWindowsWithTitle(title) if w.width > 0 and w.height > 0]
+        if not wins:
+            raise ValueError(f"No window titled like {title!r}")
+        win = wins[0]
+        with mss.mss() as sct:
+            desk = sct.monitors[0]
+        # Clip to the virtual desktop; maximized windows overhang it by a few pixels
+        left, top = max(win.left, desk["left"]), max(win.top, desk["top"])
+        right = min(win.left + win.width, desk["left"] + desk["width"])
+        bottom = min(win.top + win.height, desk["top"] + desk["height"])
+        return cls(region=(left, top, right - left, bottom - top))
+
+    def open(self):
+        # mss handles are per-thread on Windows, so the capture thread opens its own
+        self._sct = mss.mss()
+
+    def grab(self):
+        """BGRA (h, w, 4) uint8 view over the screenshot's buffer — no extra copy."""
+        shot = self._sct.grab(self.bounds)
+        return np.frombuffer(shot.raw, dtype=np.uint8).reshape(shot.height, shot.width, 4)
+
+    def close(self):
+        if self._sct is not None:
+            self._sct.close()
+            self._sct = None
+
+
+class SyntheticSource:
+    """
+    Stand-in for mss in tests/benchmarks: a moving bar on a static
+    background, optionally with an artificial per-grab cost. With
+    `change_every=n` the bar only moves every n-th grab (a mostly idle desktop).
+    """
+
+    def __init__(self, width: int = 1280, height: int = 720, grab_cost: float = 0.0, change_every: int = 1):
+        self.size = (width, height)
+        self.grab_cost = grab_cost
+        self.change_every = max(1, change_every)
+        self._n = 0
+
+    def open(self):
+        w, h = self.size
+        self._base = np.full((h, w, 4), 40, dtype=np.uint8)
+
+    def grab(self):
+        if self.grab_cost:
+            time.sleep(self.grab_cost)
+        w, _ = self.size
+        frame = self._base.copy()
+        x = (self._n // self.change_every * 8) % w
+        frame[:, x:x + 16, :3] = 255
+        self._n += 1
+        return frame
+
+    def close(self):
+        pass
+
+
+class ChangeDetector:
+    """
+    Cheap "did anything change?" test for screen frames. Screen grabs are
+    exact (no sensor noise), so unchanged means byte-identical: every
+    `row_step`-th row is compared with the last changed frame, with the row
+    phase rotating each call. Anything at least `row_step` rows tall (a line
+    of text, a caret) is seen at once, a single-row change within `row_step`
+    frames, and the check reads 1/`row_step` of the frame.
+
+    Holds a reference to the last changed frame rather than a copy, so the
+    source must hand out a fresh buffer per grab (mss does).
+    """
+
+    def __init__(self, row_step: int = 8):
+        self.row_step = row_step
+        self._last = None
+        self._phase = 0
+
+    def reset(self):
+        self._last = None
+
+    def changed(self, frame) -> bool:
+        last = self._last
+        if last is None or last.shape != frame.shape:
+            changed = True
+        else:
+            self._phase = (self._phase + 1) % self.row_step
+            rows = slice(self._phase, None, self.row_step)
+            changed = not np.array_equal(frame[rows], last[rows])
+        if changed:
+            self._last = frame
+        return changed
+
+
+def _cv2_writer(path: str, fps: float, size: tuple):
+    fourcc = cv2.VideoWriter_fourcc(*"mp4v")
+    return cv2.VideoWriter(path, fourcc, fps, size)
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Pipeline
+DROP_OLDEST, DROP_NEWEST, BLOCK = "drop_oldest", "drop_newest", "block"
+
+
+class ScreenRecorder:
+    """
+    Three-stage screen recorder: capture → colour conversion → encode, each
+    on its own thread, joined by bounded queues.
+
+    - The capture thread is paced by timestamps, not by sleeping a fixed
+      interval after each frame, and stamps every frame with its grab time.
+    - When the capture → convert queue is full, `drop_policy` decides:
+      DROP_OLDEST (default: keep the freshest picture), DROP_NEWEST, or BLOCK.
+    - Conversion writes into a fixed pool of preallocated BGR buffers.
+    - The encoder maps each frame's timestamp onto the output frame grid: a
+      missing slot repeats the previous frame, a frame that arrives for an
+      already-filled slot is dropped. The file therefore plays back at
+      wall-clock speed even when the machine can't keep up.
+    - With `dedupe`, a ChangeDetector in the convert stage skips frames that
+      look like the previous one; the encoder's gap filling repeats the last
+      picture for them, so an idle desktop costs neither a conversion nor
+      new encoder input.
+    - `scale` < 1 downsizes the output (area-averaged before conversion,
+      so the colour conversion also runs on the smaller frame).
+
+    Besides frame counts, stats carry per-stage CPU seconds and the output
+    size, normalised per recorded minute (`cpu_per_minute`, `bytes_per_minute`).
+    """
+
+    def __init__(self, source, fps: float = 15, queue_size: int = 8, drop_policy: str = DROP_OLDEST,
+                 writer_factory=_cv2_writer, scale: float = 1.0, dedupe: bool = True):
+        if drop_policy not in (DROP_OLDEST, DROP_NEWEST, BLOCK):
+            raise ValueError(f"Unknown drop policy: {drop_policy}")
+        self.source = source
+        self.fps = fps
+        self.queue_size = queue_size
+        self.drop_policy = drop_policy
+        self.writer_factory = writer_factory
+        if not 0 < scale <= 1:
+            raise ValueError(f"scale must be in (0, 1], got {scale}")
+        self.scale = scale
+        self.dedupe = dedupe
+        self.stats = {}
+        self._stop = Event()
+
+    def stop(self):
+        """Ends a running `record()` early; the file is still finalized."""
+        self._stop.set()
+
+    def record(self, duration: float, output_file: str) -> dict:
+        """
+        Records `duration` seconds into `output_file`; returns the stats dict.
+        If any stage raises, the other stages stop and the error is re-raised here.
+        """
+        w, h = self.source.size
+        out_w, out_h = w, h
+        if self.scale < 1:
+            out_w = max(2, int(w * self.scale) // 2 * 2)
+            out_h = max(2, int(h * self.scale) // 2 * 2)
+        raw_q = Queue(self.queue_size)
+        bgr_q = Queue(self.queue_size)
+        pool = Queue()
+        for _ in range(2 * self.queue_size + 2):
+            pool.put(np.empty((out_h, out_w, 3), dtype=np.uint8))
+
+        stop = self._stop
+        stop.clear()
+        stats = {
+            "captured": 0, "dropped_queue": 0, "converted": 0,
+            "written": 0, "duplicated": 0, "dropped_late": 0, "unchanged": 0,
+            "max_queue_depth": 0, "queue_depth_sum": 0,
+            "cpu_capture": 0.0, "cpu_convert": 0.0, "cpu_encode": 0.0,
+        }
+        interval = 1.0 / self.fps
+        total_slots = int(round(duration * self.fps))
+        t0 = time.perf_counter()
+        end_time = t0 + duration
+        done = object()
+        errors = []
+        failed = Event()  # a stage raised: the others stop instead of waiting on it
+
+        def put(q: Queue, item) -> bool:
+            while not failed.is_set():
+                try:
+                    q.put(item, timeout=0.1)
+                    return True
+                except Full:
+                    pass
+            return False
+
+        def get(q: Queue):
+            while not failed.is_set():
+                try:
+                    return q.get(timeout=0.1)
+                except Empty:
+                    pass
+            return done
+
+        def guarded(stage):
+            def run():
+                try:
+                    stage()
+                except BaseException as e:
+                    errors.append(e)
+                    stop.set()
+                    failed.set()
+            return run
+
+        def capture():
+            cpu0 = time.thread_time()
+            self.source.open()
+            try:
+                next_t = t0
+                while not stop.is_set():
+                    now = time.perf_counter()
+                    if now >= end_time:
+                        break
+                    if now < next_t:
+                        time.sleep(next_t - now)
+                    ts = time.perf_counter()
+                    if ts >= end_time:
+                        break
+                    frame = self.source.grab()
+                    stats["captured"] += 1
+                    depth = raw_q.qsize()
+                    stats["max_queue_depth"] = max(stats["max_queue_depth"], depth)
+                    stats["queue_depth_sum"] += depth
+                    self._enqueue(raw_q, (ts, frame), stats, put)
+                    # Next slot on the grid; if we're behind, grab again immediately
+                    next_t = max(next_t + interval, time.perf_counter() - interval)
+            finally:
+                self.source.close()
+                put(raw_q, done)
+                stats["cpu_capture"] = time.thread_time() - cpu0
+
+        def convert():
+            cpu0 = time.thread_time()
+            detector = ChangeDetector() if self.dedupe else None
+            small = np.empty((out_h, out_w, 4), dtype=np.uint8) if (out_w, out_h) != (w, h) else None
+            while (item := get(raw_q)) is not done:
+                ts, bgra = item
+                if detector is not None and not detector.changed(bgra):
+                    stats["unchanged"] += 1  # the encoder repeats the previous picture for this slot
+                    continue
+                if small is not None:
+                    cv2.resize(bgra, (out_w, out_h), dst=small, interpolation=cv2.INTER_AREA)
+                    bgra = small
+                if (buf := get(pool)) is done:
+                    break
+                cv2.cvtColor(bgra, cv2.COLOR_BGRA2BGR, dst=buf)
+                stats["converted"] += 1
+                put(bgr_q, (ts, buf))
+            put(bgr_q, done)
+            stats["cpu_convert"] = time.thread_time() - cpu0
+
+        def encode():
+            cpu0 = time.thread_time()
+            writer = last = None
+            try:
+                writer = self.writer_factory(output_file, self.fps, (out_w, out_h))
+                while (item := get(bgr_q)) is not done:
+                    ts, buf = item
+                    slot = int((ts - t0) * self.fps)
+                    if slot < stats["written"] or slot >= total_slots:
+                        stats["dropped_late"] += 1      # that slot is already on disk
+                        pool.put(buf)
+                        continue
+                    while stats["written"] < slot:
+                        writer.write(buf if last is None else last)  # fill the gap: repeat the previous picture
+                        stats["written"] += 1
+                        stats["duplicated"] += 1
+                    writer.write(buf)
+                    stats["written"] += 1
+                    if last is not None:
+                        pool.put(last)
+                    last = buf
+                # Pad so the file is exactly as long as the recording ran
+                total = min(total_slots, int(round((time.perf_counter() - t0) * self.fps)))
+                while last is not None and stats["written"] < total:
+                    writer.write(last)
+                    stats["written"] += 1
+                    stats["duplicated"] += 1
+            finally:
+                if writer is not None:
+                    writer.release()
+                stats["cpu_encode"] = time.thread_time() - cpu0
+
+        threads = [
+            Thread(target=guarded(capture), name="jarvis-rec-capture", daemon=True),
+            Thread(target=guarded(convert), name="jarvis-rec-convert", daemon=True),
+            Thread(target=guarded(encode), name="jarvis-rec-encode", daemon=True),
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        if errors:
+            self.stats = stats
+            raise errors[0]
+
+        elapsed = time.perf_counter() - t0
+        stats["elapsed"] = elapsed
+        stats["capture_fps"] = stats["captured"] / duration if duration else 0.0
+        stats["unique_fps"] = (stats["written"] - stats["duplicated"]) / duration if duration else 0.0
+        stats["dropped"] = stats["dropped_queue"] + stats["dropped_late"]
+        stats["avg_queue_depth"] = stats["queue_depth_sum"] / stats["captured"] if stats["captured"] else 0.0
+        del stats["queue_depth_sum"]
+        stats["size"] = (out_w, out_h)
+        stats["cpu_seconds"] = stats["cpu_capture"] + stats["cpu_convert"] + stats["cpu_encode"]
+        stats["bytes_written"] = os.path.getsize(output_file) if os.path.exists(output_file) else 0
+        minutes = stats["written"] / self.fps / 60 if stats["written"] else 0.0
+        stats["cpu_per_minute"] = stats["cpu_seconds"] / minutes if minutes else 0.0
+        stats["bytes_per_minute"] = stats["bytes_written"] / minutes if minutes else 0.0
+        self.stats = stats
+        return stats
+
+    def _enqueue(self, q: Queue, item, stats, put=None):
+        if self.drop_policy == BLOCK:
+            if put is None:
+                q.put(item)
+            else:
+                put(q, item)  # the pipeline's put, which gives up once a stage has failed
+            return
+        try:
+            q.put_nowait(item)
+        except Full:
+            stats["dropped_queue"] += 1
+            if self.drop_policy == DROP_NEWEST:
+                return
+            try:
+                q.get_nowait()  # DROP_OLDEST: make room for the fresh frame
+            except Empty:
+                pass
+            try:
+                q.put_nowait(item)
+            except Full:
+                pass
@@ -0,0 +1,270 @@
+# jarvis_router.py
+
+import asyncio
+import functools
+import inspect
+import re
+
+from jarvis_trace import span
+
+
+async def run_blocking(fn, *args, executor=None, **kwargs):
+    """
+    Runs `fn` on `executor` (default: the loop's) and returns its result.
+    A thread can't be stopped, so if the awaiting task is cancelled this
+    still waits for `fn` to return before re-raising CancelledError: a
+    caller holding a lock keeps it until the work has really finished.
+    """
+    fut = asyncio.get_running_loop().run_in_executor(executor, functools.partial(fn, *args, **kwargs))
+    try:
+        return await asyncio.shield(fut)
+    except asyncio.CancelledError:
+        while not fut.done():
+            try:
+                await asyncio.wait([fut])
+            except asyncio.CancelledError:
+                pass
+        raise
+
+
+class Command:
+    """One built-in command: a handler plus the patterns/keywords that trigger it."""
+
+    __slots__ = ("name", "handler", "patterns", "keywords", "priority", "is_async", "_compiled")
+
+    def __init__(self, name, handler, patterns=(), keywords=(), priority=0):
+        self.name = name
+        self.handler = handler
+        self.is_async = inspect.iscoroutinefunction(handler)
+        self.patterns = tuple(patterns)
+        self.keywords = tuple(k.lower() for k in keywords)
+        self.priority = priority
+        self._compiled = tuple(re.compile(p) for p in self.patterns)
+
+    def __repr__(self):
+        return f"Command({self.name!r})"
+
+
+class _KeywordIndex:
+    """
+    Aho-Corasick automaton over all command keywords.
+    One pass over the utterance reports every (start, end, command) hit.
+    """
+
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+
+    def add(self, keyword: str, command: Command):
+        node = 0
+        for ch in keyword:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append((len(keyword), command))
+
+    def build(self):
+        queue = list(self._goto[0].values())
+        head = 0
+        while head < len(queue):
+            node = queue[head]
+            head += 1
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                cand = self._goto[f].get(ch, 0)
+                self._fail[nxt] = cand if cand != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def search(self, text: str):
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                for length, command in out[node]:
+                    yield i + 1 - length, i + 1, command
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+class CommandRouter:
+    """
+    Declarative command registry.
+
+    Each command declares its regex patterns (anchored at the start of the
+    utterance, like `re.match`) and/or keywords (whole-word substring hits)
+    once. `compile()` folds every pattern into a single alternation regex and
+    every keyword into one Aho-Corasick index, so `match()` costs one regex
+    attempt plus one pass over the utterance, regardless of command count.
+
+    Resolution rules:
+      • Keyword hits must sit on word boundaries ("mute" never fires inside "unmute").
+      • A keyword hit nested inside a longer hit is dropped
+        ("restart" inside "cancel restart").
+      • Remaining candidates are ranked by declaration order (priority).
+
+    When nothing matches, `fallback` (if set) may still name a command:
+    it gets the utterance and returns a command name or None.
+    """
+
+    def __init__(self):
+        self._commands: list[Command] = []
+        self._by_name: dict[str, Command] = {}
+        self._regex = None
+        self._keywords = None
+        self.fallback = None
+
+    # ── Registration ─────────────────────────────────────────────────────────
+    def register(self, name: str, handler, patterns=(), keywords=()) -> Command:
+        if name in self._by_name:
+            raise ValueError(f"Command {name!r} is already registered")
+        command = Command(name, handler, patterns, keywords, priority=len(self._commands))
+        self._commands.append(command)
+        self._by_name[name] = command
+        self._regex = self._keywords = None  # force recompile
+        return command
+
+    def command(self, name: str, patterns=(), keywords=()):
+        """Decorator form of `register`."""
+        def decorator(fn):
+            self.register(name, fn, patterns=patterns, keywords=keywords)
+            return fn
+        return decorator
+
+    @property
+    def commands(self) -> list:
+        return list(self._commands)
+
+    def get(self, name: str) -> Command | None:
+        return self._by_name.get(name)
+
+    # ── Compilation ──────────────────────────────────────────────────────────
+    def compile(self):
+        alternatives = []
+        self._group_owner = {}
+        for command in self._commands:
+            for j, pattern in enumerate(command.patterns):
+                group = f"_c{command.priority}_{j}"
+                self._group_owner[group] = (command, command._compiled[j])
+                alternatives.append(f"(?P<{group}>{pattern})")
+        self._regex = re.compile("|".join(alternatives)) if alternatives else None
+
+        index = _KeywordIndex()
+        for command in self._commands:
+            for kw in command.keywords:
+                index.add(kw, command)
+        index.build()
+        self._keywords = index
+
+    # ── Matching ─────────────────────────────────────────────────────────────
+    def match(self, text: str):
+        """
+        Returns (command, re.Match | None) for the winning command, or None.
+        The match object comes from the command's own pattern so group numbers
+        are exactly as declared.
+        """
+        if self._keywords is None:
+            self.compile()
+
+        best = None
+        best_match = None
+
+        if self._regex is not None:
+            m = self._regex.match(text)
+            if m:
+                # Python alternation returns the left-most (highest priority) alternative
+                best, pattern = self._group_owner[m.lastgroup]
+                best_match = pattern.match(text)
+
+        hits = []
+        n = len(text)
+        for start, end, command in self._keywords.search(text):
+            if start > 0 and _is_word_char(text[start - 1]):
+                continue
+            if end < n and _is_word_char(text[end]):
+                continue
+            hits.append((start, end, command))
+
+        if hits:
+            for start, end, command in hits:
+                nested = any(
+                    s <= start and end <= e and (e - s) > (end - start)
+                    for s, e, _ in hits
+                )
+                if nested:
+                    continue
+                if best is None or command.priority < best.priority:
+                    best, best_match = command, None
+
+        if best is None:
+            return None
+        return best, best_match
+
+    def resolve(self, text: str):
+        """`match`, then the fallback; (command, re.Match | None) or None."""
+        found = self.match(text)
+        if found is None and self.fallback is not None:
+            command = self._by_name.get(self.fallback(text) or "")
+            if command is not None:
+                found = command, None
+        return found
+
+    async def resolve_async(self, text: str, executor=None):
+        """`resolve` for an event loop: the fallback (a classifier, possibly still loading) runs on `executor`."""
+        found = self.match(text)
+        if found is None and self.fallback is not None:
+            name = await run_blocking(self.fallback, text, executor=executor)
+            command = self._by_name.get(name or "")
+            if command is not None:
+                found = command, None
+        return found
+
+    def dispatch(self, text: str) -> bool:
+        """
+        Runs the winning handler. Returns True if a command handled `text`.
+        Async handlers run to completion on a fresh event loop, so this must
+        not be called from inside one (use `dispatch_async` there).
+        """
+        with span("dispatch"):
+            found = self.resolve(text)
+        if found is None:
+            return False
+        command, m = found
+        with span(f"handler.{command.name}"):
+            result = command.handler(text, m)
+            if inspect.isawaitable(result):
+                result = asyncio.run(result)
+        return True if result is None else bool(result)
+
+    async def dispatch_async(self, text: str, executor=None) -> bool:
+        """
+        `dispatch` for an event loop: async handlers are awaited directly,
+        plain ones (and the fallback) run on `executor` (default: the loop's)
+        so a slow handler never blocks the loop.
+        """
+        with span("dispatch"):
+            found = await self.resolve_async(text, executor)
+        if found is None:
+            return False
+        command, m = found
+        with span(f"handler.{command.name}"):
+            if command.is_async:
+                result = await command.handler(text, m)
+            else:
+                result = await run_blocking(command.handler, text, m, executor=executor)
+                if inspect.isawaitable(result):
+                    result = await result
+        return True if result is None else bool(result)
@@ -0,0 +1,131 @@
+# jarvis_stt.py
+
+import json
+import os
+
+
+class STTError(RuntimeError):
+    """The speech engine failed (network error, missing model, ...), as opposed to hearing nothing."""
+
+
+class STTBackend:
+    """
+    Speech-to-text engine interface.
+
+    One utterance at a time: `start()`, then `accept()` raw 16-bit mono PCM
+    as it is captured (streaming engines decode right away and may return a
+    partial hypothesis), then `finish()` for the final text ("" if nothing
+    was recognized). `transcribe()` does all three for a finished recording.
+    """
+
+    name = "base"
+    streaming = False  # True → accept() decodes incrementally, finish() is fast
+
+    def start(self, sample_rate: int):
+        raise NotImplementedError
+
+    def accept(self, pcm) -> str | None:
+        """Feed audio; returns the current partial hypothesis if the engine has one."""
+        raise NotImplementedError
+
+    def finish(self) -> str:
+        raise NotImplementedError
+
+    def transcribe(self, pcm, sample_rate: int) -> str:
+        self.start(sample_rate)
+        self.accept(pcm)
+        return self.finish()
+
+
+class GoogleBackend(STTBackend):
+    """The original path: buffer the utterance, then one round-trip to Google's web API."""
+
+    name = "google"
+
+    def __init__(self, recognizer=None):
+        import speech_recognition as sr
+        self._sr = sr
+        self._recognizer = recognizer or sr.Recognizer()
+        self._chunks = []
+        self._rate = 16000
+
+    def start(self, sample_rate: int):
+        self._rate = sample_rate
+        self._chunks = []
+
+    def accept(self, pcm) -> str | None:
+        self._chunks.append(bytes(pcm))
+        return None
+
+    def finish(self) -> str:
+        audio = self._sr.AudioData(b"".join(self._chunks), self._rate, 2)
+        self._chunks = []
+        try:
+            return self._recognizer.recognize_google(audio)
+        except self._sr.UnknownValueError:
+            return ""
+        except self._sr.RequestError as e:
+            raise STTError(str(e)) from e
+
+
+class VoskBackend(STTBackend):
+    """
+    Offline streaming recognition with Vosk (Kaldi). Audio is decoded while
+    it arrives, so `finish()` only has to flush the last few hundred ms.
+    Needs `pip install vosk` and a model directory in JARVIS_VOSK_MODEL
+    (e.g. vosk-model-small-en-us-0.15).
+    """
+
+    name = "vosk"
+    streaming = True
+
+    def __init__(self, model_path: str | None = None):
+        try:
+            import vosk
+        except ImportError as e:
+            raise STTError("The vosk backend needs `pip install vosk`") from e
+        model_path = model_path or os.getenv("JARVIS_VOSK_MODEL", "").strip()
+        if not model_path or not os.path.isdir(model_path):
+            raise STTError(f"JARVIS_VOSK_MODEL must point to a Vosk model directory (got {model_path!r})")
+        vosk.SetLogLevel(-1)
+        self._vosk = vosk
+        self._model = vosk.Model(model_path)
+        self._rec = None
+        self._parts = []
+
+    def start(self, sample_rate: int):
+        self._rec = self._vosk.KaldiRecognizer(self._model, sample_rate)
+        self._parts = []
+
+    def accept(self, pcm) -> str | None:
+        if self._rec.AcceptWaveform(bytes(pcm)):
+            # Vosk closed a segment at an internal pause; keep it and start a new partial
+            text = json.loads(self._rec.Result()).get("text", "")
+            if text:
+                self._parts.append(text)
+            return " ".join(self._parts) or None
+        partial = json.loads(self._rec.PartialResult()).get("partial", "")
+        return " ".join(self._parts + [partial]).strip() or None
+
+    def finish(self) -> str:
+        text = json.loads(self._rec.FinalResult()).get("text", "")
+        if text:
+            self._parts.append(text)
+        result, self._parts = " ".join(self._parts), []
+        return result
+
+
+BACKENDS = {
+    GoogleBackend.name: GoogleBackend,
+    VoskBackend.name: VoskBackend,
+}
+
+
+def get_backend(name: str | None = None, **kwargs) -> STTBackend:
+    """Builds the backend named by `name` or JARVIS_STT (default: google)."""
+    name = (name or os.getenv("JARVIS_STT") or "google").strip().lower()
+    try:
+        cls = BACKENDS[name]
+    except KeyError:
+        raise STTError(f"Unknown STT backend {name!r}; choose from {', '.join(BACKENDS)}") from None
+    return cls(**kwargs)
@@ -0,0 +1,290 @@
+# jarvis_sysmon.py
+
+import math
+import os
+import time
+from collections import namedtuple
+from threading import Event, Lock, Thread
+
+import numpy as np
+
+Proc = namedtuple("Proc", "pid name cpu rss")  # cpu is None until the process has been seen twice
+
+# Windows' idle "process" (pid 0) reports idle time as its CPU share; it would top every busiest list.
+IDLE_NAMES = {"system idle process", "idle"}
+
+
+def _is_idle(proc: Proc) -> bool:
+    return proc.pid == 0 or proc.name.lower() in IDLE_NAMES
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Sources
+class PsutilSource:
+    """
+    System metrics from psutil. cpu_percent(interval=None) reports the load
+    since the previous call, which is meaningful only because the sampler is
+    its one regular caller. psutil keeps that previous reading per thread,
+    so `prime()` must run on the sampling thread.
+    """
+
+    def __init__(self):
+        import psutil
+        self.psutil = psutil
+        self.cores = psutil.cpu_count() or 1
+        self._seen = set()  # Process objects whose cpu_percent() has a previous reading
+
+    def prime(self):
+        """Takes the readings the first sample is measured against."""
+        self.psutil.cpu_percent(percpu=True)
+        self.processes()
+
+    def sample(self) -> dict:
+        ps = self.psutil
+        cores = ps.cpu_percent(percpu=True)
+        mem = ps.virtual_memory()
+        battery = ps.sensors_battery() if hasattr(ps, "sensors_battery") else None
+        return {"cores": cores, "memory": mem.percent, "memory_used": mem.used, "memory_total": mem.total,
+                "battery": battery.percent if battery else None,
+                "plugged": battery.power_plugged if battery else None}
+
+    def processes(self) -> list:
+        """
+        Running processes with their CPU share (of the whole machine) since
+        the previous call. A process seen for the first time only primes its
+        counter, so its cpu is None rather than a meaningless 0.
+        """
+        procs, seen = [], set()
+        for p in self.psutil.process_iter(["name", "memory_info"]):  # psutil reuses Process objects,
+            try:                                                     # so cpu_percent() is a delta
+                cpu = p.cpu_percent() / self.cores
+                rss = p.info["memory_info"].rss if p.info["memory_info"] else 0
+            except self.psutil.Error:
+                continue
+            seen.add(p)  # hashed by (pid, create time), so a reused pid starts over
+            procs.append(Proc(p.pid, p.info["name"] or "", cpu if p in self._seen else None, rss))
+        self._seen = seen
+        return procs
+
+
+class FakeSource:
+    """
+    Scripted metrics for tests and benchmarks. Each of cpu, memory, battery
+    and processes is a constant or a callable of the sample number; `cpu`
+    gives the per-core list (or one number for every core).
+    """
+
+    def __init__(self, cores: int = 4, cpu=10.0, memory=50.0, battery=None, plugged=None, processes=(),
+                 memory_total: int = 16 * 2**30):
+        self.cores = cores
+        self.cpu, self.memory, self.battery, self.plugged, self._processes = cpu, memory, battery, plugged, processes
+        self.memory_total = memory_total
+        self.n = 0
+
+    def prime(self):
+        pass
+
+    def _value(self, spec):
+        return spec(self.n) if callable(spec) else spec
+
+    def sample(self) -> dict:
+        cpu = self._value(self.cpu)
+        cores = list(cpu) if isinstance(cpu, (list, tuple, np.ndarray)) else [cpu] * self.cores
+        memory = self._value(self.memory)
+        self.n += 1
+        return {"cores": cores, "memory": memory, "memory_used": int(memory / 100 * self.memory_total),
+                "memory_total": self.memory_total, "battery": self._value(self.battery),
+                "plugged": self._value(self.plugged)}
+
+    def processes(self) -> list:
+        return list(self._value(self._processes))
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Ring buffers
+class Ring:
+    """
+    The last `capacity` rows of `width` floats. Appends are O(1), and so is
+    the mean of the last k rows: each slot also stores the running total up
+    to it, so a window mean is one subtraction.
+    """
+
+    def __init__(self, capacity: int, width: int = 1):
+        self.capacity = capacity
+        size = capacity + 1  # one spare slot holds the total just before the oldest row
+        self.values = np.zeros((size, width))
+        self.totals = np.zeros((size, width))
+        self.times = np.zeros(size)
+        self.count = 0
+        self._total = np.zeros(width)
+
+    def append(self, t: float, row):
+        i = self.count % len(self.values)
+        self.values[i] = row
+        self._total = self._total + self.values[i]
+        self.totals[i] = self._total
+        self.times[i] = t
+        self.count += 1
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def last(self) -> np.ndarray | None:
+        return self.values[(self.count - 1) % len(self.values)].copy() if self.count else None
+
+    def mean(self, k: int) -> np.ndarray | None:
+        """Mean of the last `k` rows (fewer if fewer were kept)."""
+        k = min(k, len(self))
+        if k <= 0:
+            return None
+        size = len(self.values)
+        end = self.totals[(self.count - 1) % size]
+        start = self.totals[(self.count - 1 - k) % size] if self.count > k else 0.0
+        return (end - start) / k
+
+    def window(self, k: int) -> np.ndarray:
+        """The last `k` rows, oldest first (a copy)."""
+        k = min(k, len(self))
+        idx = np.arange(self.count - k, self.count) % len(self.values)
+        return self.values[idx]
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Sampler
+class SystemMonitor:
+    """
+    Polls a metrics source every `interval` seconds into ring buffers holding
+    `history` seconds, and the process list every `proc_interval` seconds.
+    Queries read the buffers, so they never wait on (or skew) the OS counters.
+
+        mon = SystemMonitor().start()
+        mon.cpu()            # latest total CPU %
+        mon.cpu(window=60)   # mean over the last minute
+        mon.per_core(60)     # per-core means
+        mon.top_processes(3, by="memory")
+    """
+
+    def __init__(self, source=None, interval: float = 1.0, history: float = 600.0, proc_interval: float = 5.0,
+                 top_n: int = 20):
+        self.source = source if source is not None else PsutilSource()
+        self.interval = interval
+        self.proc_interval = proc_interval
+        self.top_n = top_n
+        capacity = max(2, int(math.ceil(history / interval)))
+        self._cpu = Ring(capacity, 1 + self.source.cores)  # total, then each core
+        self._memory = Ring(capacity, 2)                    # percent, bytes used
+        self.memory_total = None
+        self._battery = None                                # (percent, plugged) or None
+        self._by_cpu = []
+        self._by_memory = []
+        self._last_procs = None
+        self._lock = Lock()
+        self._stop = Event()
+        self._thread = None
+        self.ready = Event()                                # set after the first sample (one interval in)
+        self.samples = 0
+        self.sample_seconds = 0.0                           # time spent sampling (the sampler's overhead)
+
+    # -- sampling ------------------------------------------------------------
+    def sample_once(self, now: float | None = None):
+        now = time.monotonic() if now is None else now
+        t0 = time.perf_counter()
+        s = self.source.sample()
+        cores = np.asarray(s["cores"], dtype=float)
+        procs = None
+        if self._last_procs is None or now - self._last_procs >= self.proc_interval:
+            procs = [p for p in self.source.processes() if not _is_idle(p)]
+        with self._lock:
+            self._cpu.append(now, np.concatenate(([cores.mean() if cores.size else 0.0], cores)))
+            self._memory.append(now, (s["memory"], s.get("memory_used") or 0))
+            self.memory_total = s.get("memory_total")
+            self._battery = (s["battery"], s.get("plugged")) if s.get("battery") is not None else None
+            if procs is not None:
+                measured = [p for p in procs if p.cpu is not None]
+                self._by_cpu = sorted(measured, key=lambda p: p.cpu, reverse=True)[:self.top_n]
+                self._by_memory = sorted(procs, key=lambda p: p.rss, reverse=True)[:self.top_n]
+                self._last_procs = now
+            self.samples += 1
+            self.sample_seconds += time.perf_counter() - t0
+        self.ready.set()
+
+    def start(self) -> "SystemMonitor":
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = Thread(target=self._run, name="jarvis-sysmon", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def _run(self):
+        # Sleep to absolute ticks so the interval doesn't drift by the sampling time. The first
+        # sample waits an interval after priming: a reading taken right away would cover
+        # microseconds and report 0% CPU.
+        try:
+            self.source.prime()
+        except Exception as e:
+            print(f"[Sysmon] prime failed: {e}")
+        next_tick = time.monotonic() + self.interval
+        while not self._stop.wait(max(0.0, next_tick - time.monotonic())):
+            try:
+                self.sample_once()
+            except Exception as e:
+                print(f"[Sysmon] sample failed: {e}")
+            next_tick += self.interval
+
+    # -- queries -------------------------------------------------------------
+    def _samples_in(self, window: float | None) -> int:
+        return 1 if not window else max(1, int(round(window / self.interval)))
+
+    def cpu(self, window: float | None = None) -> float | None:
+        """Total CPU % (average of the cores): the latest sample, or the mean over `window` seconds."""
+        with self._lock:
+            row = self._cpu.mean(self._samples_in(window))
+        return None if row is None else float(row[0])
+
+    def per_core(self, window: float | None = None) -> list | None:
+        with self._lock:
+            row = self._cpu.mean(self._samples_in(window))
+        return None if row is None else [float(v) for v in row[1:]]
+
+    def cpu_peak(self, window: float) -> float | None:
+        with self._lock:
+            rows = self._cpu.window(self._samples_in(window))
+        return float(rows[:, 0].max()) if len(rows) else None
+
+    def memory(self, window: float | None = None) -> float | None:
+        """RAM in use, %."""
+        with self._lock:
+            row = self._memory.mean(self._samples_in(window))
+        return None if row is None else float(row[0])
+
+    def memory_used(self) -> int | None:
+        with self._lock:
+            row = self._memory.last()
+        return None if row is None else int(row[1])
+
+    def battery(self) -> tuple | None:
+        """(percent, plugged in) from the latest sample; None without a battery."""
+        return self._battery
+
+    def top_processes(self, n: int = 5, by: str = "cpu") -> list:
+        """The busiest processes at the last process sample (by "cpu" or "memory")."""
+        with self._lock:
+            return list((self._by_cpu if by == "cpu" else self._by_memory)[:n])
+
+    def covered(self) -> float:
+        """Seconds of history currently in the buffers."""
+        return len(self._cpu) * self.interval
+
+    def stats(self) -> dict:
+        return {"samples": self.samples, "interval": self.interval, "history_seconds": self.covered(),
+                "mean_sample_ms": self.sample_seconds / self.samples * 1e3 if self.samples else None,
+                "overhead_percent": self.sample_seconds / self.samples / self.interval * 100 if self.samples else None}
+
+
+def from_env(source=None) -> SystemMonitor:
+    """A monitor configured by JARVIS_SYSMON_INTERVAL (s, default 1) and JARVIS_SYSMON_HISTORY (s, default 600)."""
+    return SystemMonitor(source, interval=float(os.getenv("JARVIS_SYSMON_INTERVAL", "1")),
+                         history=float(os.getenv("JARVIS_SYSMON_HISTORY", "600")))
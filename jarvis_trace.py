@@ -0,0 +1,316 @@
+# jarvis_trace.py
+
+import atexit
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from collections import deque
+from threading import Event, Lock, Thread
+
+# Histogram upper bounds in seconds (Prometheus `le` labels); +Inf is implicit.
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+RECENT_SAMPLES = 1024   # per histogram, for exact percentiles
+RECENT_SPANS = 256      # timeline kept for the JSON dump
+DEFAULT_DIR = os.path.join(os.path.expanduser("~"), ".jarvis", "trace")
+
+_T0 = time.perf_counter()
+_enabled = False
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Histograms
+class Histogram:
+    """Latency samples for one stage: cumulative buckets plus the most recent raw values."""
+
+    __slots__ = ("name", "count", "total", "buckets", "recent", "_lock")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.count = 0
+        self.total = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.recent = deque(maxlen=RECENT_SAMPLES)
+        self._lock = Lock()
+
+    def observe(self, seconds: float):
+        i = 0
+        while i < len(BUCKETS) and seconds > BUCKETS[i]:
+            i += 1
+        with self._lock:
+            self.count += 1
+            self.total += seconds
+            self.buckets[i] += 1
+            self.recent.append(seconds)
+
+    def percentiles(self, qs=(50, 95, 99)) -> dict:
+        with self._lock:
+            values = sorted(self.recent)
+        if not values:
+            return {f"p{q}": None for q in qs}
+        return {f"p{q}": values[min(len(values) - 1, round(q / 100 * (len(values) - 1)))] for q in qs}
+
+    def summary(self) -> dict:
+        with self._lock:
+            count, total, mx = self.count, self.total, max(self.recent, default=None)
+        return {"count": count, "sum": total, "mean": total / count if count else None,
+                **self.percentiles(), "max_recent": mx}
+
+
+_histograms: dict[str, Histogram] = {}
+_histograms_lock = Lock()
+_spans = deque(maxlen=RECENT_SPANS)  # (name, start s since import, duration, thread name)
+_armed = {}                          # event → [(histogram name, start)]
+_armed_lock = Lock()
+
+
+def histogram(name: str) -> Histogram:
+    h = _histograms.get(name)
+    if h is None:
+        with _histograms_lock:
+            h = _histograms.setdefault(name, Histogram(name))
+    return h
+
+
+def record(name: str, seconds: float):
+    """Adds one latency sample to `name` (no-op while tracing is off)."""
+    if _enabled:
+        histogram(name).observe(seconds)
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Spans
+class _Span:
+    __slots__ = ("name", "start", "timeline")
+
+    def __init__(self, name: str, timeline: bool = True):
+        self.name = name
+        self.timeline = timeline
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        histogram(self.name).observe(end - self.start)
+        if self.timeline:
+            _spans.append((self.name, self.start - _T0, end - self.start, threading.current_thread().name))
+        return False
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(name: str, timeline: bool = True):
+    """
+    `with span("stt"):` times the block into the "stt" histogram. While
+    tracing is off this returns a shared do-nothing context manager.
+    Per-frame stages pass `timeline=False`: they would otherwise fill the
+    recent-span timeline within seconds and push every other stage out.
+    """
+    return _Span(name, timeline) if _enabled else _NO_SPAN
+
+
+def traced(name: str | None = None):
+    """Decorator: every call of the function (sync or async) is a span named `name` (default: its qualname)."""
+    def decorator(fn):
+        label = name or fn.__qualname__
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                if not _enabled:
+                    return await fn(*args, **kwargs)
+                with _Span(label):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with _Span(label):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def arm(name: str, event: str, start: float | None = None):
+    """
+    Starts a measurement that ends at the next `fire(event)`, e.g. wake word
+    → first audio of the reply, whose end happens on another thread.
+    """
+    if _enabled:
+        with _armed_lock:
+            _armed.setdefault(event, []).append((name, time.perf_counter() if start is None else start))
+
+
+def fire(event: str, at: float | None = None):
+    """Completes every measurement armed for `event`."""
+    if not _armed:
+        return
+    at = time.perf_counter() if at is None else at
+    with _armed_lock:
+        pending = _armed.pop(event, ())
+    for name, start in pending:
+        record(name, at - start)
+
+
+def disarm(event: str):
+    """Drops measurements still waiting for `event` (e.g. a command that never spoke)."""
+    with _armed_lock:
+        _armed.pop(event, None)
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Gauges: current values (memory, counters) sampled at export time
+_gauge_sources = []
+
+
+def add_gauges(source):
+    """Registers `source() -> {name: number}`; its values go out with every snapshot and export."""
+    _gauge_sources.append(source)
+
+
+def gauges() -> dict:
+    values = {}
+    for source in _gauge_sources:
+        try:
+            values.update(source())
+        except Exception as e:
+            print(f"[Trace] gauge source {getattr(source, '__name__', source)} failed: {e}")
+    return dict(sorted(values.items()))
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Runtime switch
+_exporter = None
+_exporter_stop = Event()
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def enable(export_interval: float | None = None):
+    """
+    Turns tracing on. Unless `export_interval` (JARVIS_TRACE_EXPORT, default
+    60 s) is 0, the JSON and Prometheus files are rewritten that often.
+    """
+    global _enabled, _exporter
+    _enabled = True
+    if export_interval is None:
+        export_interval = float(os.getenv("JARVIS_TRACE_EXPORT", "60"))
+    if export_interval > 0 and _exporter is None:
+        _exporter_stop.clear()
+
+        def _loop():
+            while not _exporter_stop.wait(export_interval):
+                export()
+
+        _exporter = Thread(target=_loop, name="jarvis-trace-export", daemon=True)
+        _exporter.start()
+
+
+def disable():
+    """Turns tracing off; collected histograms are kept until `reset()`."""
+    global _enabled, _exporter
+    _enabled = False
+    _exporter_stop.set()
+    _exporter = None
+    with _armed_lock:
+        _armed.clear()
+
+
+def reset():
+    with _histograms_lock:
+        _histograms.clear()
+    _spans.clear()
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Export
+def snapshot() -> dict:
+    """Histogram summaries (seconds), gauges, and the recent span timeline."""
+    with _histograms_lock:
+        hists = dict(_histograms)
+    return {
+        "enabled": _enabled,
+        "uptime": time.perf_counter() - _T0,
+        "stages": {name: h.summary() for name, h in sorted(hists.items())},
+        "gauges": gauges(),
+        "recent_spans": [{"name": n, "start": s, "duration": d, "thread": t} for n, s, d, t in list(_spans)],
+    }
+
+
+def prometheus_text() -> str:
+    """Histograms and gauges in the Prometheus text exposition format (one metric each, labelled by name)."""
+    with _histograms_lock:
+        hists = dict(_histograms)
+    lines = ["# HELP jarvis_stage_seconds Latency of each voice-pipeline stage.",
+             "# TYPE jarvis_stage_seconds histogram"]
+    for name, h in sorted(hists.items()):
+        with h._lock:
+            counts, count, total = list(h.buckets), h.count, h.total
+        cumulative = 0
+        for bound, n in zip(BUCKETS + (float("inf"),), counts):
+            cumulative += n
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f'jarvis_stage_seconds_bucket{{stage="{name}",le="{le}"}} {cumulative}')
+        lines.append(f'jarvis_stage_seconds_sum{{stage="{name}"}} {total}')
+        lines.append(f'jarvis_stage_seconds_count{{stage="{name}"}} {count}')
+    values = gauges()
+    if values:
+        lines += ["# HELP jarvis_gauge Current value of a Jarvis resource or counter.",
+                  "# TYPE jarvis_gauge gauge"]
+        lines += [f'jarvis_gauge{{name="{name}"}} {value}' for name, value in values.items()]
+    return "\n".join(lines) + "\n"
+
+
+def export(folder: str | None = None) -> tuple[str, str]:
+    """
+    Writes trace.json and jarvis.prom (for node_exporter's textfile collector)
+    into `folder` (JARVIS_TRACE_DIR, default ~/.jarvis/trace); returns both paths.
+    """
+    folder = folder or (os.getenv("JARVIS_TRACE_DIR") or "").strip() or DEFAULT_DIR
+    os.makedirs(folder, exist_ok=True)
+    json_path = os.path.join(folder, "trace.json")
+    prom_path = os.path.join(folder, "jarvis.prom")
+    for path, text in ((json_path, json.dumps(snapshot(), indent=2)), (prom_path, prometheus_text())):
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, path)  # scrapers never see a half-written file
+    return json_path, prom_path
+
+
+def report() -> str:
+    """One line per stage: count and p50/p95/p99 in milliseconds; then the gauges."""
+    lines = ["[Trace] stage                          count     p50 ms    p95 ms    p99 ms"]
+    snap = snapshot()
+    for name, s in snap["stages"].items():
+        ms = [f"{s[k] * 1e3:9.1f}" if s[k] is not None else "        -" for k in ("p50", "p95", "p99")]
+        lines.append(f"  {name:<34}{s['count']:>6} {' '.join(ms)}")
+    for name, value in snap["gauges"].items():
+        lines.append(f"  {name:<34}{value:>16,.6g}")
+    return "\n".join(lines)
+
+
+@atexit.register
+def _export_at_exit():
+    if _enabled and _histograms:
+        try:
+            export()
+        except OSError:
+            pass
+
+
+if os.getenv("JARVIS_TRACE", "0").strip() not in ("", "0"):
+    enable()
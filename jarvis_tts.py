@@ -0,0 +1,321 @@
+# jarvis_tts.py
+
+import heapq
+import itertools
+import os
+import threading
+import time
+from threading import Condition, Event, Thread
+
+import numpy as np
+
+import jarvis_trace
+
+# Queue priorities: lower is spoken first, FIFO within a priority.
+HIGH, NORMAL, LOW = 0, 1, 2
+
+
+class TTSBackend:
+    """
+    Speech output engine. All calls come from the speech worker thread:
+    `open()` once before the first utterance, then `say()` per utterance.
+    `say()` plays `text` to the end and returns True, or stops early and
+    returns False as soon as `cancelled` (a threading.Event) is set.
+    `volume` (0-100) is set by the worker before each `say()`; a backend that
+    can tell sets `first_audio_at` (perf_counter) when sound actually starts.
+
+    Backends that can synthesize to memory implement `render()`, which
+    jarvis_phrases uses to pre-render fixed phrases. It may be called from
+    another thread than `say()`.
+    """
+
+    name = "base"
+    volume = 100
+    voice_id = "default"  # with `rate`, part of the phrase-cache key
+    rate = 0
+    first_audio_at = None
+
+    def open(self):
+        pass
+
+    def say(self, text: str, cancelled: Event) -> bool:
+        raise NotImplementedError
+
+    def render(self, text: str):
+        """Returns (int16 mono PCM ndarray, sample rate) for `text`."""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class SapiBackend(TTSBackend):
+    """Windows SAPI voice, spoken asynchronously so it can be purged mid-sentence."""
+
+    name = "sapi"
+
+    _SVSF_ASYNC = 1
+    _SVSF_PURGE_BEFORE_SPEAK = 2
+    _SRSE_IS_SPEAKING = 2
+    _SAFT_22KHZ_16BIT_MONO = 22
+    _POLL_MS = 30
+
+    def __init__(self, rate: int = 0, volume: int = 100):
+        self.rate = rate
+        self.volume = volume
+        self._voice = None
+        self._applied_volume = None
+        self._local = threading.local()  # per-thread render voices (COM apartments)
+
+    def open(self):
+        # COM objects belong to the thread that created them: initialise COM here, on the worker
+        import pythoncom
+        import win32com.client
+        pythoncom.CoInitialize()
+        self._voice = win32com.client.Dispatch("SAPI.SpVoice")
+        self._voice.Rate = self.rate
+        self.voice_id = self._voice.Voice.Id
+
+    def say(self, text: str, cancelled: Event) -> bool:
+        if self.volume != self._applied_volume:
+            self._voice.Volume = self._applied_volume = self.volume
+        self._voice.Speak(text, self._SVSF_ASYNC)
+        # Poll finely until audio starts (for first-audio latency), then coarsely
+        poll_ms = 1
+        while not self._voice.WaitUntilDone(poll_ms):
+            if cancelled.is_set():
+                self._voice.Speak("", self._SVSF_ASYNC | self._SVSF_PURGE_BEFORE_SPEAK)
+                return False
+            if self.first_audio_at is None and self._voice.Status.RunningState == self._SRSE_IS_SPEAKING:
+                self.first_audio_at = time.perf_counter()
+                poll_ms = self._POLL_MS
+        return True
+
+    def render(self, text: str):
+        # A private voice per calling thread, speaking into memory instead of the device
+        import pythoncom
+        import win32com.client
+        voice = getattr(self._local, "voice", None)
+        if voice is None:
+            pythoncom.CoInitialize()
+            voice = win32com.client.Dispatch("SAPI.SpVoice")
+            voice.Rate = self.rate
+            for token in voice.GetVoices():
+                if token.Id == self.voice_id:
+                    voice.Voice = token
+            self._local.voice = voice
+        stream = win32com.client.Dispatch("SAPI.SpMemoryStream")
+        stream.Format.Type = self._SAFT_22KHZ_16BIT_MONO
+        voice.AudioOutputStream = stream
+        voice.Speak(text)
+        return np.frombuffer(bytes(stream.GetData()), dtype=np.int16), 22050
+
+    def close(self):
+        self._voice = None
+        import pythoncom
+        pythoncom.CoUninitialize()
+
+
+class NullBackend(TTSBackend):
+    """
+    Silent backend for headless runs and tests: remembers what was said in
+    `spoken`. With `words_per_second` > 0 each utterance takes as long as
+    reading it aloud would, so cancellation and ordering can be exercised.
+    """
+
+    name = "null"
+
+    def __init__(self, words_per_second: float = 0.0):
+        self.words_per_second = words_per_second
+        self.spoken = []
+
+    def say(self, text: str, cancelled: Event) -> bool:
+        self.first_audio_at = time.perf_counter()
+        self.spoken.append(text)
+        if self.words_per_second > 0:
+            return not cancelled.wait(len(text.split()) / self.words_per_second)
+        return not cancelled.is_set()
+
+
+class FileBackend(NullBackend):
+    """Appends each utterance as `<unix time>\t<text>` to a log file (JARVIS_TTS_FILE)."""
+
+    name = "file"
+
+    def __init__(self, path: str | None = None, words_per_second: float = 0.0):
+        super().__init__(words_per_second)
+        self.path = path or os.getenv("JARVIS_TTS_FILE", "").strip() or "jarvis_speech.log"
+
+    def say(self, text: str, cancelled: Event) -> bool:
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(f"{time.time():.3f}\t{text}\n")
+        return super().say(text, cancelled)
+
+
+BACKENDS = {
+    SapiBackend.name: SapiBackend,
+    NullBackend.name: NullBackend,
+    FileBackend.name: FileBackend,
+}
+
+
+def get_backend(name: str | None = None, **kwargs) -> TTSBackend:
+    """Builds the backend named by `name` or JARVIS_TTS (default: sapi)."""
+    name = (name or os.getenv("JARVIS_TTS") or "sapi").strip().lower()
+    try:
+        cls = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown TTS backend {name!r}; choose from {', '.join(BACKENDS)}") from None
+    return cls(**kwargs)
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Speech worker
+
+
+class Utterance:
+    """Handle for one queued piece of speech."""
+
+    __slots__ = ("text", "priority", "queued_at", "started_at", "first_audio_at", "finished_at", "spoken",
+                 "_cancel", "_done")
+
+    def __init__(self, text: str, priority: int):
+        self.text = text
+        self.priority = priority
+        self.queued_at = time.perf_counter()
+        self.started_at = None  # perf_counter() when the backend started on it
+        self.first_audio_at = None  # perf_counter() of the first audible sample, if the backend knows
+        self.finished_at = None  # perf_counter() when it ended (played, cancelled or dropped)
+        self.spoken = None      # True: played to the end; False: cancelled/failed; None: pending
+        self._cancel = Event()
+        self._done = Event()
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """Blocks until the utterance finished or was dropped; True if it was spoken to the end."""
+        self._done.wait(timeout)
+        return bool(self.spoken)
+
+    def _finish(self, spoken: bool):
+        self.finished_at = time.perf_counter()
+        self.spoken = spoken
+        self._done.set()
+
+
+class SpeechWorker:
+    """
+    Plays utterances on a background thread, so `say()` returns at once.
+
+    Queued utterances are ordered by priority, then by arrival. `cancel()`
+    is the barge-in hook: it cuts off the utterance that is playing and, by
+    default, drops everything still queued. If the backend can't be opened
+    (no SAPI, say), the worker falls back to a NullBackend and keeps
+    printing instead of failing every call.
+    """
+
+    def __init__(self, backend: TTSBackend | None = None, volume: int = 100):
+        self.backend = backend
+        self.volume = volume  # 0-100, applied from the next utterance on
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = Condition()
+        self._current = None
+        self._closed = False
+        self._thread = None
+
+    def say(self, text: str, priority: int = NORMAL) -> Utterance:
+        utt = Utterance(text, priority)
+        with self._cond:
+            if self._closed:
+                utt._finish(False)
+                return utt
+            if self._thread is None:
+                self._thread = Thread(target=self._run, name="jarvis-tts", daemon=True)
+                self._thread.start()
+            heapq.heappush(self._heap, (priority, next(self._seq), utt))
+            self._cond.notify()
+        return utt
+
+    def cancel(self, flush: bool = True) -> int:
+        """Stops the current utterance; with `flush`, also drops the queue. Returns how many were dropped."""
+        with self._cond:
+            dropped = 0
+            if flush:
+                for _, _, utt in self._heap:
+                    utt._finish(False)
+                dropped = len(self._heap)
+                self._heap.clear()
+            if self._current is not None:
+                self._current._cancel.set()
+                dropped += 1
+        return dropped
+
+    @property
+    def busy(self) -> bool:
+        with self._cond:
+            return self._current is not None or bool(self._heap)
+
+    def wait_idle(self, timeout: float | None = None) -> bool:
+        """Blocks until nothing is playing or queued; False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._current is not None or self._heap:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout: float = 2.0):
+        """Drops pending speech and stops the worker thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self.cancel()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _open_backend(self):
+        if self.backend is None:
+            self.backend = get_backend()
+        try:
+            self.backend.open()
+        except Exception as e:
+            print(f"[TTS error]: {self.backend.name} backend unavailable ({e}); speech is console-only")
+            self.backend = NullBackend()
+
+    def _run(self):
+        self._open_backend()
+        try:
+            while True:
+                with self._cond:
+                    while not self._heap and not self._closed:
+                        self._cond.wait()
+                    if self._closed:
+                        return
+                    _, _, utt = heapq.heappop(self._heap)
+                    self._current = utt
+                utt.started_at = time.perf_counter()
+                self.backend.volume = self.volume
+                self.backend.first_audio_at = None
+                try:
+                    spoken = self.backend.say(utt.text, utt._cancel)
+                except Exception as e:
+                    print(f"[TTS error]: {e}")
+                    spoken = False
+                utt.first_audio_at = self.backend.first_audio_at
+                if jarvis_trace.enabled():
+                    jarvis_trace.record("tts.queue_wait", utt.started_at - utt.queued_at)
+                    jarvis_trace.record("tts.say", time.perf_counter() - utt.started_at)
+                    if utt.first_audio_at is not None:
+                        jarvis_trace.record("tts.first_audio", utt.first_audio_at - utt.queued_at)
+                    if spoken:
+                        jarvis_trace.fire("first_audio", utt.first_audio_at or utt.started_at)
+                with self._cond:
+                    self._current = None
+                    utt._finish(spoken and not utt._cancel.is_set())
+                    self._cond.notify_all()
+        finally:
+            self.backend.close()
@@ -0,0 +1,166 @@
+# jarvis_vad.py
+
+import numpy as np
+
+
+def frame_features(frames):
+    """
+    Vectorized per-frame features for a (n_frames, frame_length) int16 block:
+    RMS energy and zero-crossing rate (fraction of sign changes per sample).
+    """
+    x = np.asarray(frames, dtype=np.float32)
+    if x.ndim == 1:
+        x = x[None, :]
+    rms = np.sqrt(np.mean(x * x, axis=1))
+    signs = np.signbit(x)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (x.shape[1] - 1)
+    return rms, zcr
+
+
+class Endpointer:
+    """
+    Energy + zero-crossing voice activity detection with utterance endpointing.
+
+    A frame is speech when its RMS clears `ratio` × the noise floor (and an
+    absolute minimum) with a speech-like zero-crossing rate, or when it is
+    loud enough (2 × the threshold) that ZCR doesn't matter. The noise floor
+    adapts continuously on non-speech frames, so a fan switching on mid-session
+    doesn't leave a stale threshold behind.
+
+    The utterance starts after `min_speech` seconds of speech and closes as
+    soon as `trailing_silence` seconds of non-speech follow it.
+    """
+
+    WAITING, SPEECH, DONE = "waiting", "speech", "done"
+
+    def __init__(self, sample_rate: int = 16000, frame_length: int = 512, trailing_silence: float = 0.5,
+                 min_speech: float = 0.1, ratio: float = 3.0, min_rms: float = 150.0, max_zcr: float = 0.35,
+                 noise_floor: float | None = None, adapt: float = 0.05):
+        self.frame_seconds = frame_length / sample_rate
+        self.trailing_frames = max(1, round(trailing_silence / self.frame_seconds))
+        self.min_speech_frames = max(1, round(min_speech / self.frame_seconds))
+        self.ratio = ratio
+        self.min_rms = min_rms
+        self.max_zcr = max_zcr
+        self.adapt = adapt
+        self.noise = noise_floor if noise_floor is not None else min_rms / ratio
+        self.reset()
+
+    def reset(self):
+        self.state = self.WAITING
+        self.frames = 0          # frames processed since reset
+        self.start_frame = None  # first speech frame of the utterance
+        self.end_frame = None    # frame after the last speech frame
+        self._run = 0            # consecutive speech frames while waiting
+        self._silence = 0        # consecutive non-speech frames while in speech
+
+    def threshold(self) -> float:
+        return max(self.noise * self.ratio, self.min_rms)
+
+    def classify(self, frames):
+        """Vectorized speech/non-speech decision for a block of frames (noise floor held fixed)."""
+        rms, zcr = frame_features(frames)
+        thr = self.threshold()
+        return ((rms > thr) & (zcr < self.max_zcr)) | (rms > 2 * thr), rms
+
+    def process(self, frames) -> str:
+        """
+        Feed one frame or a (n, frame_length) block; returns the state afterwards
+        (WAITING, SPEECH or DONE). Feeding stops mattering once DONE.
+        """
+        speech, rms = self.classify(frames)
+        for is_speech, level in zip(speech.tolist(), rms.tolist()):
+            if self.state == self.DONE:
+                break
+            if not is_speech:
+                self.noise += self.adapt * (level - self.noise)
+            if self.state == self.WAITING:
+                self._run = self._run + 1 if is_speech else 0
+                if self._run >= self.min_speech_frames:
+                    self.state = self.SPEECH
+                    self.start_frame = self.frames - self._run + 1
+            else:
+                if is_speech:
+                    self._silence = 0
+                else:
+                    self._silence += 1
+                    if self._silence >= self.trailing_frames:
+                        self.state = self.DONE
+                        self.end_frame = self.frames - self._silence + 1
+            self.frames += 1
+        return self.state
+
+
+class NoSpeech(Exception):
+    """No speech started before the timeout (or the source ended)."""
+
+
+def record_utterance(reader, endpointer: Endpointer, timeout: float = 5, max_seconds: float = 12,
+                     pre_roll: float = 0.3, on_frame=None) -> tuple[bytes, dict]:
+    """
+    Reads frames from a jarvis_audio BusReader until `endpointer` closes the
+    utterance. Returns (16-bit PCM of the utterance incl. `pre_roll` seconds
+    before speech start, stats). Raises NoSpeech if nothing started within
+    `timeout` seconds of audio. `on_frame(pcm)` sees every frame (streaming STT).
+    Frames already buffered on the bus (pre-roll after a wake word) are
+    classified in one vectorized batch.
+    """
+    bus = reader.bus
+    fs = bus.frame_length / bus.sample_rate
+    pad = max(0, round(pre_roll / fs))
+    frames = []
+    endpointer.reset()
+    timeout_frames = int(timeout / fs)
+    max_frames = int(max_seconds / fs)
+
+    while endpointer.state != Endpointer.DONE:
+        backlog = bus.seq - reader.position
+        if backlog > 1:
+            # Catch up on buffered audio in one vectorized pass
+            block = []
+            for _ in range(min(backlog, 64)):
+                arr = reader.read_array(timeout=0)
+                if arr is None:
+                    break
+                block.append(arr.copy())
+            if not block:
+                continue
+            chunk = np.stack(block)
+        else:
+            arr = reader.read_array(timeout=1.0)
+            if arr is None:
+                if bus.finished or reader.closed:
+                    break
+                continue
+            chunk = arr.copy()[None, :]
+
+        # The endpointer stops reading at DONE; keep only the frames it consumed,
+        # so frames[] and its frame numbers stay aligned
+        before = endpointer.frames
+        endpointer.process(chunk)
+        for f in chunk[:endpointer.frames - before]:
+            frames.append(f)
+            if on_frame is not None:
+                on_frame(memoryview(f))
+
+        if endpointer.state == Endpointer.WAITING:
+            if endpointer.frames >= timeout_frames:
+                raise NoSpeech()
+            del frames[:-pad - endpointer.min_speech_frames]  # keep only what the pre-pad can need
+        elif endpointer.frames - endpointer.start_frame >= max_frames:
+            break
+
+    if endpointer.start_frame is None:
+        raise NoSpeech()
+    # frames[] holds the tail of the stream; map endpointer frame numbers onto it
+    offset = endpointer.frames - len(frames)
+    first = max(0, endpointer.start_frame - pad - offset)
+    last = (endpointer.end_frame if endpointer.end_frame is not None else endpointer.frames) - offset
+    pcm = np.concatenate(frames[first:last]).tobytes() if last > first else b""
+    stats = {
+        "speech_start": endpointer.start_frame * fs,
+        "speech_end": (endpointer.end_frame or endpointer.frames) * fs,
+        "closed_by": "silence" if endpointer.state == Endpointer.DONE else "limit",
+        "noise_floor": endpointer.noise,
+    }
+    return pcm, stats
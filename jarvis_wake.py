@@ -1,9 +1,10 @@
 import os
-import struct
 import pvporcupine
-import sounddevice as sd
 from threading import Event
 
+from jarvis_audio import AudioBus, SoundDeviceSource
+from jarvis_trace import span
+
 # Built-in keywords vary by Porcupine build; these are common ones.
 BUILT_INS = {
     "porcupine", "bumblebee", "americano", "blueberry", "terminator",
@@ -18,9 +19,14 @@ class WakeDetector:
     - Otherwise, tries to load a custom keyword .ppn via env var:
         JARVIS_PPN=<absolute path to .ppn>
       or by passing keyword="path/to/your.ppn" (absolute).
+    - Audio comes from `bus` (the shared jarvis_audio.AudioBus); without one
+      the detector opens a private bus on the default input device.
+    - While `mute()` returns True, detections are ignored: Jarvis saying the
+      wake word itself ("say 'jarvis' to wake me") must not wake it.
     """
 
-    def __init__(self, keyword: str = "jarvis", sensitivity: float = 0.5, model_path: str | None = None):
+    def __init__(self, keyword: str = "jarvis", sensitivity: float = 0.5, model_path: str | None = None,
+                 bus: AudioBus | None = None, mute=None):
         access_key = os.getenv("PV_ACCESS_KEY", "").strip()
         if not access_key:
             raise RuntimeError(
@@ -79,35 +85,49 @@ class WakeDetector:
                 f"Original error: {e}"
             ) from e
 
-        # Open default input device. If you must choose a specific device index, change device=None → device=<index>.
-        self._stream = sd.InputStream(
-            samplerate=self._porcupine.sample_rate,
-            channels=1,
-            dtype="int16",
-            device=None,  # system default
-            blocksize=self._porcupine.frame_length,
-        )
-
+        self._owns_bus = bus is None
+        if bus is None:
+            # Open default input device. If you must choose a specific device index, pass
+            # bus=AudioBus(SoundDeviceSource(device=<index>)) instead.
+            bus = AudioBus(SoundDeviceSource(self._porcupine.sample_rate, self._porcupine.frame_length)).start()
+        if (bus.sample_rate, bus.frame_length) != (self._porcupine.sample_rate, self._porcupine.frame_length):
+            raise RuntimeError(
+                f"Audio bus delivers {bus.frame_length}-sample frames at {bus.sample_rate} Hz; "
+                f"Porcupine needs {self._porcupine.frame_length} at {self._porcupine.sample_rate} Hz."
+            )
+        self._bus = bus
+        self._reader = bus.reader()
         self._stopped = Event()
-        self._stream.start()
+        self._mute = mute
+        self.last_wake_frame = None  # bus frame right after the keyword ended (start of the pre-roll)
 
     def wait_for_wake(self) -> bool:
         """Blocks until the wake-word is detected. Returns True if detected; False if stopped."""
+        reader = self._reader
+        # Skip audio captured while we weren't listening (our own speech, the last command)
+        reader.seek_latest()
         while not self._stopped.is_set():
-            # Read one Porcupine frame
-            data, _ = self._stream.read(self._porcupine.frame_length)
-            pcm = struct.unpack_from("h" * self._porcupine.frame_length, data)
-            res = self._porcupine.process(pcm)
-            if res >= 0:
+            # int16 memoryview straight out of the bus ring
+            pcm = reader.read(timeout=0.5)
+            if pcm is None:
+                if self._bus.finished:
+                    return False
+                continue
+            with span("wake.frame", timeline=False):  # every 32 ms: histogram only
+                hit = self._porcupine.process(pcm)
+            if hit >= 0:
+                if self._mute is not None and self._mute():
+                    continue  # our own voice through the speakers
+                self.last_wake_frame = reader.position
                 return True
         return False
 
     def stop(self):
         self._stopped.set()
+        self._reader.close()
         try:
-            if self._stream:
-                self._stream.stop()
-                self._stream.close()
+            if self._owns_bus:
+                self._bus.stop()
         finally:
             if hasattr(self, "_porcupine") and self._porcupine is not None:
                 self._porcupine.delete()
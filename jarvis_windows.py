@@ -0,0 +1,295 @@
+# jarvis_windows.py
+
+import ctypes
+import os
+import sys
+import time
+from collections import deque, namedtuple
+from threading import Lock
+
+import jarvis_trace
+
+Window = namedtuple("Window", "handle title pid")
+# handle is None when the deadline passed first; seconds is the whole wait, polls how often we looked
+WaitResult = namedtuple("WaitResult", "app handle seconds polls launched stage")
+
+
+class WindowBackend:
+    """
+    Top-level windows of the desktop session. Handles are opaque; `title()`
+    returns None once a handle's window is gone. `activate()` only asks for
+    the foreground; `foreground()` says whether the request took.
+    """
+
+    name = "base"
+
+    def windows(self) -> list:
+        """Visible top-level windows with a title, as Window tuples."""
+        raise NotImplementedError
+
+    def title(self, handle) -> str | None:
+        raise NotImplementedError
+
+    def ready(self, handle) -> bool:
+        """Visible and responding to input."""
+        raise NotImplementedError
+
+    def activate(self, handle):
+        raise NotImplementedError
+
+    def foreground(self):
+        raise NotImplementedError
+
+
+class Win32Backend(WindowBackend):
+    """Windows desktop through pywin32; one EnumWindows pass per `windows()` call."""
+
+    name = "win32"
+
+    _VK_MENU = 0x12
+    _KEYEVENTF_KEYUP = 0x2
+
+    def __init__(self):
+        import win32con
+        import win32gui
+        import win32process
+        self.win32con, self.win32gui, self.win32process = win32con, win32gui, win32process
+        self.user32 = ctypes.windll.user32
+
+    def windows(self) -> list:
+        gui, found = self.win32gui, []
+
+        def collect(hwnd, _):
+            if gui.IsWindowVisible(hwnd):
+                title = gui.GetWindowText(hwnd)
+                if title:
+                    found.append(Window(hwnd, title, self.win32process.GetWindowThreadProcessId(hwnd)[1]))
+            return True
+
+        gui.EnumWindows(collect, None)
+        return found
+
+    def title(self, handle) -> str | None:
+        return self.win32gui.GetWindowText(handle) if self.win32gui.IsWindow(handle) else None
+
+    def ready(self, handle) -> bool:
+        gui = self.win32gui
+        return bool(gui.IsWindow(handle) and gui.IsWindowVisible(handle) and not self.user32.IsHungAppWindow(handle))
+
+    def activate(self, handle):
+        gui = self.win32gui
+        if gui.IsIconic(handle):
+            gui.ShowWindow(handle, self.win32con.SW_RESTORE)
+        try:
+            gui.SetForegroundWindow(handle)
+        except gui.error:
+            # Foreground lock: Windows only hands focus to the process that got the last input,
+            # so send a harmless Alt tap first
+            self.user32.keybd_event(self._VK_MENU, 0, 0, 0)
+            self.user32.keybd_event(self._VK_MENU, 0, self._KEYEVENTF_KEYUP, 0)
+            try:
+                gui.SetForegroundWindow(handle)
+            except gui.error:
+                pass
+
+    def foreground(self):
+        return self.win32gui.GetForegroundWindow()
+
+
+class FakeBackend(WindowBackend):
+    """
+    Scripted desktop for tests and benchmarks on any OS. `add()` schedules a
+    window to appear `after` seconds from now and to accept input
+    `ready_after` seconds after that; focus moves `activate_delay` seconds
+    after `activate()`. Counts enumerations so tests can see cache hits.
+    """
+
+    name = "fake"
+
+    def __init__(self, activate_delay: float = 0.0, clock=time.monotonic):
+        self.activate_delay = activate_delay
+        self.clock = clock
+        self._windows = {}         # handle → [title, pid, appears_at, ready_at]
+        self._next = 1
+        self._focus = None
+        self._pending = None       # (handle, focused_at)
+        self.enumerations = 0
+        self.activations = 0
+
+    def add(self, title: str, after: float = 0.0, ready_after: float = 0.0, pid: int = 0) -> int:
+        handle, self._next = self._next, self._next + 1
+        now = self.clock()
+        self._windows[handle] = [title, pid, now + after, now + after + ready_after]
+        return handle
+
+    def remove(self, handle):
+        self._windows.pop(handle, None)
+
+    def _shown(self, handle) -> bool:
+        w = self._windows.get(handle)
+        return w is not None and self.clock() >= w[2]
+
+    def windows(self) -> list:
+        self.enumerations += 1
+        return [Window(h, w[0], w[1]) for h, w in self._windows.items() if self._shown(h)]
+
+    def title(self, handle) -> str | None:
+        return self._windows[handle][0] if self._shown(handle) else None
+
+    def ready(self, handle) -> bool:
+        return self._shown(handle) and self.clock() >= self._windows[handle][3]
+
+    def activate(self, handle):
+        self.activations += 1
+        if self._pending is None or self._pending[0] != handle:
+            self._pending = (handle, self.clock() + self.activate_delay)
+
+    def foreground(self):
+        if self._pending is not None and self.clock() >= self._pending[1]:
+            if self._shown(self._pending[0]):
+                self._focus = self._pending[0]
+            self._pending = None
+        return self._focus
+
+
+BACKENDS = {
+    Win32Backend.name: Win32Backend,
+    FakeBackend.name: FakeBackend,
+}
+
+
+def get_backend(name: str | None = None, **kwargs) -> WindowBackend:
+    """Builds the backend named by `name` or JARVIS_WINDOWS (default: win32 on Windows, else fake)."""
+    name = (name or os.getenv("JARVIS_WINDOWS") or ("win32" if sys.platform == "win32" else "fake")).strip().lower()
+    try:
+        cls = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown window backend {name!r}; choose from {', '.join(BACKENDS)}") from None
+    return cls(**kwargs)
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Registry
+class WindowRegistry:
+    """
+    Remembers the window handle used for each app, so a repeat command skips
+    the window enumeration, and replaces fixed sleeps with polling that
+    backs off from `first_poll` to `max_poll` seconds until the window is
+    there, responding and in the foreground, or `timeout` passes.
+
+        registry = WindowRegistry(get_backend())
+        result = registry.activate("notepad", "Notepad", launch=start_notepad)
+        if result.handle is not None: ...   # ready after result.seconds
+    """
+
+    def __init__(self, backend: WindowBackend | None = None, timeout: float = 10.0, first_poll: float = 0.01,
+                 max_poll: float = 0.1, reactivate_after: float = 0.5):
+        self.backend = backend if backend is not None else get_backend()
+        self.timeout = timeout
+        # A second activate() if focus hasn't arrived by then (a starting app can take it back);
+        # never more, since Win32Backend's fallback taps Alt into whatever has focus
+        self.reactivate_after = reactivate_after
+        self.first_poll = first_poll
+        self.max_poll = max_poll
+        self._handles = {}                 # app → handle
+        self._lock = Lock()
+        self.recent = deque(maxlen=100)    # WaitResult of the latest activations
+        self.hits = self.enumerations = 0
+
+    def lookup(self, app: str, title: str):
+        """The app's window handle: the cached one while it still has a matching title, else one enumeration."""
+        needle = title.lower()
+        with self._lock:
+            handle = self._handles.get(app)
+        if handle is not None:
+            current = self.backend.title(handle)
+            if current is not None and needle in current.lower():
+                self.hits += 1
+                return handle
+        self.enumerations += 1
+        for w in self.backend.windows():
+            if needle in w.title.lower():
+                with self._lock:
+                    self._handles[app] = w.handle
+                return w.handle
+        with self._lock:
+            self._handles.pop(app, None)
+        return None
+
+    def forget(self, app: str):
+        with self._lock:
+            self._handles.pop(app, None)
+
+    def wait_until(self, predicate, deadline: float) -> tuple:
+        """
+        Polls `predicate` with exponential backoff until it returns something
+        truthy or `deadline` (time.monotonic) passes → (value or None, polls).
+        """
+        delay, polls = self.first_poll, 0
+        while True:
+            polls += 1
+            value = predicate()
+            if value:
+                return value, polls
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None, polls
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, self.max_poll)
+
+    def activate(self, app: str, title: str, launch=None, timeout: float | None = None) -> WaitResult:
+        """
+        Brings the app's window to the foreground, first calling `launch()`
+        when it has none, and returns once it can take keystrokes. On
+        timeout the result's handle is None and `stage` says what was
+        still missing: "window", "ready" or "focus".
+        """
+        t0 = time.monotonic()
+        deadline = t0 + (self.timeout if timeout is None else timeout)
+        handle, polls, launched = self.lookup(app, title), 0, False
+        if handle is None and launch is not None:
+            launch()
+            launched = True
+            handle, polls = self.wait_until(lambda: self.lookup(app, title), deadline)
+        stage = "window"
+        if handle is not None:
+            ok, n = self.wait_until(lambda: self.backend.ready(handle), deadline)
+            polls += n
+            stage = "ready"
+            if ok:
+                self.backend.activate(handle)
+                retry_at = [time.monotonic() + self.reactivate_after]
+                ok, n = self.wait_until(lambda: self._focused(handle, retry_at), deadline)
+                polls += n
+                stage = "focus"
+            if ok:
+                stage = None
+            else:
+                handle = None
+        result = WaitResult(app, handle, time.monotonic() - t0, polls, launched, stage)
+        self._report(result)
+        return result
+
+    def _focused(self, handle, retry_at: list) -> bool:
+        """Has `handle` got the focus? Asks once more when retry_at[0] passes (then clears it)."""
+        if self.backend.foreground() == handle:
+            return True
+        if retry_at[0] is not None and time.monotonic() >= retry_at[0]:
+            retry_at[0] = None
+            self.backend.activate(handle)
+        return False
+
+    def _report(self, result: WaitResult):
+        self.recent.append(result)
+        jarvis_trace.record(f"window.{'launch' if result.launched else 'activate'}", result.seconds)
+        what = "launched and ready" if result.launched else "ready"
+        if result.handle is None:
+            print(f"[Windows] {result.app}: no {result.stage} after {result.seconds:.2f}s ({result.polls} polls)")
+        else:
+            print(f"[Windows] {result.app} {what} in {result.seconds * 1e3:.0f} ms ({result.polls} polls)")
+
+    def stats(self) -> dict:
+        waits = list(self.recent)
+        done = [r.seconds for r in waits if r.handle is not None]
+        return {"cached_apps": len(self._handles), "cache_hits": self.hits, "enumerations": self.enumerations,
+                "waits": len(waits), "timeouts": len(waits) - len(done),
+                "mean_wait_ms": sum(done) / len(done) * 1e3 if done else None}